@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+Acoustic/accelerometer capture files: loading and server-side spectrograms
+"""
+
+import os
+import re
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; spectrograms need it, loading does not
+    np = None
+
+logger = logging.getLogger(__name__)
+
+STFT_WINDOWS = ('hann', 'hamming', 'blackman', 'rect')
+MIN_FFT_SIZE = 64
+MAX_FFT_SIZE = 16384
+
+# Bounds on the work and memory one spectrogram request may take: the hop can't
+# go below fft / MIN_HOP_DIVISOR (90% overlap is the page's maximum), and the
+# result is at most MAX_SPECTROGRAM_CELLS bins in total (one byte each), of which
+# at most MAX_JSON_SPECTROGRAM_CELLS are sent as JSON - larger ones need format=binary
+MIN_HOP_DIVISOR = 16
+MAX_SPECTROGRAM_CELLS = 16 * 1024 * 1024
+MAX_JSON_SPECTROGRAM_CELLS = 1024 * 1024
+
+# Samples transformed per rfft batch, which bounds the temporary arrays
+STFT_BATCH_SAMPLES = 1024 * 1024
+
+# Floor for silent bins, as in the page's own drawing code
+DB_FLOOR = -120.0
+
+# Header names recognised for each column of a 3-axis capture
+COLUMN_NAMES = {
+    't': ('t_s', 't', 'time', 'timestamp'),
+    'x': ('x_g', 'x', 'ax', 'accel_x', 'acc_x'),
+    'y': ('y_g', 'y', 'ay', 'accel_y', 'acc_y'),
+    'z': ('z_g', 'z', 'az', 'accel_z', 'acc_z'),
+}
+
+SIDECAR_SUFFIX = '.npy'
+# Header columns in front of the samples in a sidecar: sample rate, CSV size, CSV mtime_ns
+SIDECAR_HEADER = 3
+
+# Bytes read at a time when scanning a capture's body for comments
+PARSE_CHUNK_BYTES = 1024 * 1024
+
+_COMMENT_LINE = re.compile(rb'^[ \t]*#[^\n]*', re.MULTILINE)
+
+def _comment_sample_rate(line: str) -> Optional[int]:
+    """Sample rate from a metadata comment: # sample_rate=8000 or # fs=8000"""
+    m = next(
+        (p for p in line[1:].split() if '=' in p and
+         p.split('=')[0].strip().lower() in ('sample_rate', 'fs', 'samplerate')),
+        None)
+    if m:
+        try:
+            return int(m.split('=')[1])
+        except ValueError:
+            pass
+    return None
+
+def _map_header(cols) -> Dict[str, int]:
+    """Column index of t/x/y/z in a header row"""
+    col_map = {}
+    for i, name in enumerate(cols):
+        nl = name.lower()
+        for key, names in COLUMN_NAMES.items():
+            if nl in names:
+                col_map[key] = i
+                break
+    return col_map
+
+def _rate_from_times(first: float, last: float, count: int) -> Optional[int]:
+    """Derive the sample rate from the t column when it isn't in the metadata"""
+    if count >= 2:
+        dt = (last - first) / (count - 1)
+        if dt > 0:
+            return round(1.0 / dt)
+    return None
+
+def _parse_csv(filepath: str) -> Dict:
+    """Line-by-line parser, used without numpy and for files the bulk parser rejects
+    
+    Rows that don't parse are skipped.
+    """
+    samples = []
+    x_samples, y_samples, z_samples, timestamps = [], [], [], []
+    sample_rate = None
+    col_map = {}
+    
+    with open(filepath, 'r') as f:
+        header_parsed = False
+        is_multi = False
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('#'):
+                sample_rate = _comment_sample_rate(line) or sample_rate
+                continue
+            cols = [c.strip() for c in line.split(',')]
+            if not header_parsed:
+                header_parsed = True
+                try:
+                    float(cols[0])
+                    # First column is numeric — no header, use last column fallback
+                except ValueError:
+                    col_map = _map_header(cols)
+                    is_multi = ('x' in col_map and 'y' in col_map and 'z' in col_map)
+                    continue
+            try:
+                if is_multi:
+                    x_samples.append(float(cols[col_map['x']]))
+                    y_samples.append(float(cols[col_map['y']]))
+                    z_samples.append(float(cols[col_map['z']]))
+                    if 't' in col_map and col_map['t'] < len(cols):
+                        timestamps.append(float(cols[col_map['t']]))
+                else:
+                    samples.append(float(cols[-1]))
+            except (ValueError, IndexError):
+                pass
+    
+    if not sample_rate and timestamps:
+        sample_rate = _rate_from_times(timestamps[0], timestamps[-1], len(timestamps))
+    
+    if x_samples:
+        return {'axes': {'x': x_samples, 'y': y_samples, 'z': z_samples}, 'sample_rate': sample_rate}
+    return {'samples': samples, 'sample_rate': sample_rate}
+
+def _scan_body(f) -> Tuple[Optional[int], bool]:
+    """Read the rest of a capture in chunks for (sample rate from comments, whether it has data rows)
+    
+    Comments further down can still set the sample rate (the last one wins).
+    Chunks are cut at line ends so no comment is split between two of them.
+    """
+    sample_rate = None
+    has_rows = False
+    carry = b''
+    while True:
+        chunk = f.read(PARSE_CHUNK_BYTES)
+        block = carry + chunk
+        if chunk:
+            cut = block.rfind(b'\n') + 1
+            block, carry = block[:cut], block[cut:]
+        if b'#' in block:
+            for match in _COMMENT_LINE.finditer(block):
+                sample_rate = _comment_sample_rate(match.group(0).decode('utf-8', errors='replace').strip()) or sample_rate
+            has_rows = has_rows or bool(_COMMENT_LINE.sub(b'', block).strip())
+        else:
+            has_rows = has_rows or bool(block.strip())
+        if not chunk:
+            return sample_rate, has_rows
+
+def _parse_csv_bulk(filepath: str) -> Optional[Dict]:
+    """Parse the numeric body in one numpy.loadtxt call; None if it isn't uniform enough
+    
+    Only the comment lines and the first row (header or data) are looked at
+    in Python, to find the layout and the sample rate; the rest of the file
+    is scanned in PARSE_CHUNK_BYTES chunks, so it is never held in memory
+    as text.
+    """
+    sample_rate = None
+    col_map = {}
+    ncols = 0
+    skiprows = 0
+    has_rows = False
+    with open(filepath, 'rb') as f:
+        for raw_line in iter(f.readline, b''):
+            line = raw_line.decode('utf-8', errors='replace').strip()
+            if line and not line.startswith('#'):
+                cols = [c.strip() for c in line.split(',')]
+                ncols = len(cols)
+                try:
+                    float(cols[0])
+                    has_rows = True
+                except ValueError:
+                    col_map = _map_header(cols)
+                    skiprows += 1
+                break
+            if line:
+                sample_rate = _comment_sample_rate(line) or sample_rate
+            skiprows += 1
+        
+        if ncols:
+            body_rate, body_rows = _scan_body(f)
+            sample_rate = body_rate or sample_rate
+            has_rows = has_rows or body_rows
+    
+    is_multi = 'x' in col_map and 'y' in col_map and 'z' in col_map
+    usecols = [col_map['x'], col_map['y'], col_map['z']] if is_multi else [ncols - 1]
+    if is_multi and 't' in col_map:
+        usecols.append(col_map['t'])
+    
+    if not has_rows:
+        values = np.empty((len(usecols), 0))
+    else:
+        try:
+            # loadtxt reads the file itself, a chunk of lines at a time
+            values = np.loadtxt(filepath, delimiter=',', comments='#', skiprows=skiprows,
+                                usecols=usecols, ndmin=2, dtype=np.float64).T
+        except ValueError:
+            return None
+    
+    if is_multi and 't' in col_map and not sample_rate and values.shape[1]:
+        sample_rate = _rate_from_times(float(values[3, 0]), float(values[3, -1]), values.shape[1])
+    
+    columns = np.ascontiguousarray(values[:3] if is_multi else values[:1])
+    if is_multi and not columns.shape[1]:
+        # Nothing under the header: like the line parser, an empty single-signal capture
+        columns = np.empty((1, 0))
+    return {'columns': columns, 'sample_rate': sample_rate}
+
+def sidecar_path(filepath: str) -> str:
+    return filepath + SIDECAR_SUFFIX
+
+def _source_stamp(stat):
+    """The CSV's size and mtime_ns, as the bits of two float64 header cells"""
+    return np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64).view(np.float64)
+
+def _write_sidecar(filepath: str, stat, columns, sample_rate: Optional[int]):
+    """Save the parsed samples next to the CSV for memory-mapped loading
+    
+    Layout: a float64 array of shape (signals, SIDECAR_HEADER + samples),
+    one row per signal (x, y, z or the single signal) so each is contiguous.
+    Row 0 of the header columns holds the sample rate (NaN if unknown) and
+    the size and mtime_ns of the CSV it was parsed from (stat, taken before
+    parsing), stored as int64 bits; the rest of the header is unused.
+    """
+    table = np.empty((columns.shape[0], columns.shape[1] + SIDECAR_HEADER))
+    table[:, :SIDECAR_HEADER] = np.nan
+    table[0, 0] = sample_rate if sample_rate else np.nan
+    table[0, 1:SIDECAR_HEADER] = _source_stamp(stat)
+    table[:, SIDECAR_HEADER:] = columns
+    
+    tmp_path = sidecar_path(filepath) + '.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            np.save(f, table)
+        os.replace(tmp_path, sidecar_path(filepath))
+    except OSError as e:
+        logger.warning(f"Could not write sample cache for {os.path.basename(filepath)}: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+def _read_sidecar(filepath: str, stat) -> Optional[Dict]:
+    """Memory-map the sidecar if it was made from the CSV as it is now (same size and mtime)"""
+    try:
+        table = np.load(sidecar_path(filepath), mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    if table.ndim != 2 or table.shape[0] not in (1, 3) or table.shape[1] < SIDECAR_HEADER:
+        return None
+    if not np.array_equal(np.array(table[0, 1:SIDECAR_HEADER]).view(np.int64), _source_stamp(stat).view(np.int64)):
+        return None
+    rate = table[0, 0]
+    return {'columns': table[:, SIDECAR_HEADER:], 'sample_rate': None if np.isnan(rate) else int(rate)}
+
+def load_acoustic_file(filepath: str) -> Dict:
+    """Read a capture CSV into {'axes': {'x', 'y', 'z'}} or {'samples'}, plus 'sample_rate'
+    
+    A header row naming x/y/z (and optionally t) columns makes it a 3-axis
+    capture; otherwise the last column of each row is the signal. The sample
+    rate comes from a '# sample_rate=' (or fs=) comment, else from the t column.
+    
+    With numpy the signals are float64 arrays: the first load parses the CSV
+    in bulk and saves a .npy sidecar next to it, later loads memory-map that.
+    Without numpy they are lists.
+    """
+    if np is None:
+        return _parse_csv(filepath)
+    
+    stat = os.stat(filepath)
+    parsed = _read_sidecar(filepath, stat)
+    if parsed is None:
+        parsed = _parse_csv_bulk(filepath)
+        if parsed is None:
+            capture = _parse_csv(filepath)
+            signals = list(capture['axes'].values()) if 'axes' in capture else [capture['samples']]
+            if len({len(signal) for signal in signals}) > 1:
+                return capture  # a row broke off between axes: nothing consistent to cache
+            parsed = {'columns': np.array(signals, dtype=np.float64), 'sample_rate': capture['sample_rate']}
+        _write_sidecar(filepath, stat, parsed['columns'], parsed['sample_rate'])
+    
+    columns = parsed['columns']
+    if columns.shape[0] == 3:
+        return {'axes': {'x': columns[0], 'y': columns[1], 'z': columns[2]}, 'sample_rate': parsed['sample_rate']}
+    return {'samples': columns[0], 'sample_rate': parsed['sample_rate']}
+
+def to_list(values) -> list:
+    """Signal as a plain list for JSON"""
+    return values.tolist() if hasattr(values, 'tolist') else list(values)
+
+def minmax_envelope(signal, max_points: int):
+    """Reduce a signal to at most max_points values, keeping each bucket's minimum and maximum
+    
+    Buckets of equal size each contribute their min and max, in the order
+    they occur, so peaks survive and the result still draws as a waveform.
+    Returns (values, bucket size in samples).
+    """
+    if np is None:
+        raise RuntimeError("Decimation needs numpy installed on the server")
+    signal = np.asarray(signal)
+    buckets = max(1, max_points // 2)
+    size = -(-len(signal) // buckets)  # ceiling division
+    if size <= 1:
+        return np.array(signal), 1
+    
+    whole = len(signal) // size * size
+    blocks = signal[:whole].reshape(-1, size)
+    if whole < len(signal):
+        # The short last bucket is padded with its own last value
+        tail = np.full(size, signal[-1])
+        tail[:len(signal) - whole] = signal[whole:]
+        blocks = np.vstack([blocks, tail])
+    
+    lowest, highest = blocks.argmin(axis=1), blocks.argmax(axis=1)
+    rows = np.arange(len(blocks))
+    low, high = blocks[rows, lowest], blocks[rows, highest]
+    min_first = lowest <= highest
+    values = np.empty(2 * len(blocks), dtype=blocks.dtype)
+    values[0::2] = np.where(min_first, low, high)
+    values[1::2] = np.where(min_first, high, low)
+    return values, size
+
+# Decimation factor handled by the FIR stage; larger factors are first reduced by block averaging
+MAX_FIR_FACTOR = 16
+
+def decimate_filtered(signal, factor: int):
+    """Downsample by factor with anti-aliasing, keeping every factor-th sample of the filtered signal
+    
+    Large factors are first reduced by averaging blocks of samples (a
+    boxcar low-pass, cheap on a memory-mapped array); the remaining factor
+    of at most MAX_FIR_FACTOR goes through a Hamming-windowed sinc low-pass
+    with its cutoff at the new Nyquist frequency. Returns (values, factor
+    actually applied).
+    """
+    if np is None:
+        raise RuntimeError("Decimation needs numpy installed on the server")
+    signal = np.asarray(signal, dtype=np.float64)
+    if factor <= 1 or len(signal) < 2:
+        return np.array(signal), 1
+    
+    block = -(-factor // MAX_FIR_FACTOR)
+    if block > 1:
+        whole = len(signal) // block * block
+        signal = signal[:whole].reshape(-1, block).mean(axis=1)
+    step = max(1, round(factor / block))
+    if step == 1:
+        return signal, block
+    
+    taps = 8 * step + 1
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = np.sinc(n / step) / step * np.hamming(taps)
+    kernel /= kernel.sum()
+    # Edge samples are reflected so the filter doesn't pull the ends towards zero
+    pad = min(taps // 2, len(signal) - 1)
+    padded = np.pad(signal, pad, mode='reflect') if pad else signal
+    filtered = np.convolve(padded, kernel, mode='same')[pad:pad + len(signal)]
+    return filtered[::step], block * step
+
+def stft_window(name: str, size: int):
+    """Window coefficients; 'hann' is the symmetric Hann window the page has always used"""
+    if name == 'hann':
+        return np.hanning(size)
+    if name == 'hamming':
+        return np.hamming(size)
+    if name == 'blackman':
+        return np.blackman(size)
+    return np.ones(size)
+
+def spectrogram_shape(num_samples: int, fft_size: int, hop: int) -> Tuple[int, int]:
+    """(frames, bins) of the spectrogram of num_samples samples"""
+    num_frames = (num_samples - fft_size) // hop + 1 if num_samples >= fft_size else 0
+    return num_frames, fft_size // 2
+
+def compute_spectrogram(samples, fft_size: int, hop: int, window: str = 'hann') -> Dict:
+    """STFT magnitudes in dB, quantized to one byte per bin
+    
+    Frames are a strided view of the signal (no copy), windowed and
+    transformed in batches of about STFT_BATCH_SAMPLES samples, each written
+    into a preallocated float32 dB array, so temporary arrays stay the same
+    size however long the signal is. Bins run from DC up to just below
+    Nyquist (fft_size // 2 of them), like the page's client-side FFT. Each
+    byte q stands for db_offset + q * db_scale; the scale spans the
+    spectrogram's own range, so the rounding error stays below half a step.
+    """
+    if np is None:
+        raise RuntimeError("Spectrograms need numpy installed on the server")
+    num_frames, num_bins = spectrogram_shape(len(samples), fft_size, hop)
+    if num_frames * num_bins > MAX_SPECTROGRAM_CELLS:
+        raise ValueError(f"Spectrogram of {num_frames} x {num_bins} bins is too large, use a larger hop")
+    if num_frames == 0:
+        frames = np.zeros((0, num_bins), dtype=np.uint8)
+        return {"frames": frames, "num_frames": 0, "num_bins": num_bins, "db_offset": DB_FLOOR, "db_scale": 0.0}
+    
+    signal = np.asarray(samples, dtype=np.float64)
+    framed = np.lib.stride_tricks.sliding_window_view(signal, fft_size)[::hop]
+    taper = stft_window(window, fft_size)
+    batch = max(1, STFT_BATCH_SAMPLES // fft_size)
+    
+    db = np.empty((num_frames, num_bins), dtype=np.float32)
+    for first in range(0, num_frames, batch):
+        magnitudes = np.abs(np.fft.rfft(framed[first:first + batch] * taper, axis=1)[:, :num_bins])
+        np.maximum(magnitudes, 1e-10, out=magnitudes)
+        db[first:first + batch] = np.maximum(20 * np.log10(magnitudes), DB_FLOOR)
+    
+    low, high = float(db.min()), float(db.max())
+    scale = (high - low) / 255 if high > low else 0.0
+    frames = np.zeros(db.shape, dtype=np.uint8)
+    if scale:
+        for first in range(0, num_frames, batch):
+            chunk = db[first:first + batch]
+            np.rint((chunk - low) / scale, out=chunk)
+            frames[first:first + batch] = chunk
+    return {"frames": frames, "num_frames": num_frames, "num_bins": num_bins, "db_offset": low, "db_scale": scale}
+
+class SpectrogramCache:
+    """LRU cache of computed spectrograms, keyed by file (and its size/mtime) and parameters
+    
+    Entries for a file that changed simply stop matching and age out. The
+    total size of the cached frames is kept under max_bytes.
+    """
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def key(filepath: str, *params) -> Optional[tuple]:
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            return None
+        return (filepath, stat.st_size, stat.st_mtime_ns) + params
+    
+    def get(self, key: tuple) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+    
+    def put(self, key: tuple, spectrogram: Dict):
+        size = spectrogram["frames"].nbytes
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old["frames"].nbytes
+            self._entries[key] = spectrogram
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted["frames"].nbytes
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Encoding of API responses: fast JSON, compression and the columnar data shape
+"""
+
+import gzip
+from typing import Dict, List
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard json module
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Only text payloads are worth compressing
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/csv', 'application/x-ndjson', 'text/plain'}
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # well below the maximum: much faster, and still smaller than gzip
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that serializes with orjson when it is installed
+    
+    orjson is several times faster than the json module on the long lists of
+    floats the data endpoints return. Anything it can't handle, and pretty
+    printing, falls back to Flask's default provider.
+    """
+    
+    def dumps(self, obj, **kwargs) -> str:
+        if orjson is not None and not kwargs:
+            try:
+                return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+            except TypeError:
+                pass
+        return super().dumps(obj, **kwargs)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if orjson is None or self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        return self._app.response_class(self.dumps(obj), mimetype=self.mimetype)
+
+def negotiate_encoding(accept_encodings) -> str:
+    """Pick the content coding for a request's Accept-Encoding ('' for none)"""
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return accept_encodings.best_match(offered) or ''
+
+def compress_response(response, encoding: str, min_size: int):
+    """Compress a complete text response in place with the negotiated encoding
+    
+    Streamed responses (live stream, exports) are left alone: they are sent
+    as they are generated, and buffering them to compress would defeat that.
+    """
+    if response.status_code != 200 or response.is_streamed or response.direct_passthrough:
+        return response
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers:
+        return response
+    
+    # Caches must key on Accept-Encoding even when this client got the plain body
+    response.vary.add('Accept-Encoding')
+    if not encoding:
+        return response
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+    
+    if encoding == 'br':
+        compressed = brotli.compress(data, quality=BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+def readings_to_columns(readings: List[Dict]) -> Dict[str, List]:
+    """Turn chart rows into the columnar shape {"t": [...], "<sensor>": [...]}
+    
+    Downsampled rows also carry "<sensor>_min" / "<sensor>_max" and "count".
+    Sensors missing from a row are null, so all columns line up with "t".
+    """
+    names = []
+    for reading in readings:
+        for name in reading.get("sensors", {}):
+            if name not in names:
+                names.append(name)
+    
+    columns = {"t": [r["timestamp"] for r in readings]}
+    for name in names:
+        columns[name] = [r["sensors"].get(name) for r in readings]
+        if any("min" in r for r in readings):
+            columns[f"{name}_min"] = [r.get("min", {}).get(name) for r in readings]
+            columns[f"{name}_max"] = [r.get("max", {}).get(name) for r in readings]
+    if any("count" in r for r in readings):
+        columns["count"] = [r.get("count") for r in readings]
+    return columns
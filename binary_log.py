@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Fixed-width binary log format for temperature readings
+
+Layout of a .bin file:
+    header:  b"SLRB" | version (uint16) | sensor count (uint16) | header length (uint32)
+             then one (uint8 length, utf-8 name) entry per sensor, zero-padded
+             to a multiple of 8 bytes
+    records: float64 epoch seconds | float32 per sensor (NaN = no reading)
+
+Records are fixed width, so readers map the file straight into arrays
+(numpy.memmap, or struct.iter_unpack over a memoryview) without parsing
+any text.
+"""
+
+import os
+import json
+import math
+import mmap
+import struct
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; fall back to struct unpacking
+    np = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SLRB"
+VERSION = 1
+_FIXED_HEADER = struct.Struct("<4sHHI")
+VALUE_DECIMALS = 3
+
+def record_struct(sensor_count: int) -> struct.Struct:
+    return struct.Struct("<d" + "f" * sensor_count)
+
+def encode_header(sensor_names: List[str]) -> bytes:
+    """Build the header mapping sensor names to record columns"""
+    names = b"".join(
+        struct.pack("<B", len(encoded)) + encoded
+        for encoded in (name.encode('utf-8') for name in sensor_names)
+    )
+    length = _FIXED_HEADER.size + len(names)
+    padding = (-length) % 8
+    length += padding
+    return _FIXED_HEADER.pack(MAGIC, VERSION, len(sensor_names), length) + names + b"\0" * padding
+
+def read_header(f) -> Optional[Dict]:
+    """Read the header from an open binary file; returns None if the file is empty or not ours"""
+    fixed = f.read(_FIXED_HEADER.size)
+    if len(fixed) < _FIXED_HEADER.size:
+        return None
+    magic, version, sensor_count, length = _FIXED_HEADER.unpack(fixed)
+    if magic != MAGIC or version != VERSION:
+        return None
+    
+    names_blob = f.read(length - _FIXED_HEADER.size)
+    names = []
+    pos = 0
+    for _ in range(sensor_count):
+        size = names_blob[pos]
+        names.append(names_blob[pos + 1:pos + 1 + size].decode('utf-8'))
+        pos += 1 + size
+    return {"sensors": names, "header_length": length, "record_size": record_struct(sensor_count).size}
+
+def encode_record(reading: Dict, sensor_names: List[str], record: Optional[struct.Struct] = None) -> bytes:
+    """Pack one reading as a fixed-width record"""
+    record = record or record_struct(len(sensor_names))
+    values = reading.get('sensors') or {}
+    epoch = datetime.fromisoformat(reading['timestamp']).timestamp()
+    return record.pack(epoch, *(math.nan if values.get(n) is None else values[n] for n in sensor_names))
+
+def _epochs_to_iso(epochs) -> List[str]:
+    """Convert epoch seconds to naive local ISO strings like datetime.now().isoformat()"""
+    if not len(epochs):
+        return []
+    first = float(epochs[0])
+    last = float(epochs[-1])
+    offset = datetime.fromtimestamp(first).astimezone().utcoffset()
+    if np is not None and offset == datetime.fromtimestamp(last).astimezone().utcoffset():
+        # One UTC offset for the whole file (no DST change): convert all rows at once
+        local = np.rint(np.asarray(epochs) * 1e6).astype('int64') + int(offset.total_seconds() * 1e6)
+        return np.datetime_as_string(local.astype('datetime64[us]'), unit='us').tolist()
+    return [datetime.fromtimestamp(float(t)).isoformat() for t in epochs]
+
+def decode_records(buffer, sensor_names: List[str], count: int) -> Dict:
+    """Decode count fixed-width records from a buffer into a columnar block"""
+    if count <= 0:
+        return {"timestamps": [], "sensors": {name: [] for name in sensor_names}}
+    
+    # Values are stored as float32; the sensors report millidegrees, so rounding
+    # to 3 decimals gives back the logged value instead of e.g. 25.562000274658203
+    if np is not None:
+        dtype = np.dtype([('t', '<f8'), ('v', '<f4', (len(sensor_names),))])
+        records = np.frombuffer(buffer, dtype=dtype, count=count)
+        sensors = {}
+        for i, name in enumerate(sensor_names):
+            column = np.round(records['v'][:, i].astype(np.float64), VALUE_DECIMALS)
+            values = column.tolist()
+            if np.isnan(column).any():
+                values = [None if v != v else v for v in values]
+            sensors[name] = values
+        return {"timestamps": _epochs_to_iso(records['t']), "sensors": sensors}
+    
+    record = record_struct(len(sensor_names))
+    rows = list(record.iter_unpack(buffer[:count * record.size]))
+    sensors = {
+        name: [None if row[i + 1] != row[i + 1] else round(row[i + 1], VALUE_DECIMALS) for row in rows]
+        for i, name in enumerate(sensor_names)
+    }
+    return {"timestamps": _epochs_to_iso([row[0] for row in rows]), "sensors": sensors}
+
+def read_columns(filepath: str) -> Dict:
+    """Read a binary log into a columnar block ({"timestamps": [...], "sensors": {name: [...]}})"""
+    with open(filepath, 'rb') as f:
+        header = read_header(f)
+        if header is None:
+            return {"timestamps": [], "sensors": {}}
+        names = header["sensors"]
+        size = os.fstat(f.fileno()).st_size
+        count = (size - header["header_length"]) // header["record_size"]  # ignore a torn last record
+        if count <= 0:
+            return {"timestamps": [], "sensors": {name: [] for name in names}}
+        
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            body = memoryview(mapped)[header["header_length"]:header["header_length"] + count * header["record_size"]]
+            try:
+                return decode_records(body, names, count)
+            finally:
+                body.release()
+
+class BinaryLogWriter:
+    """Append readings to a binary log file, creating its header on first use"""
+    
+    def __init__(self, filepath: str, sensor_names: List[str]):
+        self.filepath = filepath
+        self.sensor_names = list(sensor_names)
+        
+        if os.path.exists(filepath) and os.path.getsize(filepath) > 0:
+            with open(filepath, 'rb') as f:
+                header = read_header(f)
+            if header is None:
+                raise ValueError(f"{filepath} is not a binary temperature log")
+            if header["sensors"] != self.sensor_names:
+                # Keep the file's existing column layout; new sensors are not recorded in it
+                logger.warning(f"Sensor set differs from {os.path.basename(filepath)} header, "
+                               f"using its columns: {header['sensors']}")
+                self.sensor_names = header["sensors"]
+            self._trim_torn_record(header)
+        else:
+            with open(filepath, 'wb') as f:
+                f.write(encode_header(self.sensor_names))
+        
+        self._record = record_struct(len(self.sensor_names))
+    
+    def _trim_torn_record(self, header: Dict):
+        """Drop a partially written last record (e.g. after a power cut) so appends stay aligned"""
+        size = os.path.getsize(self.filepath)
+        excess = (size - header["header_length"]) % header["record_size"]
+        if excess:
+            with open(self.filepath, 'r+b') as f:
+                f.truncate(size - excess)
+    
+    def encode(self, reading: Dict) -> bytes:
+        """Pack a reading using this file's column layout"""
+        return encode_record(reading, self.sensor_names, self._record)
+    
+    def append(self, reading: Dict):
+        """Append one reading"""
+        with open(self.filepath, 'ab') as f:
+            f.write(self.encode(reading))
+
+def binary_path_for(jsonl_path: str) -> str:
+    """Path of the binary companion of a JSONL log file"""
+    return os.path.splitext(jsonl_path)[0] + '.bin'
+
+def convert_jsonl_file(jsonl_path: str, bin_path: Optional[str] = None) -> str:
+    """Write the readings of a JSONL log file to a new binary log file"""
+    bin_path = bin_path or binary_path_for(jsonl_path)
+    readings = []
+    with open(jsonl_path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                readings.append(json.loads(line))
+    
+    names = {}
+    for reading in readings:
+        for name in reading.get('sensors') or {}:
+            names[name] = True
+    sensor_names = list(names)
+    record = record_struct(len(sensor_names))
+    
+    tmp_path = bin_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(encode_header(sensor_names))
+        f.write(b"".join(encode_record(r, sensor_names, record) for r in readings))
+    os.replace(tmp_path, bin_path)
+    return bin_path
@@ -6,9 +6,21 @@ load_dotenv()
 class Config:
     SENSOR_READ_INTERVAL = 5  # seconds
     SENSORS_COUNT = 4
+    SENSOR_PARALLEL_READS = os.getenv('SENSOR_PARALLEL_READS', 'True').lower() == 'true'
+    SENSOR_READ_TIMEOUT = float(os.getenv('SENSOR_READ_TIMEOUT', '2.0'))  # seconds per sensor
     
     DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
     LOG_FILE_PREFIX = "temp_log"
+    LOG_FLUSH_READINGS = int(os.getenv('LOG_FLUSH_READINGS', '6'))  # readings buffered per write
+    LOG_FLUSH_INTERVAL = float(os.getenv('LOG_FLUSH_INTERVAL', '30'))  # seconds; most data lost on a power cut
+    LOG_FSYNC = os.getenv('LOG_FSYNC', 'True').lower() == 'true'  # fsync after each batch
+    RECENT_READINGS_MAX = int(os.getenv('RECENT_READINGS_MAX', '0'))  # in-memory ring buffer, 0 = one hour
+    SHARED_RING = os.getenv('SHARED_RING', 'True').lower() == 'true'  # publish recent readings in shared memory
+    SHARED_RING_PATH = os.getenv('SHARED_RING_PATH', '')  # default: /dev/shm/solar-monitor-recent.ring
+    SHARED_RING_HOURS = int(os.getenv('SHARED_RING_HOURS', '48'))
+    LOG_BINARY = os.getenv('LOG_BINARY', 'False').lower() == 'true'  # also write fixed-width .bin logs
+    ARCHIVE_CLOSED_HOURS = os.getenv('ARCHIVE_CLOSED_HOURS', 'False').lower() == 'true'  # gzip closed hours, fold past days into daily archives
+    ROLLUP_INDEX_FILE = "hourly_rollups.jsonl"  # per-file summaries written at rotation, kept in DATA_DIR
     
     GOOGLE_DRIVE_FOLDER_ID = os.getenv('GOOGLE_DRIVE_FOLDER_ID')
     GOOGLE_CREDENTIALS_FILE = os.getenv('GOOGLE_CREDENTIALS_FILE', 'credentials.json')
@@ -16,8 +28,34 @@ class Config:
     RCLONE_REMOTE = os.getenv('RCLONE_REMOTE', 'gdrive')
     RCLONE_FOLDER = os.getenv('RCLONE_FOLDER', 'solar-monitor-data')
     
+    RCLONE_CHECK_TTL = int(os.getenv('RCLONE_CHECK_TTL', '86400'))  # seconds to trust a successful rclone/folder check
+    
+    UPLOAD_QUEUE_FILE = "upload_queue.json"  # pending uploads, kept in DATA_DIR
+    UPLOAD_RETRY_INTERVAL = int(os.getenv('UPLOAD_RETRY_INTERVAL', '300'))  # seconds
+    UPLOAD_MANIFEST_FILE = "upload_manifest.json"  # uploaded files with size/mtime, kept in DATA_DIR
+    UPLOAD_MAX_ATTEMPTS = int(os.getenv('UPLOAD_MAX_ATTEMPTS', '4'))
+    UPLOAD_BACKOFF_BASE = 2.0  # seconds, doubled after each failed attempt
+    UPLOAD_BACKOFF_MAX = 60.0  # seconds
+    
     WEB_HOST = "0.0.0.0"
     WEB_PORT = 8080
+    # Each open live stream holds a worker thread, so the pool is sized from the stream limit
+    SSE_MAX_CLIENTS = max(1, int(os.getenv('SSE_MAX_CLIENTS', '4')))  # open live streams; more get 503
+    WEB_REQUEST_THREADS = max(1, int(os.getenv('WEB_REQUEST_THREADS', '4')))  # threads always left for other requests
+    WEB_THREADS = SSE_MAX_CLIENTS + WEB_REQUEST_THREADS  # request worker threads
+    WEB_BACKLOG = int(os.getenv('WEB_BACKLOG', '64'))  # connections queued for a worker before new ones get 503
+    WEB_CONNECTION_LIMIT = int(os.getenv('WEB_CONNECTION_LIMIT', '100'))  # open connections (waitress)
+    WEB_KEEPALIVE_TIMEOUT = int(os.getenv('WEB_KEEPALIVE_TIMEOUT', '30'))  # seconds before an idle connection is closed
+    WEB_SHUTDOWN_TIMEOUT = int(os.getenv('WEB_SHUTDOWN_TIMEOUT', '10'))  # seconds to finish requests on shutdown
+    
+    API_COMPRESSION = os.getenv('API_COMPRESSION', 'True').lower() == 'true'  # gzip/brotli for /api/ responses
+    API_COMPRESS_MIN_BYTES = int(os.getenv('API_COMPRESS_MIN_BYTES', '1024'))  # smaller payloads are sent as-is
+    
+    DATA_CACHE_MAX_MB = int(os.getenv('DATA_CACHE_MAX_MB', '64'))  # parsed hourly files kept in memory
+    SPECTROGRAM_CACHE_MB = int(os.getenv('SPECTROGRAM_CACHE_MB', '32'))  # computed spectrograms kept in memory
+    SSE_BACKLOG = int(os.getenv('SSE_BACKLOG', '120'))  # readings kept for /api/stream reconnects
+    SSE_POLL_INTERVAL = float(os.getenv('SSE_POLL_INTERVAL', '1.0'))  # seconds between checks for a new reading
+    LIVE_SOCKET_PATH = os.getenv('LIVE_SOCKET_PATH', '')  # monitor -> web app readings; default: /dev/shm/solar-monitor-live.sock
     
     WEB_DEBUG = os.getenv('WEB_DEBUG', 'False').lower() == 'true'
     WEB_USERNAME = os.getenv('WEB_USERNAME', 'admin')
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+In-process cache of parsed hourly data files for the web interface
+"""
+
+import os
+import json
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from binary_log import read_columns as read_binary_columns
+from log_archive import is_archived, read_archived, split_member_path
+
+logger = logging.getLogger(__name__)
+
+# Rough per-value cost of the parsed columns, used for the memory cap
+_TIMESTAMP_BYTES = 80
+_VALUE_BYTES = 32
+
+def empty_columns() -> Dict:
+    """Return an empty columnar block"""
+    return {"timestamps": [], "sensors": {}}
+
+def append_readings(columns: Dict, readings: List[Dict]) -> Dict:
+    """Return a new columnar block with readings appended (the input block is not modified)
+    
+    Sensors missing from a reading are stored as None so every column stays
+    aligned with the timestamps.
+    """
+    timestamps = list(columns["timestamps"])
+    sensors = {name: list(values) for name, values in columns["sensors"].items()}
+    
+    for reading in readings:
+        row = len(timestamps)
+        timestamps.append(reading.get("timestamp"))
+        values = reading.get("sensors") or {}
+        for name, value in values.items():
+            if name not in sensors:
+                sensors[name] = [None] * row
+            sensors[name].append(value)
+        for name, column in sensors.items():
+            if len(column) == row:
+                column.append(None)
+    
+    return {"timestamps": timestamps, "sensors": sensors}
+
+def columns_to_readings(columns: Dict, start: int = 0, end: Optional[int] = None) -> List[Dict]:
+    """Convert a columnar block (or a slice of it) back to the row format served by the API"""
+    timestamps = columns["timestamps"]
+    end = len(timestamps) if end is None else end
+    sensors = list(columns["sensors"].items())
+    return [
+        {"timestamp": timestamps[i], "sensors": {name: values[i] for name, values in sensors}}
+        for i in range(start, end)
+    ]
+
+def _parse_jsonl(data: bytes, filepath: str) -> List[Dict]:
+    readings = []
+    for line in data.splitlines():
+        line = line.strip()
+        if line:
+            try:
+                readings.append(json.loads(line))
+            except ValueError as e:
+                logger.error(f"Error parsing line in {filepath}: {e}")
+    return readings
+
+class HourlyFileCache:
+    """LRU cache of parsed hourly files in columnar form
+    
+    Entries are validated against the file's size and mtime. Closed hourly
+    files never change, so they are parsed once; the active file only has its
+    newly appended lines parsed on each access. The total estimated size of
+    the cached columns is kept under max_bytes by evicting the least recently
+    used files.
+    """
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _estimate_bytes(columns: Dict) -> int:
+        rows = len(columns["timestamps"])
+        return rows * (_TIMESTAMP_BYTES + _VALUE_BYTES * len(columns["sensors"]))
+    
+    def get(self, filepath: str) -> Dict:
+        """Return the parsed columns for a data file, reading only what changed since last time"""
+        try:
+            stat = os.stat(split_member_path(filepath)[0])
+        except OSError as e:
+            logger.error(f"Error reading {filepath}: {e}")
+            return empty_columns()
+        
+        with self._lock:
+            entry = self._entries.get(filepath)
+            if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                self._entries.move_to_end(filepath)
+                self.hits += 1
+                return entry["columns"]
+            
+            self.misses += 1
+            try:
+                if entry and filepath.endswith('.jsonl') and stat.st_size >= entry["offset"]:
+                    columns, offset = self._read_tail(filepath, entry["columns"], entry["offset"])
+                else:
+                    columns, offset = self._read_full(filepath)
+            except Exception as e:
+                logger.error(f"Error reading {filepath}: {e}")
+                return entry["columns"] if entry else empty_columns()
+            
+            self._store(filepath, {
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "offset": offset,
+                "columns": columns,
+                "nbytes": self._estimate_bytes(columns),
+            })
+            return columns
+    
+    def _read_full(self, filepath: str):
+        if is_archived(filepath):
+            # Gzipped hours and daily archive members are closed, so they are always read whole
+            data = read_archived(filepath)
+            return append_readings(empty_columns(), _parse_jsonl(data, filepath)), len(data)
+        
+        if filepath.endswith('.bin'):
+            # Fixed-width records are mapped straight into columns, nothing to parse
+            return read_binary_columns(filepath), os.path.getsize(filepath)
+        
+        with open(filepath, 'rb') as f:
+            data = f.read()
+        
+        if not filepath.endswith('.jsonl'):
+            return append_readings(empty_columns(), json.loads(data)), len(data)
+        
+        # Only consume complete lines; a partially written last line is picked up next time
+        complete = data.rfind(b'\n') + 1
+        return append_readings(empty_columns(), _parse_jsonl(data[:complete], filepath)), complete
+    
+    def _read_tail(self, filepath: str, columns: Dict, offset: int):
+        with open(filepath, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        
+        complete = data.rfind(b'\n') + 1
+        if not complete:
+            return columns, offset
+        return append_readings(columns, _parse_jsonl(data[:complete], filepath)), offset + complete
+    
+    def _store(self, filepath: str, entry: Dict):
+        old = self._entries.pop(filepath, None)
+        if old:
+            self.current_bytes -= old["nbytes"]
+        
+        self._entries[filepath] = entry
+        self.current_bytes += entry["nbytes"]
+        
+        while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+            evicted_path, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= evicted["nbytes"]
+            logger.debug(f"Evicted {os.path.basename(evicted_path)} from data cache")
+    
+    def stats(self) -> Dict:
+        """Return cache occupancy and hit statistics"""
+        with self._lock:
+            return {
+                "files": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+class LogTailReader:
+    """Return the last complete reading of a growing JSONL file at constant cost
+    
+    Keeps the byte offset reached on the previous call, so each call only looks
+    at what was appended since then. On the first call (or after the file
+    changes) it seeks backwards from EOF to the last newline instead of reading
+    the whole file.
+    """
+    
+    INITIAL_CHUNK = 4096
+    
+    def __init__(self):
+        self._path = None
+        self._offset = 0
+        self._latest = None
+        self._lock = threading.Lock()
+    
+    def latest(self, filepath: str) -> Optional[Dict]:
+        """Return the most recent complete reading in filepath, or None if it has none"""
+        try:
+            size = os.path.getsize(filepath)
+        except OSError as e:
+            logger.error(f"Error reading {filepath}: {e}")
+            return None
+        
+        with self._lock:
+            if filepath != self._path or size < self._offset:
+                self._path = filepath
+                self._offset = 0
+                self._latest = None
+            
+            if size > self._offset:
+                try:
+                    reading, self._offset = self._read_last_line(filepath, size)
+                    if reading is not None:
+                        self._latest = reading
+                except Exception as e:
+                    logger.error(f"Error reading {filepath}: {e}")
+            
+            return self._latest
+    
+    def _read_last_line(self, filepath: str, size: int):
+        chunk = self.INITIAL_CHUNK
+        with open(filepath, 'rb') as f:
+            while True:
+                start = max(self._offset, size - chunk)
+                f.seek(start)
+                data = f.read(size - start)
+                
+                end = data.rfind(b'\n')
+                if end == -1:
+                    if start == self._offset:
+                        return None, self._offset  # only a partial line so far
+                    chunk *= 2
+                    continue
+                
+                complete = data[:end + 1].rstrip()
+                if complete:
+                    line_start = complete.rfind(b'\n') + 1
+                    # self._offset always sits on a line boundary
+                    if line_start > 0 or start == self._offset:
+                        return json.loads(complete[line_start:]), start + end + 1
+                elif start == self._offset:
+                    return None, start + end + 1
+                
+                chunk *= 2
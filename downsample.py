@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Downsampling of temperature readings for charting
+"""
+
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from itertools import islice
+from operator import le
+from typing import Dict, List, Optional, Tuple
+from data_cache import append_readings, columns_to_readings, empty_columns
+
+DOWNSAMPLE_METHODS = ('minmax', 'lttb')
+
+def _epoch_seconds(timestamps: List[str]) -> List[float]:
+    return [datetime.fromisoformat(t).timestamp() for t in timestamps]
+
+def _span_seconds(timestamps: List[str]) -> float:
+    return (datetime.fromisoformat(timestamps[-1]) - datetime.fromisoformat(timestamps[0])).total_seconds()
+
+def _sensor_names(readings: List[Dict]) -> List[str]:
+    names = {}
+    for reading in readings:
+        for name in reading.get('sensors', {}):
+            names[name] = True
+    return list(names)
+
+def _runs_by_edges(timestamps: List[str], bucket_seconds: float) -> List[Tuple[int, int, int]]:
+    """(bucket, start, end) row runs of time-ordered ISO timestamps
+    
+    The bucket edges are formatted as timestamps and found by bisection, so
+    the rows themselves are never parsed.
+    """
+    origin = datetime.fromisoformat(timestamps[0])
+    runs = []
+    start, bucket = 0, 0
+    while start < len(timestamps):
+        edge = (origin + timedelta(seconds=(bucket + 1) * bucket_seconds)).isoformat()
+        end = bisect_left(timestamps, edge, start)
+        if end > start:
+            runs.append((bucket, start, end))
+            start = end
+            bucket += 1
+        else:
+            # Skip the empty buckets of a gap in one step
+            offset = (datetime.fromisoformat(timestamps[start]) - origin).total_seconds()
+            bucket = max(bucket + 1, int(offset // bucket_seconds))
+    return runs
+
+def _runs_by_keys(timestamps: List[str], bucket_seconds: float) -> List[Tuple[int, int, int]]:
+    """(bucket, start, end) row runs of timestamps in any order; a bucket may have several runs"""
+    times = _epoch_seconds(timestamps)
+    origin = min(times)
+    keys = [int((t - origin) // bucket_seconds) for t in times]
+    runs = []
+    start = 0
+    for end in range(1, len(keys) + 1):
+        if end == len(keys) or keys[end] != keys[start]:
+            runs.append((keys[start], start, end))
+            start = end
+    return runs
+
+def bucket_columns(columns: Dict, bucket_seconds: float) -> List[Dict]:
+    """Aggregate a columnar block into fixed-width time buckets
+    
+    Each bucket is returned as a reading stamped with its first timestamp whose
+    sensor values are the bucket means, with per-sensor "min"/"max" and the
+    number of raw readings ("count") alongside. Each run of rows in one bucket
+    is taken as a slice per sensor, so values are summed and compared in bulk
+    rather than row by row.
+    """
+    timestamps = columns["timestamps"]
+    if not timestamps or bucket_seconds <= 0:
+        return columns_to_readings(columns)
+    
+    names = list(columns["sensors"])
+    if all(map(le, timestamps, islice(timestamps, 1, None))):
+        runs = _runs_by_edges(timestamps, bucket_seconds)
+    else:
+        runs = _runs_by_keys(timestamps, bucket_seconds)  # legacy files aren't known to be in order
+    
+    buckets = {}
+    for key, start, end in runs:
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = {"timestamp": timestamps[start], "count": 0,
+                                     "sums": dict.fromkeys(names, 0.0), "counts": dict.fromkeys(names, 0),
+                                     "min": dict.fromkeys(names), "max": dict.fromkeys(names)}
+        elif timestamps[start] < bucket["timestamp"]:
+            bucket["timestamp"] = timestamps[start]
+        
+        bucket["count"] += end - start
+        for name, column in columns["sensors"].items():
+            values = column[start:end]
+            if None in values:
+                values = [v for v in values if v is not None]
+                if not values:
+                    continue
+            bucket["sums"][name] += sum(values)
+            bucket["counts"][name] += len(values)
+            low, high = min(values), max(values)
+            if bucket["min"][name] is None or low < bucket["min"][name]:
+                bucket["min"][name] = low
+            if bucket["max"][name] is None or high > bucket["max"][name]:
+                bucket["max"][name] = high
+    
+    return [
+        {
+            "timestamp": b["timestamp"],
+            "sensors": {n: (b["sums"][n] / b["counts"][n] if b["counts"][n] else None) for n in names},
+            "min": b["min"],
+            "max": b["max"],
+            "count": b["count"],
+        }
+        for _, b in sorted(buckets.items())
+    ]
+
+def bucket_readings(readings: List[Dict], bucket_seconds: float) -> List[Dict]:
+    """Aggregate readings into fixed-width time buckets (see bucket_columns)"""
+    if not readings or bucket_seconds <= 0:
+        return list(readings)
+    return bucket_columns(append_readings(empty_columns(), readings), bucket_seconds)
+
+def lttb_indices(xs: List[float], ys: List[Optional[float]], threshold: int) -> List[int]:
+    """Largest-Triangle-Three-Buckets: pick `threshold` indices that preserve the series' shape
+    
+    Missing (None) values are skipped.
+    """
+    points = [i for i, y in enumerate(ys) if y is not None]
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return points
+    
+    selected = [points[0]]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = points[0]
+    
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle vertex
+        next_start = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        next_points = points[next_start:next_end] or [points[-1]]
+        avg_x = sum(xs[p] for p in next_points) / len(next_points)
+        avg_y = sum(ys[p] for p in next_points) / len(next_points)
+        
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        best, best_area = points[start], -1.0
+        for p in points[start:end]:
+            area = abs((xs[a] - avg_x) * (ys[p] - ys[a]) - (xs[a] - xs[p]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = p, area
+        selected.append(best)
+        a = best
+    
+    selected.append(points[-1])
+    return selected
+
+def _row_means(series: List[List[Optional[float]]]) -> List[Optional[float]]:
+    means = []
+    for row in zip(*series):
+        values = [v for v in row if v is not None]
+        means.append(sum(values) / len(values) if values else None)
+    return means
+
+def _lttb_keep(xs: List[float], series: List[List[Optional[float]]], max_points: int) -> List[int]:
+    """Rows to keep so the series fit in max_points (at least 3)
+    
+    Each series gets an equal share of the rows and LTTB is run per series,
+    the selected rows merged. When the share would be under the 3 points LTTB
+    needs, it is run once on the mean of the series instead.
+    """
+    per_series = max_points // len(series)
+    if per_series < 3:
+        series = [_row_means(series)]
+        per_series = max_points
+    
+    keep = set()
+    for ys in series:
+        keep.update(lttb_indices(xs, ys, per_series))
+    return sorted(keep)
+
+def lttb_readings(readings: List[Dict], max_points: int) -> List[Dict]:
+    """Downsample readings with LTTB to at most max_points rows, one share per sensor"""
+    names = _sensor_names(readings)
+    if len(readings) <= max_points or not names:
+        return list(readings)
+    if max_points < 3:
+        return [readings[0], readings[-1]][:max_points]
+    
+    xs = _epoch_seconds([r['timestamp'] for r in readings])
+    series = [[r.get('sensors', {}).get(name) for r in readings] for name in names]
+    return [readings[i] for i in _lttb_keep(xs, series, max_points)]
+
+def lttb_columns(columns: Dict, max_points: int) -> List[Dict]:
+    """lttb_readings for a columnar block: only the selected rows are turned into readings"""
+    timestamps = columns["timestamps"]
+    if len(timestamps) <= max_points or not columns["sensors"]:
+        return columns_to_readings(columns)
+    if max_points < 3:
+        keep = [0, len(timestamps) - 1][:max_points]
+    else:
+        keep = _lttb_keep(_epoch_seconds(timestamps), list(columns["sensors"].values()), max_points)
+    return [columns_to_readings(columns, i, i + 1)[0] for i in keep]
+
+def _plan(count: int, span: float, max_points: Optional[int], resolution: Optional[float],
+          method: str) -> Optional[Tuple[str, float]]:
+    """How to reduce count readings spanning span seconds: ('lttb', rows), ('buckets', seconds) or None"""
+    if method == 'lttb':
+        if resolution:
+            max_points = min(max_points or count, int(span // resolution) + 1)
+        return ('lttb', max_points) if max_points else None
+    
+    if not resolution:
+        if not max_points or count <= max_points:
+            return None
+        resolution = span / max_points * 1.0001  # keep the last reading inside the final bucket
+    return ('buckets', resolution)
+
+def downsample_readings(readings: List[Dict], max_points: Optional[int] = None,
+                        resolution: Optional[float] = None, method: str = 'minmax') -> List[Dict]:
+    """Reduce readings to roughly max_points rows, or to one row per `resolution` seconds"""
+    if len(readings) < 2:
+        return list(readings)
+    
+    plan = _plan(len(readings), _span_seconds([readings[0]['timestamp'], readings[-1]['timestamp']]),
+                 max_points, resolution, method)
+    if plan is None:
+        return list(readings)
+    if plan[0] == 'lttb':
+        return lttb_readings(readings, plan[1])
+    return bucket_readings(readings, plan[1])
+
+def downsample_columns(columns: Dict, max_points: Optional[int] = None,
+                       resolution: Optional[float] = None, method: str = 'minmax') -> List[Dict]:
+    """downsample_readings for a columnar block, without building a dict per raw reading"""
+    timestamps = columns["timestamps"]
+    if len(timestamps) < 2:
+        return columns_to_readings(columns)
+    
+    plan = _plan(len(timestamps), _span_seconds(timestamps), max_points, resolution, method)
+    if plan is None:
+        return columns_to_readings(columns)
+    if plan[0] == 'lttb':
+        return lttb_columns(columns, plan[1])
+    return bucket_columns(columns, plan[1])
@@ -4,35 +4,63 @@ Google Drive uploader for temperature log files using rclone
 """
 
 import os
+import json
+import glob
+import time
+import tempfile
 import subprocess
 import logging
-from typing import Optional
+from typing import Dict, Iterable, List, Optional
 from config import Config
 
 logger = logging.getLogger(__name__)
 
 class GoogleDriveUploader:
-    """Handle Google Drive file uploads using rclone"""
+    """Handle Google Drive file uploads using rclone
+    
+    Meant to be long-lived: the "rclone installed / remote folder exists" check
+    is cached for RCLONE_CHECK_TTL seconds and only re-run after a failed
+    upload, so a normal upload costs a single rclone transfer.
+    """
     
     def __init__(self):
         self.config = Config()
         self.gdrive_remote = "gdrive"  # Default rclone remote name for Google Drive
         self.gdrive_folder = "solar-monitor-data"  # Folder name in Google Drive
-        self._check_rclone()
+        self.manifest_file = os.path.join(self.config.DATA_DIR, self.config.UPLOAD_MANIFEST_FILE)
+        self.manifest = self._load_manifest()
+        self._ready_until = None  # monotonic time until which the last successful check is trusted
+    
+    def _ensure_ready(self) -> bool:
+        """Return the cached rclone/folder check, re-running it when expired or invalidated"""
+        if self._ready_until is not None and time.monotonic() < self._ready_until:
+            return True
+        
+        if self._check_rclone():
+            self._ready_until = time.monotonic() + self.config.RCLONE_CHECK_TTL
+            return True
+        
+        self._ready_until = None
+        return False
+    
+    def _invalidate_ready(self):
+        """Force the rclone/folder check to run again before the next upload"""
+        self._ready_until = None
     
-    def _check_rclone(self):
+    def _check_rclone(self) -> bool:
         """Check if rclone is installed and configured"""
         try:
             result = subprocess.run(["rclone", "version"], capture_output=True, text=True)
             if result.returncode == 0:
                 logger.info("rclone is available")
-                self._ensure_folder()
+                return self._ensure_folder()
             else:
                 logger.warning("rclone is not installed. Install with: sudo apt install rclone")
         except FileNotFoundError:
             logger.warning("rclone is not installed. Install with: sudo apt install rclone")
         except Exception as e:
             logger.error(f"Error checking rclone: {e}")
+        return False
     
     def _ensure_folder(self):
         """Ensure Google Drive folder exists"""
@@ -53,30 +81,126 @@ class GoogleDriveUploader:
             logger.error(f"Error ensuring Google Drive folder: {e}")
             return False
     
+    def _load_manifest(self) -> Dict[str, Dict]:
+        """Load the record of already-uploaded files"""
+        try:
+            with open(self.manifest_file, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error(f"Error reading upload manifest {self.manifest_file}: {e}")
+            return {}
+    
+    def _save_manifest(self):
+        """Persist the upload manifest (write-then-rename so a power cut can't corrupt it)"""
+        tmp_path = self.manifest_file + '.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(self.manifest, f)
+            os.replace(tmp_path, self.manifest_file)
+        except Exception as e:
+            logger.error(f"Error writing upload manifest {self.manifest_file}: {e}")
+    
+    @staticmethod
+    def _file_signature(file_path: str) -> Dict:
+        stat = os.stat(file_path)
+        return {'size': stat.st_size, 'mtime': stat.st_mtime}
+    
+    def is_uploaded(self, file_path: str) -> bool:
+        """True if this exact version of the file (same size and mtime) was already uploaded"""
+        entry = self.manifest.get(os.path.basename(file_path))
+        try:
+            return entry == self._file_signature(file_path)
+        except OSError:
+            return False
+    
+    def mark_uploaded(self, file_paths: Iterable[str]):
+        """Record files as uploaded (e.g. an archive built from already-uploaded hours)"""
+        for file_path in file_paths:
+            try:
+                self.manifest[os.path.basename(file_path)] = self._file_signature(file_path)
+            except OSError:
+                pass
+        self._save_manifest()
+    
+    def _rclone_copy(self, args: List[str], description: str) -> bool:
+        """Run an rclone copy, retrying with exponential backoff"""
+        if not self._ensure_ready():
+            logger.error(f"Skipping upload of {description}: rclone or Google Drive remote not available")
+            return False
+        
+        delay = self.config.UPLOAD_BACKOFF_BASE
+        for attempt in range(1, self.config.UPLOAD_MAX_ATTEMPTS + 1):
+            try:
+                result = subprocess.run(["rclone", "copy"] + args, capture_output=True, text=True)
+                if result.returncode == 0:
+                    return True
+                error = result.stderr.strip()
+            except FileNotFoundError:
+                logger.error("rclone is not installed. Install with: sudo apt install rclone")
+                self._invalidate_ready()
+                return False
+            except Exception as e:
+                error = str(e)
+            
+            if attempt < self.config.UPLOAD_MAX_ATTEMPTS:
+                logger.warning(f"Upload of {description} failed (attempt {attempt}), retrying in {delay:.0f}s: {error}")
+                time.sleep(delay)
+                delay = min(delay * 2, self.config.UPLOAD_BACKOFF_MAX)
+            else:
+                logger.error(f"Failed to upload {description} after {attempt} attempts: {error}")
+        
+        self._invalidate_ready()
+        return False
+    
     def upload_file(self, file_path: str) -> Optional[str]:
         """Upload a file to Google Drive using rclone"""
         if not os.path.exists(file_path):
             logger.error(f"File not found: {file_path}")
             return None
         
-        try:
-            filename = os.path.basename(file_path)
-            
-            result = subprocess.run(
-                ["rclone", "copy", file_path, f"{self.gdrive_remote}:{self.gdrive_folder}/"],
-                capture_output=True, text=True
-            )
+        filename = os.path.basename(file_path)
+        if self.is_uploaded(file_path):
+            logger.info(f"{filename} already uploaded, skipping")
+            return filename
+        
+        if self._rclone_copy([file_path, f"{self.gdrive_remote}:{self.gdrive_folder}/"], filename):
+            self.mark_uploaded([file_path])
+            logger.info(f"Successfully uploaded {filename} to Google Drive")
+            return filename
+        return None
+    
+    def upload_files(self, file_paths: List[str]) -> List[str]:
+        """Upload several files with a single rclone call per directory, skipping already-uploaded ones"""
+        pending = [p for p in file_paths if os.path.exists(p) and not self.is_uploaded(p)]
+        uploaded = [p for p in file_paths if os.path.exists(p) and p not in pending]
+        
+        by_dir = {}
+        for file_path in pending:
+            by_dir.setdefault(os.path.dirname(os.path.abspath(file_path)), []).append(file_path)
+        
+        for source_dir, paths in by_dir.items():
+            if len(paths) == 1:
+                if self.upload_file(paths[0]):
+                    uploaded.append(paths[0])
+                continue
             
-            if result.returncode == 0:
-                logger.info(f"Successfully uploaded {filename} to Google Drive")
-                return filename
-            else:
-                logger.error(f"Failed to upload {filename}: {result.stderr}")
-                return None
-                
-        except Exception as e:
-            logger.error(f"Error during upload of {file_path}: {e}")
-            return None
+            with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+                f.write('\n'.join(os.path.basename(p) for p in paths) + '\n')
+                files_from = f.name
+            try:
+                if self._rclone_copy(
+                    [source_dir, f"{self.gdrive_remote}:{self.gdrive_folder}/", "--files-from", files_from],
+                    f"{len(paths)} files"
+                ):
+                    self.mark_uploaded(paths)
+                    uploaded.extend(paths)
+                    logger.info(f"Successfully uploaded {len(paths)} files to Google Drive")
+            finally:
+                os.remove(files_from)
+        
+        return uploaded
     
     def list_files(self, folder_id: Optional[str] = None) -> list:
         """List files in Google Drive folder using rclone"""
@@ -107,19 +231,35 @@ class GoogleDriveUploader:
             logger.error(f"Error listing files: {e}")
             return []
     
-    def sync_pending_files(self, data_dir: str):
-        """Upload any pending files to Google Drive"""
+    def sync_pending_files(self, data_dir: str, exclude: Optional[Iterable[str]] = None) -> List[str]:
+        """Upload only the log files missing from the manifest, in one batched rclone call"""
         try:
-            import glob
+            exclude = {os.path.abspath(p) for p in (exclude or []) if p}
             
-            json_files = glob.glob(os.path.join(data_dir, "temp_log_*.json"))
-            jsonl_files = glob.glob(os.path.join(data_dir, "temp_log_*.jsonl"))
+            all_files = sorted(glob.glob(os.path.join(data_dir, f"{self.config.LOG_FILE_PREFIX}_*.json*")))
+            candidates = [
+                p for p in all_files
+                if os.path.abspath(p) not in exclude
+                and not p.endswith('_current.json') and not p.endswith('_current.jsonl')
+                and not p.endswith('.tmp')
+            ]
             
-            all_files = json_files + jsonl_files
+            # Forget files that retention cleanup has already removed locally
+            local_names = {os.path.basename(p) for p in all_files}
+            stale = [name for name in self.manifest if name not in local_names]
+            for name in stale:
+                del self.manifest[name]
+            if stale:
+                self._save_manifest()
             
-            for file_path in all_files:
-                if not file_path.endswith('_current.json') and not file_path.endswith('_current.jsonl'):
-                    self.upload_file(file_path)
+            missing = [p for p in candidates if not self.is_uploaded(p)]
+            if not missing:
+                logger.info("All local data files already uploaded")
+                return []
+            
+            logger.info(f"Catching up {len(missing)} file(s) not yet uploaded")
+            return self.upload_files(missing)
                     
         except Exception as e:
             logger.error(f"Error syncing pending files: {e}")
+            return []
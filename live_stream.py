@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Server-Sent Events fan-out of new readings to dashboard clients
+"""
+
+import os
+import json
+import time
+import socket
+import tempfile
+import threading
+import logging
+from collections import deque
+from typing import Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# One reading as JSON is a few hundred bytes; anything larger isn't ours
+MAX_DATAGRAM_BYTES = 65536
+
+def default_socket_path() -> str:
+    """Location of the live reading socket: /dev/shm where available, else the temp directory"""
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(base, 'solar-monitor-live.sock')
+
+class ReadingPublisher:
+    """Hand each logged reading to the web app's broadcaster as one Unix datagram
+    
+    Used by the monitor, whose log files are written in batches: the web app
+    sees a reading the moment it is taken rather than when its batch is
+    flushed. Sending never blocks; if the web app isn't listening (or is too
+    busy to keep up) the reading is simply not pushed and the dashboard picks
+    it up from the files or the shared ring instead.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+    
+    def publish(self, reading: Dict):
+        try:
+            self._socket.sendto(json.dumps(reading).encode('utf-8'), self.path)
+        except OSError:
+            pass  # no web app listening, or its receive queue is full
+    
+    def close(self):
+        self._socket.close()
+
+class ReadingBroadcaster:
+    """Push each new reading to every connected client from a single source
+    
+    One background thread polls the latest reading (a cheap call when the
+    monitor publishes to the shared ring) and appends new ones to a bounded
+    backlog. Client generators wait on a condition and send whatever is newer
+    than the last event they delivered, so the source is read once no matter
+    how many dashboards are open. Event ids are the reading timestamps, which
+    lets a reconnecting client resume from its Last-Event-ID; readings older
+    than the backlog can be filled in by the optional history callback.
+    
+    Every open stream holds a web server thread, so at most max_clients are
+    served at once (0 for no limit); events() returns None beyond that. The
+    polling thread only runs while at least one client is connected.
+    
+    With listen(), readings the monitor sends through a ReadingPublisher are
+    published as they arrive, so none are lost to the polling interval or to
+    the monitor's batched log writes.
+    """
+    
+    def __init__(self, latest: Callable[[], Optional[Dict]], backlog: int, poll_interval: float,
+                 keepalive: float = 15.0, history: Optional[Callable[[str], List[Dict]]] = None,
+                 max_clients: int = 0):
+        self._latest = latest
+        self._history = history
+        self.poll_interval = poll_interval
+        self.keepalive = keepalive
+        self.max_clients = max_clients
+        self._backlog = deque(maxlen=backlog)
+        self._condition = threading.Condition()
+        self._thread = None
+        self._closed = False
+        self.clients = 0
+    
+    def _start_polling(self):
+        """Start the polling thread if it isn't running (must hold the condition)"""
+        if self._thread is not None:
+            return
+        # Readings published while nobody was connected were never seen: drop the stale
+        # backlog so resuming clients are caught up from history instead
+        self._backlog.clear()
+        self._thread = threading.Thread(target=self._run, name="sse-broadcaster", daemon=True)
+        self._thread.start()
+    
+    def close(self):
+        """End all client streams (server shutdown)"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+    
+    def listen(self, path: str):
+        """Receive readings pushed by the monitor on a Unix datagram socket at path"""
+        try:
+            os.unlink(path)  # left over from a previous run
+        except FileNotFoundError:
+            pass
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        listener.bind(path)
+        listener.settimeout(1.0)  # check for close() now and then
+        threading.Thread(target=self._receive, args=(listener, path), name="sse-receiver", daemon=True).start()
+    
+    def _receive(self, listener: socket.socket, path: str):
+        try:
+            while not self._closed:
+                try:
+                    data = listener.recv(MAX_DATAGRAM_BYTES)
+                except socket.timeout:
+                    continue
+                try:
+                    reading = json.loads(data)
+                except ValueError as e:
+                    logger.error(f"Ignoring malformed live reading: {e}")
+                    continue
+                self.publish(reading)
+        finally:
+            listener.close()
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+    
+    def _run(self):
+        while True:
+            with self._condition:
+                if self._closed or self.clients == 0:
+                    self._thread = None  # the next client starts a new one
+                    return
+            try:
+                reading = self._latest()
+            except Exception as e:
+                logger.error(f"Error polling latest reading for live stream: {e}")
+                reading = None
+            
+            if reading is not None:
+                self.publish(reading)
+            time.sleep(self.poll_interval)
+    
+    def publish(self, reading: Dict):
+        """Add a reading to the backlog and wake the clients, unless it was already sent"""
+        with self._condition:
+            if self._backlog and reading["timestamp"] <= self._backlog[-1]["timestamp"]:
+                return
+            self._backlog.append(reading)
+            self._condition.notify_all()
+    
+    def _readings_after(self, last_id: Optional[str]) -> List[Dict]:
+        """Backlog entries newer than last_id (must hold the condition)"""
+        if last_id is None:
+            return list(self._backlog)[-1:]
+        return [r for r in self._backlog if r["timestamp"] > last_id]
+    
+    @staticmethod
+    def format_event(reading: Dict) -> str:
+        return f"id: {reading['timestamp']}\nevent: reading\ndata: {json.dumps(reading)}\n\n"
+    
+    def events(self, last_id: Optional[str] = None) -> Optional[Iterator[str]]:
+        """Open the SSE stream for one client, or return None if max_clients are connected
+        
+        A new client gets the latest reading straight away; a reconnecting
+        one gets everything it missed since last_id. The client counts as
+        connected until the stream is closed, even if it is never iterated.
+        """
+        with self._condition:
+            if self._closed or (self.max_clients and self.clients >= self.max_clients):
+                return None
+            self.clients += 1
+            self._start_polling()
+        return _ClientStream(self._stream(last_id), self._release)
+    
+    def _release(self):
+        with self._condition:
+            self.clients -= 1
+    
+    def _stream(self, last_id: Optional[str]) -> Iterator[str]:
+        yield f"retry: {int(self.poll_interval * 1000) + 1000}\n\n"
+        
+        if last_id is not None and self._history is not None:
+            with self._condition:
+                oldest = self._backlog[0]["timestamp"] if self._backlog else None
+            if oldest is None or last_id < oldest:
+                # Missed more than the backlog holds
+                for reading in self._history(last_id):
+                    if oldest is None or reading["timestamp"] < oldest:
+                        yield self.format_event(reading)
+                        last_id = reading["timestamp"]
+        
+        while not self._closed:
+            with self._condition:
+                pending = self._readings_after(last_id)
+                if not pending and not self._closed:
+                    self._condition.wait(self.keepalive)
+                    pending = self._readings_after(last_id)
+            
+            if self._closed:
+                break
+            if not pending:
+                yield ": keepalive\n\n"  # comment line; also detects clients that went away
+                continue
+            for reading in pending:
+                yield self.format_event(reading)
+                last_id = reading["timestamp"]
+
+class _ClientStream:
+    """Iterator over one client's events that gives up its slot exactly once when closed
+    
+    The WSGI server closes the response iterable when the client goes away
+    or the server stops, whether or not iteration ever started.
+    """
+    
+    def __init__(self, events: Iterator[str], release: Callable[[], None]):
+        self._events = events
+        self._release = release
+        self._lock = threading.Lock()
+        self._released = False
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self) -> str:
+        return next(self._events)
+    
+    def close(self):
+        self._events.close()
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._release()
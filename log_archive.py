@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Compressed archival of closed hourly log files
+
+Closed hours are first gzipped individually (temp_log_YYYYmmdd_HH.jsonl.gz),
+which is also what gets uploaded. Once a day is over its hourly files are
+concatenated into one daily archive (temp_log_YYYYmmdd.jsonl.gz). Each hour
+stays its own gzip member, and a small index (temp_log_YYYYmmdd.idx) records
+where each member starts, so a single hour can be read back without
+decompressing the rest of the day. A concatenation of gzip members is still a
+valid gzip file, so the archive can be read with plain zcat as well.
+"""
+
+import os
+import re
+import json
+import gzip
+import logging
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HOUR_ARCHIVE_SUFFIX = '.jsonl.gz'
+INDEX_SUFFIX = '.idx'
+MEMBER_SEPARATOR = '#'
+
+def _fsync_write(path: str, data: bytes):
+    with open(path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+def compress_hour(jsonl_path: str) -> str:
+    """Gzip a closed hourly JSONL file next to itself and remove the original
+
+    If the hour was already compressed once (the monitor restarted within the
+    hour and logged more readings to a fresh file), the new readings are
+    appended as another gzip member instead of replacing what was archived.
+    """
+    gz_path = jsonl_path + '.gz'
+    stat = os.stat(jsonl_path)
+    with open(jsonl_path, 'rb') as f:
+        data = f.read()
+
+    archived = b''
+    if os.path.exists(gz_path):
+        with open(gz_path, 'rb') as f:
+            archived = f.read()
+        logger.info(f"{os.path.basename(gz_path)} already exists, appending {len(data)} bytes as a new member")
+
+    tmp_path = gz_path + '.tmp'
+    _fsync_write(tmp_path, archived + gzip.compress(data, compresslevel=9, mtime=0))
+    # Keep the original mtime so readers can still compare it with a .bin companion
+    os.utime(tmp_path, (stat.st_atime, stat.st_mtime))
+    os.replace(tmp_path, gz_path)
+    os.remove(jsonl_path)
+
+    logger.info(f"Compressed {os.path.basename(jsonl_path)}: {len(data)} -> {os.path.getsize(gz_path)} bytes")
+    return gz_path
+
+def day_archive_path(data_dir: str, prefix: str, day: str) -> str:
+    """Path of the daily archive for day (YYYYmmdd)"""
+    return os.path.join(data_dir, f"{prefix}_{day}{HOUR_ARCHIVE_SUFFIX}")
+
+def index_path_for(archive_path: str) -> str:
+    """Path of the member index of a daily archive"""
+    return archive_path[:-len(HOUR_ARCHIVE_SUFFIX)] + INDEX_SUFFIX
+
+def load_index(archive_path: str) -> Dict[str, List[int]]:
+    """Return {hour file stem: [offset, length, ...]} for a daily archive
+
+    An hour folded in more than once (see compress_hour) has one
+    offset/length pair per part, in the order they were appended.
+    """
+    try:
+        with open(index_path_for(archive_path), 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.error(f"Error reading archive index for {archive_path}: {e}")
+        return {}
+
+def _ranges(location: List[int]) -> List[Tuple[int, int]]:
+    """Split an index entry into its (offset, length) pairs"""
+    return list(zip(location[::2], location[1::2]))
+
+def _contains_part(archive, location: List[int], member: bytes) -> bool:
+    """True if one of the parts at location in the open archive is exactly member"""
+    for offset, length in _ranges(location):
+        if length == len(member):
+            archive.seek(offset)
+            if archive.read(length) == member:
+                return True
+    return False
+
+def find_closed_days(data_dir: str, prefix: str, today: Optional[date] = None) -> Dict[str, List[str]]:
+    """Group compressed hourly files of days before today as {YYYYmmdd: [paths]}"""
+    today_str = (today or date.today()).strftime("%Y%m%d")
+    pattern = re.compile(rf"^{re.escape(prefix)}_(\d{{8}})_\d{{2}}{re.escape(HOUR_ARCHIVE_SUFFIX)}$")
+    days = {}
+    for filename in sorted(os.listdir(data_dir)):
+        match = pattern.match(filename)
+        if match and match.group(1) < today_str:
+            days.setdefault(match.group(1), []).append(os.path.join(data_dir, filename))
+    return days
+
+def append_to_day_archive(archive_path: str, hourly_paths: List[str]) -> str:
+    """Append gzipped hourly files to a daily archive as separate members and update its index
+
+    The hourly files are left in place; the caller removes them once it has
+    recorded what it needs (e.g. upload state).
+    """
+    index = load_index(archive_path)
+    offset = os.path.getsize(archive_path) if os.path.exists(archive_path) else 0
+
+    # Drop bytes from an interrupted earlier append that never made it into the index
+    indexed_end = max((start + length for location in index.values() for start, length in _ranges(location)),
+                      default=0)
+    if offset != indexed_end:
+        with open(archive_path, 'r+b' if offset else 'wb') as f:
+            f.truncate(indexed_end)
+        offset = indexed_end
+
+    with open(archive_path, 'a+b') as archive:
+        for hourly_path in hourly_paths:
+            with open(hourly_path, 'rb') as f:
+                member = f.read()
+            stem = os.path.basename(hourly_path)[:-len(HOUR_ARCHIVE_SUFFIX)]
+            location = index.get(stem, [])
+            if _contains_part(archive, location, member):
+                continue  # already folded in by an earlier pass that stopped before removing the file
+            archive.write(member)
+            # An hour archived again after a restart keeps its earlier part(s)
+            index[stem] = location + [offset, len(member)]
+            offset += len(member)
+        archive.flush()
+        os.fsync(archive.fileno())
+
+    tmp_path = index_path_for(archive_path) + '.tmp'
+    _fsync_write(tmp_path, json.dumps(index, sort_keys=True).encode('utf-8'))
+    os.replace(tmp_path, index_path_for(archive_path))
+    return archive_path
+
+def member_path(archive_path: str, member: str) -> str:
+    """Virtual path addressing one hour inside a daily archive (archive#temp_log_YYYYmmdd_HH)"""
+    return f"{archive_path}{MEMBER_SEPARATOR}{member}"
+
+def split_member_path(path: str) -> Tuple[str, Optional[str]]:
+    """Split a virtual member path into (archive path, member name); member is None for real files"""
+    if MEMBER_SEPARATOR in os.path.basename(path):
+        archive_path, member = path.rsplit(MEMBER_SEPARATOR, 1)
+        return archive_path, member
+    return path, None
+
+def read_member(archive_path: str, member: str) -> bytes:
+    """Decompress a single hour from a daily archive"""
+    location = load_index(archive_path).get(member)
+    if location is None:
+        raise KeyError(f"{member} not found in {os.path.basename(archive_path)}")
+    parts = []
+    with open(archive_path, 'rb') as f:
+        for offset, length in _ranges(location):
+            f.seek(offset)
+            parts.append(gzip.decompress(f.read(length)))
+    return b''.join(parts)
+
+def is_archived(path: str) -> bool:
+    """True for a gzipped hourly file or a member path inside a daily archive"""
+    return path.endswith('.gz') or split_member_path(path)[1] is not None
+
+def read_archived(path: str) -> bytes:
+    """Return the uncompressed JSONL content of a gzipped hour or an archive member"""
+    archive_path, member = split_member_path(path)
+    if member is None:
+        with gzip.open(path, 'rb') as f:
+            return f.read()
+    return read_member(archive_path, member)
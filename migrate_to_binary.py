@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Migration script to create fixed-width binary (.bin) companions for existing JSONL data files
+The web interface reads .bin files without per-row JSON and timestamp parsing
+"""
+
+import os
+import glob
+from datetime import datetime
+from config import Config
+from binary_log import binary_path_for, convert_jsonl_file
+
+def migrate_jsonl_to_binary(jsonl_file_path: str) -> str:
+    """Convert a JSONL file to the binary format, keeping the original"""
+    try:
+        bin_file_path = convert_jsonl_file(jsonl_file_path)
+        print(f"Converted: {jsonl_file_path} -> {bin_file_path}")
+        return bin_file_path
+    
+    except Exception as e:
+        print(f"Error converting {jsonl_file_path}: {e}")
+        return None
+
+def main():
+    """Main migration function"""
+    config = Config()
+    
+    if not os.path.exists(config.DATA_DIR):
+        print(f"Data directory {config.DATA_DIR} does not exist")
+        return
+    
+    jsonl_files = sorted(glob.glob(os.path.join(config.DATA_DIR, f"{config.LOG_FILE_PREFIX}_*.jsonl")))
+    
+    # The file for the current hour is still being written; the monitor converts it itself
+    # when started with LOG_BINARY=True. Older files are closed, the newest one included.
+    current = os.path.join(config.DATA_DIR, f"{config.LOG_FILE_PREFIX}_{datetime.now().strftime('%Y%m%d_%H')}.jsonl")
+    pending = [f for f in jsonl_files if f != current and not os.path.exists(binary_path_for(f))]
+    
+    if not pending:
+        print("No JSONL data files found to convert")
+        return
+    
+    print(f"Found {len(pending)} JSONL files to convert")
+    
+    converted_count = 0
+    
+    for jsonl_file in pending:
+        if migrate_jsonl_to_binary(jsonl_file):
+            converted_count += 1
+    
+    print(f"\nConversion complete!")
+    print(f"- Created {converted_count} binary data files")
+    print(f"- Original JSONL files are kept and are still the files uploaded to Google Drive")
+    print(f"\nSet LOG_BINARY=True in your .env file so the monitor keeps writing binary files.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Hourly rollups of temperature readings
+
+When the monitor closes an hourly log file it appends one compact summary
+line per file (count, sum, sum of squares, min, max, first and last value per
+sensor) to an index file in DATA_DIR. Summaries and coarse charts for long
+periods are then built from these instead of rescanning raw readings.
+"""
+
+import os
+import json
+import math
+import threading
+import logging
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_index_lock = threading.Lock()
+
+def compute_rollup(readings: Iterable[Dict]) -> Dict:
+    """Compute a rollup from readings in time order"""
+    rollup = {"start": None, "end": None, "count": 0, "sensors": {}}
+    
+    for reading in readings:
+        if rollup["start"] is None:
+            rollup["start"] = reading.get('timestamp')
+        rollup["end"] = reading.get('timestamp')
+        rollup["count"] += 1
+        
+        for name, value in (reading.get('sensors') or {}).items():
+            if value is None:
+                continue
+            stats = rollup["sensors"].get(name)
+            if stats is None:
+                rollup["sensors"][name] = {"count": 1, "sum": value, "sumsq": value * value,
+                                           "min": value, "max": value, "first": value, "last": value}
+                continue
+            stats["count"] += 1
+            stats["sum"] += value
+            stats["sumsq"] += value * value
+            if value < stats["min"]:
+                stats["min"] = value
+            if value > stats["max"]:
+                stats["max"] = value
+            stats["last"] = value
+    
+    return rollup
+
+def merge_rollups(rollups: Iterable[Dict]) -> Dict:
+    """Combine rollups (given in time order) into one covering their whole span"""
+    merged = {"start": None, "end": None, "count": 0, "sensors": {}}
+    
+    for rollup in rollups:
+        if not rollup or not rollup.get("count"):
+            continue
+        if merged["start"] is None:
+            merged["start"] = rollup["start"]
+        merged["end"] = rollup["end"]
+        merged["count"] += rollup["count"]
+        
+        for name, stats in rollup["sensors"].items():
+            current = merged["sensors"].get(name)
+            if current is None:
+                merged["sensors"][name] = dict(stats)
+                continue
+            current["count"] += stats["count"]
+            current["sum"] += stats["sum"]
+            current["sumsq"] += stats["sumsq"]
+            current["min"] = min(current["min"], stats["min"])
+            current["max"] = max(current["max"], stats["max"])
+            current["last"] = stats["last"]
+    
+    return merged
+
+def bucket_rollups(rollups: Iterable[Dict], hours: int) -> List[Dict]:
+    """Merge rollups (given in time order) into buckets of `hours` clock hours
+    
+    Buckets are aligned to the clock - counted from 0001-01-01, so a divisor
+    of 24 starts buckets at midnight - rather than to positions in the list,
+    so a missing hour or a restart splitting one doesn't shift every later
+    bucket.
+    """
+    buckets = []
+    current = None
+    for rollup in rollups:
+        start = datetime.strptime(rollup["start"][:13], "%Y-%m-%dT%H")
+        key = (start.toordinal() * 24 + start.hour) // hours
+        if key != current:
+            buckets.append([])
+            current = key
+        buckets[-1].append(rollup)
+    return [merge_rollups(bucket) for bucket in buckets]
+
+def rollup_to_reading(rollup: Dict) -> Dict:
+    """Express a rollup as a chart row: mean per sensor plus min/max, like a downsampled bucket"""
+    sensors = rollup["sensors"]
+    return {
+        "timestamp": rollup["start"],
+        "sensors": {n: s["sum"] / s["count"] for n, s in sensors.items()},
+        "min": {n: s["min"] for n, s in sensors.items()},
+        "max": {n: s["max"] for n, s in sensors.items()},
+        "count": rollup["count"],
+    }
+
+def append_rollup(index_path: str, filename: str, size: int, rollup: Dict):
+    """Append the rollup for a closed data file to the index"""
+    record = dict(rollup, file=filename, size=size)
+    with _index_lock:
+        with open(index_path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+def load_rollups(index_path: str) -> Dict[str, Dict]:
+    """Load the index as {data file name: rollup}; later lines win for the same file"""
+    rollups = {}
+    try:
+        with open(index_path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                    rollups[record["file"]] = record
+                except (ValueError, KeyError) as e:
+                    logger.warning(f"Skipping bad rollup line in {index_path}: {e}")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.error(f"Error reading rollup index {index_path}: {e}")
+    return rollups
+
+def prune_rollups(index_path: str, keep: Callable[[str], bool]) -> int:
+    """Rewrite the index without rollups whose file name fails `keep`; returns how many were dropped"""
+    with _index_lock:
+        rollups = load_rollups(index_path)
+        kept = [r for name, r in sorted(rollups.items()) if keep(name)]
+        dropped = len(rollups) - len(kept)
+        if dropped:
+            tmp_path = index_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                for record in kept:
+                    f.write(json.dumps(record) + '\n')
+            os.replace(tmp_path, index_path)
+        return dropped
+
+class RollupIndex:
+    """Read-side view of the rollup index, reloaded only when the file changes"""
+    
+    def __init__(self, index_path: str):
+        self.index_path = index_path
+        self._signature = None
+        self._rollups = {}
+        self._lock = threading.Lock()
+    
+    def get(self, filename: str, size: Optional[int] = None) -> Optional[Dict]:
+        """Return the rollup for a data file, or None if missing or stale (file has grown since)"""
+        rollup = self.all().get(filename)
+        if rollup is not None and size is not None and rollup.get("size") != size:
+            return None
+        return rollup
+    
+    def all(self) -> Dict[str, Dict]:
+        """Return every rollup keyed by data file name"""
+        try:
+            stat = os.stat(self.index_path)
+            signature = (stat.st_size, stat.st_mtime)
+        except OSError:
+            return {}
+        
+        with self._lock:
+            if signature != self._signature:
+                self._rollups = load_rollups(self.index_path)
+                self._signature = signature
+            return self._rollups
+
+def summarize_rollup(rollup: Dict) -> Dict[str, Dict]:
+    """Per-sensor min/max/avg/stddev/current as served by /api/summary"""
+    summary = {}
+    for name, stats in rollup["sensors"].items():
+        if not stats["count"]:
+            continue
+        mean = stats["sum"] / stats["count"]
+        summary[name] = {
+            "min": stats["min"],
+            "max": stats["max"],
+            "avg": mean,
+            "stddev": math.sqrt(max(0.0, stats["sumsq"] / stats["count"] - mean * mean)),
+            "current": stats["last"],
+        }
+    return summary
@@ -4,23 +4,44 @@ Convenience script to run both the sensor monitor and web interface
 """
 
 import subprocess
-import threading
 import time
 import signal
 import sys
 
-def run_sensor_monitor():
-    """Run the sensor monitoring service"""
-    subprocess.run([sys.executable, "sensor_monitor.py"])
+# Seconds each child gets to flush logs / finish requests after SIGTERM before it is killed
+SHUTDOWN_TIMEOUT = 20
 
-def run_web_app():
-    """Run the web interface"""
-    subprocess.run([sys.executable, "web_app.py"])
+processes = []
+stopping = False
+
+def start_process(script: str) -> subprocess.Popen:
+    """Start one of the services as a child process"""
+    # Own session: a Ctrl+C reaches only this script, which then stops the children in order
+    process = subprocess.Popen([sys.executable, script], start_new_session=True)
+    processes.append(process)
+    return process
+
+def stop_processes():
+    """Ask every child to stop (SIGTERM), then kill those that don't in time"""
+    for process in processes:
+        if process.poll() is None:
+            process.terminate()
+    
+    deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+    for process in processes:
+        try:
+            process.wait(max(0.0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            print(f"\n{process.args[-1]} did not stop in time, killing it")
+            process.kill()
+            process.wait()
 
 def signal_handler(sig, frame):
-    """Handle Ctrl+C gracefully"""
-    print("\nShutting down solar monitor...")
-    sys.exit(0)
+    """Handle Ctrl+C and systemd stop (SIGTERM) gracefully"""
+    global stopping
+    if not stopping:
+        stopping = True
+        print("\nShutting down solar monitor...")
 
 def main():
     """Main entry point"""
@@ -28,16 +49,20 @@ def main():
     print("Press Ctrl+C to stop")
     
     signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
     
-    monitor_thread = threading.Thread(target=run_sensor_monitor, daemon=True)
-    monitor_thread.start()
+    start_process("sensor_monitor.py")
     
     time.sleep(2)
     
-    try:
-        run_web_app()
-    except KeyboardInterrupt:
-        print("\nShutting down...")
+    start_process("web_app.py")
+    
+    # If either service exits on its own, stop the other too so systemd restarts both
+    while not stopping and all(process.poll() is None for process in processes):
+        time.sleep(1)
+    
+    stop_processes()
+    sys.exit(0 if stopping else 1)
 
 if __name__ == "__main__":
     main()
@@ -8,11 +8,23 @@ import time
 import json
 import os
 import glob
+import math
+import signal
+import sys
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import schedule
 from config import Config
+from upload_worker import UploadWorker
+from rollups import append_rollup, compute_rollup, prune_rollups
+from binary_log import BinaryLogWriter, binary_path_for, convert_jsonl_file
+from log_writer import BufferedLogWriter
+from log_archive import read_archived
+from shared_ring import SharedRingWriter, default_ring_path
+from live_stream import ReadingPublisher, default_socket_path
 
 logging.basicConfig(
     level=logging.INFO,
@@ -67,6 +79,65 @@ class SimulatedSensor:
             logger.error(f"Error reading sensor {self.sensor_id}: {e}")
             return None
 
+class IntervalScheduler:
+    """Fixed-cadence tick scheduler driven by the monotonic clock.
+    
+    Deadlines advance by exactly one interval each tick, so time spent reading,
+    logging and uploading does not accumulate as drift. When the loop falls a
+    whole interval or more behind, the missed ticks are dropped (coalesced into
+    the next one) instead of being run back-to-back.
+    """
+    
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next_deadline = None
+        self.reset_stats()
+    
+    def reset_stats(self):
+        """Clear jitter/overrun counters"""
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped_ticks = 0
+        self.max_jitter = 0.0
+        self._total_jitter = 0.0
+    
+    def wait(self) -> float:
+        """Block until the next tick is due and return how late it fired (seconds)"""
+        now = time.monotonic()
+        
+        if self._next_deadline is None:
+            self._next_deadline = now
+        else:
+            self._next_deadline += self.interval
+            
+            if now > self._next_deadline:
+                self.overruns += 1
+                missed = int((now - self._next_deadline) // self.interval)
+                if missed:
+                    self.skipped_ticks += missed
+                    self._next_deadline += missed * self.interval
+                    logger.warning(f"Monitoring loop fell behind, skipped {missed} tick(s)")
+            
+            delay = self._next_deadline - now
+            if delay > 0:
+                time.sleep(delay)
+        
+        jitter = max(0.0, time.monotonic() - self._next_deadline)
+        self.ticks += 1
+        self._total_jitter += jitter
+        self.max_jitter = max(self.max_jitter, jitter)
+        return jitter
+    
+    def stats(self) -> Dict:
+        """Return cadence statistics since the last reset"""
+        return {
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "skipped_ticks": self.skipped_ticks,
+            "mean_jitter": self._total_jitter / self.ticks if self.ticks else 0.0,
+            "max_jitter": self.max_jitter,
+        }
+
 class SolarMonitor:
     """Main monitoring class"""
     
@@ -74,10 +145,48 @@ class SolarMonitor:
         self.config = Config()
         self.sensors = self._initialize_sensors()
         self.current_log_file = None
-        self.current_log_data = []
+        self.log_writer = None
+        self.binary_writer = None
+        self.binary_log = None
+        # Most recent readings, kept across file rotations (one hour's worth by default)
+        self.recent_readings = deque(
+            maxlen=self.config.RECENT_READINGS_MAX or math.ceil(3600 / self.config.SENSOR_READ_INTERVAL)
+        )
+        self.read_latencies = {}
+        self._pending_reads = {}
+        self._read_executor = None
+        self.loop_scheduler = IntervalScheduler(self.config.SENSOR_READ_INTERVAL)
+        
+        if self.config.SENSOR_PARALLEL_READS and len(self.sensors) > 1:
+            self._read_executor = ThreadPoolExecutor(
+                max_workers=len(self.sensors), thread_name_prefix="sensor-read"
+            )
+            logger.info(f"Parallel sensor sampling enabled ({len(self.sensors)} workers, "
+                        f"{self.config.SENSOR_READ_TIMEOUT:.1f}s timeout per sensor)")
         
         os.makedirs(self.config.DATA_DIR, exist_ok=True)
         
+        self.shared_ring = None
+        if self.config.SHARED_RING:
+            ring_path = self.config.SHARED_RING_PATH or default_ring_path()
+            try:
+                self.shared_ring = SharedRingWriter(
+                    ring_path,
+                    [sensor.sensor_id for sensor in self.sensors],
+                    math.ceil(self.config.SHARED_RING_HOURS * 3600 / self.config.SENSOR_READ_INTERVAL)
+                )
+                logger.info(f"Publishing the last {self.config.SHARED_RING_HOURS}h of readings to {ring_path}")
+            except Exception as e:
+                logger.error(f"Error creating shared ring buffer {ring_path}: {e}")
+        
+        # Push every reading to the web app's live stream as it is taken, ahead of the batched log writes
+        self.live_publisher = ReadingPublisher(self.config.LIVE_SOCKET_PATH or default_socket_path())
+        
+        self.upload_worker = UploadWorker(
+            cleanup=self._cleanup_old_files,
+            active_file=lambda: self.current_log_file
+        )
+        
         self._create_new_log_file()
         
     def _scan_for_real_sensors(self) -> List[str]:
@@ -162,15 +271,54 @@ class SolarMonitor:
         """Create a new hourly log file"""
         timestamp = datetime.now().strftime("%Y%m%d_%H")
         filename = f"{self.config.LOG_FILE_PREFIX}_{timestamp}.jsonl"  # .jsonl for line-delimited JSON
+        self._close_writers()
         self.current_log_file = os.path.join(self.config.DATA_DIR, filename)
-        self.current_log_data = []
         
-        if not os.path.exists(self.current_log_file):
-            with open(self.current_log_file, 'w') as f:
-                pass  # Create empty file
+        try:
+            # Opened once per hour in append mode (creating the file); readings are written in batches
+            self.log_writer = self._open_writer(self.current_log_file)
+        except Exception as e:
+            logger.error(f"Error opening log file {self.current_log_file}: {e}")
+        
+        if self.config.LOG_BINARY:
+            self._open_binary_log()
         
         logger.info(f"Created new log file: {self.current_log_file}")
     
+    def _open_binary_log(self):
+        """Open the fixed-width binary companion of the current JSONL file"""
+        bin_path = binary_path_for(self.current_log_file)
+        try:
+            # Restarted mid-hour with binary logging newly enabled: carry over what's already logged
+            if not os.path.exists(bin_path) and os.path.getsize(self.current_log_file) > 0:
+                convert_jsonl_file(self.current_log_file, bin_path)
+            self.binary_writer = BinaryLogWriter(bin_path, [sensor.sensor_id for sensor in self.sensors])
+            self.binary_log = self._open_writer(bin_path)
+        except Exception as e:
+            logger.error(f"Error opening binary log {bin_path}: {e}")
+            self.binary_writer = None
+            self.binary_log = None
+    
+    def _open_writer(self, filepath: str) -> BufferedLogWriter:
+        return BufferedLogWriter(
+            filepath,
+            batch_size=self.config.LOG_FLUSH_READINGS,
+            flush_interval=self.config.LOG_FLUSH_INTERVAL,
+            fsync=self.config.LOG_FSYNC
+        )
+    
+    def _close_writers(self):
+        """Flush buffered readings and close the current log files"""
+        for writer in (self.log_writer, self.binary_log):
+            if writer:
+                try:
+                    writer.close()
+                except Exception as e:
+                    logger.error(f"Error closing log file {writer.filepath}: {e}")
+        self.log_writer = None
+        self.binary_writer = None
+        self.binary_log = None
+    
     def read_sensors(self) -> Dict:
         """Read all temperature sensors"""
         timestamp = datetime.now().isoformat()
@@ -179,43 +327,137 @@ class SolarMonitor:
             "sensors": {}
         }
         
+        if self._read_executor:
+            temps = self._read_sensors_parallel()
+        else:
+            temps = self._read_sensors_serial()
+        
         for sensor in self.sensors:
-            temp = sensor.get_temperature()
-            readings["sensors"][sensor.sensor_id] = temp
+            readings["sensors"][sensor.sensor_id] = temps.get(sensor.sensor_id)
             
         return readings
     
+    @staticmethod
+    def _timed_read(sensor) -> Tuple[Optional[float], float]:
+        """Read one sensor and return (temperature, latency in seconds)"""
+        start = time.monotonic()
+        temp = sensor.get_temperature()
+        return temp, time.monotonic() - start
+    
+    def _read_sensors_serial(self) -> Dict[str, Optional[float]]:
+        """Read sensors one after another (each DS18B20 blocks ~750 ms converting)"""
+        temps = {}
+        for sensor in self.sensors:
+            temp, latency = self._timed_read(sensor)
+            temps[sensor.sensor_id] = temp
+            self.read_latencies[sensor.sensor_id] = latency
+        return temps
+    
+    def _read_sensors_parallel(self) -> Dict[str, Optional[float]]:
+        """Read all sensors concurrently so a cycle costs roughly one conversion time"""
+        timeout = self.config.SENSOR_READ_TIMEOUT
+        futures = {}
+        
+        for sensor in self.sensors:
+            pending = self._pending_reads.get(sensor.sensor_id)
+            if pending is not None and not pending.done():
+                # Previous read is still hung on the bus - don't stack another one behind it
+                logger.warning(f"Sensor {sensor.sensor_id} still busy from previous cycle, skipping")
+                continue
+            futures[sensor.sensor_id] = self._read_executor.submit(self._timed_read, sensor)
+        
+        self._pending_reads.update(futures)
+        
+        # All reads start together, so one shared deadline gives each sensor its own timeout
+        deadline = time.monotonic() + timeout
+        temps = {}
+        for sensor_id, future in futures.items():
+            try:
+                temp, latency = future.result(timeout=max(0.0, deadline - time.monotonic()))
+                temps[sensor_id] = temp
+                self.read_latencies[sensor_id] = latency
+            except FuturesTimeout:
+                logger.warning(f"Sensor {sensor_id} did not respond within {timeout:.1f}s")
+                self.read_latencies[sensor_id] = None
+            except Exception as e:
+                logger.error(f"Error reading sensor {sensor_id}: {e}")
+                self.read_latencies[sensor_id] = None
+        
+        return temps
+    
     def log_reading(self, reading: Dict):
-        """Log a temperature reading using append-only method to reduce SD card wear"""
-        self.current_log_data.append(reading)
+        """Log a temperature reading using append-only method to reduce SD card wear
+        
+        Readings are buffered and written in batches (see LOG_FLUSH_READINGS and
+        LOG_FLUSH_INTERVAL), so at most one durability window is lost on a power cut.
+        """
+        self.recent_readings.append(reading)
+        self.live_publisher.publish(reading)
         
         try:
-            with open(self.current_log_file, 'a') as f:
-                f.write(json.dumps(reading) + '\n')
+            if self.log_writer is None:
+                self.log_writer = self._open_writer(self.current_log_file)
+            self.log_writer.write((json.dumps(reading) + '\n').encode('utf-8'))
         except Exception as e:
             logger.error(f"Error writing to log file: {e}")
+        
+        if self.binary_log:
+            try:
+                self.binary_log.write(self.binary_writer.encode(reading))
+            except Exception as e:
+                logger.error(f"Error writing to binary log file: {e}")
+        
+        if self.shared_ring:
+            try:
+                self.shared_ring.append(reading)
+            except Exception as e:
+                logger.error(f"Error publishing reading to shared ring: {e}")
     
     def close_current_log(self):
-        """Close current log file and prepare for upload"""
+        """Rotate to a new log file and hand the closed one to the upload worker"""
         if self.current_log_file and os.path.exists(self.current_log_file):
             logger.info(f"Closing log file: {self.current_log_file}")
             
-            try:
-                from google_drive_uploader import GoogleDriveUploader
-                uploader = GoogleDriveUploader()
-                uploader.upload_file(self.current_log_file)
-                logger.info(f"Uploaded {self.current_log_file} to Google Drive")
-            except Exception as e:
-                logger.error(f"Failed to upload to Google Drive: {e}")
+            stats = self.loop_scheduler.stats()
+            logger.info(f"Sampling cadence - {stats['ticks']} ticks, {stats['overruns']} overruns, "
+                        f"{stats['skipped_ticks']} skipped, jitter mean {stats['mean_jitter'] * 1000:.1f}ms "
+                        f"max {stats['max_jitter'] * 1000:.1f}ms")
+            self.loop_scheduler.reset_stats()
+            
+            closed_file = self.current_log_file
+            self._create_new_log_file()  # flushes and closes the current file first
+            self._write_rollup(closed_file)
+            
+            # Upload and cleanup involve rclone/network I/O - keep them off the sampling thread
+            self.upload_worker.enqueue(closed_file)
+            self.upload_worker.request_cleanup()
+    
+    def _write_rollup(self, log_file: str):
+        """Append the closed file's hourly rollup (count/sum/min/max/first/last per sensor) to the index"""
+        try:
+            readings = []
+            if os.path.exists(log_file + '.gz'):
+                # The monitor restarted within the hour after its first part was compressed
+                readings = [json.loads(line) for line in read_archived(log_file + '.gz').splitlines() if line.strip()]
+            with open(log_file, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        readings.append(json.loads(line))
             
-            self._cleanup_old_files()
-            self._create_new_log_file()
+            index_path = os.path.join(self.config.DATA_DIR, self.config.ROLLUP_INDEX_FILE)
+            append_rollup(index_path, os.path.basename(log_file), os.path.getsize(log_file),
+                          compute_rollup(readings))
+        except Exception as e:
+            logger.error(f"Error writing hourly rollup for {log_file}: {e}")
     
     def _cleanup_old_files(self):
         """Remove data files older than 90 days to save SD card space"""
         try:
             cutoff_date = datetime.now() - timedelta(days=90)
             data_files = glob.glob(os.path.join(self.config.DATA_DIR, f"{self.config.LOG_FILE_PREFIX}_*.json*"))  # Match both .json and .jsonl
+            data_files += glob.glob(os.path.join(self.config.DATA_DIR, f"{self.config.LOG_FILE_PREFIX}_*.bin"))
+            data_files += glob.glob(os.path.join(self.config.DATA_DIR, f"{self.config.LOG_FILE_PREFIX}_*.idx"))  # daily archive indexes
             
             deleted_count = 0
             for file_path in data_files:
@@ -238,6 +480,11 @@ class SolarMonitor:
             if deleted_count > 0:
                 logger.info(f"Cleanup completed: removed {deleted_count} files older than 90 days")
                 
+                index_path = os.path.join(self.config.DATA_DIR, self.config.ROLLUP_INDEX_FILE)
+                # Archived hours no longer exist as files of their own, so prune by date
+                cutoff_str = cutoff_date.strftime("%Y%m%d")
+                prune_rollups(index_path, lambda name: name[len(self.config.LOG_FILE_PREFIX) + 1:][:8] > cutoff_str)
+                
         except Exception as e:
             logger.error(f"Error during file cleanup: {e}")
     
@@ -249,8 +496,12 @@ class SolarMonitor:
         
         schedule.every().hour.at(":00").do(self.close_current_log)
         
+        self.upload_worker.start()
+        
         try:
             while True:
+                self.loop_scheduler.wait()
+                
                 reading = self.read_sensors()
                 
                 self.log_reading(reading)
@@ -258,19 +509,33 @@ class SolarMonitor:
                 sensor_temps = [f"{k}: {v:.1f}°C" for k, v in reading["sensors"].items() if v is not None]
                 logger.info(f"Readings - {', '.join(sensor_temps)}")
                 
-                schedule.run_pending()
+                latencies = [f"{k}: {v * 1000:.0f}ms" for k, v in self.read_latencies.items() if v is not None]
+                logger.debug(f"Read latency - {', '.join(latencies)}")
                 
-                time.sleep(self.config.SENSOR_READ_INTERVAL)
+                schedule.run_pending()
                 
         except KeyboardInterrupt:
             logger.info("Monitoring stopped by user")
         except Exception as e:
             logger.error(f"Monitoring error: {e}")
         finally:
-            self.close_current_log()
+            # The monitor may be back within the same hour and carry on appending to the
+            # current file, so it is not handed to the upload worker here: it is picked up
+            # once the hour is over (rotation, or the worker's catch-up after a restart)
+            self._close_writers()
+            if self.current_log_file and os.path.exists(self.current_log_file):
+                self._write_rollup(self.current_log_file)
+            if self.shared_ring:
+                self.shared_ring.close()
+            self.live_publisher.close()
+            self.upload_worker.stop()
+            if self._read_executor:
+                self._read_executor.shutdown(wait=False, cancel_futures=True)
 
 def main():
     """Main entry point"""
+    # systemd stops the service with SIGTERM; exit through the loop's cleanup so buffered readings are written
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     monitor = SolarMonitor()
     monitor.run_monitoring_loop()
 
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Ring buffer of recent readings in shared memory
+
+The monitor writes every reading into a fixed-size file in /dev/shm (a RAM
+backed tmpfs), which the web process maps read-only, so recent data is served
+without touching the SD card or parsing anything.
+
+Layout:
+    header:  b"SLRR" | version (uint16) | sensor count (uint16) | capacity (uint32)
+             | header length (uint32) | sequence (uint32), then the sensor names
+             encoded as in binary_log, zero-padded to a multiple of 8 bytes
+    records: capacity fixed-width records in the binary_log layout
+             (float64 epoch seconds | float32 per sensor)
+
+The sequence is the total number of records ever written; record n lives in
+slot n % capacity. The writer fills the slot before bumping the sequence, so
+readers need no lock: they only have to discard slots the writer may have
+reused while they were copying.
+"""
+
+import os
+import mmap
+import struct
+import logging
+import tempfile
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Optional
+from binary_log import record_struct, decode_records, encode_record
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SLRR"
+VERSION = 1
+_FIXED_HEADER = struct.Struct("<4sHHII")
+_SEQUENCE = struct.Struct("<I")
+_SEQUENCE_OFFSET = _FIXED_HEADER.size
+
+def default_ring_path() -> str:
+    """Location of the ring file: /dev/shm where available, else the temp directory"""
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(base, 'solar-monitor-recent.ring')
+
+def _encode_names(sensor_names: List[str]) -> bytes:
+    return b"".join(
+        struct.pack("<B", len(encoded)) + encoded
+        for encoded in (name.encode('utf-8') for name in sensor_names)
+    )
+
+def _read_layout(mapped) -> Optional[Dict]:
+    """Parse the header of a mapped ring file; None if it isn't one"""
+    if len(mapped) < _FIXED_HEADER.size + _SEQUENCE.size:
+        return None
+    magic, version, sensor_count, capacity, header_length = _FIXED_HEADER.unpack_from(mapped, 0)
+    if magic != MAGIC or version != VERSION:
+        return None
+    
+    names = []
+    pos = _SEQUENCE_OFFSET + _SEQUENCE.size
+    for _ in range(sensor_count):
+        size = mapped[pos]
+        names.append(bytes(mapped[pos + 1:pos + 1 + size]).decode('utf-8'))
+        pos += 1 + size
+    
+    record_size = record_struct(sensor_count).size
+    if len(mapped) < header_length + capacity * record_size:
+        return None
+    return {"sensors": names, "capacity": capacity, "header_length": header_length, "record_size": record_size}
+
+class SharedRingWriter:
+    """Publish readings into the shared ring (monitor side)"""
+    
+    def __init__(self, path: str, sensor_names: List[str], capacity: int):
+        self.path = path
+        self.sensor_names = list(sensor_names)
+        self.capacity = capacity
+        self._record = record_struct(len(self.sensor_names))
+        self._file, self._mapped, self._layout = self._open()
+        self._sequence = _SEQUENCE.unpack_from(self._mapped, _SEQUENCE_OFFSET)[0]
+    
+    def _open(self):
+        """Reuse a ring with the same layout (monitor restart), otherwise replace it"""
+        try:
+            f = open(self.path, 'r+b')
+            mapped = mmap.mmap(f.fileno(), 0)
+            layout = _read_layout(mapped)
+            if layout and layout["sensors"] == self.sensor_names and layout["capacity"] == self.capacity:
+                return f, mapped, layout
+            mapped.close()
+            f.close()
+        except (OSError, ValueError):
+            pass
+        
+        names = _encode_names(self.sensor_names)
+        header_length = _SEQUENCE_OFFSET + _SEQUENCE.size + len(names)
+        header_length += (-header_length) % 8
+        header = (_FIXED_HEADER.pack(MAGIC, VERSION, len(self.sensor_names), self.capacity, header_length)
+                  + _SEQUENCE.pack(0) + names)
+        
+        # Build the new ring aside and swap it in, so readers never see a half-written header
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(header.ljust(header_length, b"\0"))
+            f.truncate(header_length + self.capacity * self._record.size)
+        os.replace(tmp_path, self.path)
+        
+        f = open(self.path, 'r+b')
+        mapped = mmap.mmap(f.fileno(), 0)
+        return f, mapped, _read_layout(mapped)
+    
+    def append(self, reading: Dict):
+        """Write one reading into the next slot, then publish it by bumping the sequence"""
+        slot = self._sequence % self.capacity
+        offset = self._layout["header_length"] + slot * self._record.size
+        self._mapped[offset:offset + self._record.size] = encode_record(reading, self.sensor_names, self._record)
+        self._sequence += 1
+        _SEQUENCE.pack_into(self._mapped, _SEQUENCE_OFFSET, self._sequence)
+    
+    def close(self):
+        """Unmap the ring; the file stays for readers until the next monitor start replaces it"""
+        self._mapped.close()
+        self._file.close()
+
+class SharedRingReader:
+    """Serve recent readings from the shared ring (web side)
+    
+    Keeps its own columnar copy of the ring and only decodes records written
+    since the previous call. Returns None while no ring is available (monitor
+    not running, or a different host), so callers fall back to the data files.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._inode = None
+        self._mapped = None
+        self._layout = None
+        self._first = 0  # sequence number of the oldest record in the local copy
+        self._columns = None
+        self._lock = threading.Lock()
+    
+    def _attach(self) -> bool:
+        """(Re)map the ring file if it appeared or the monitor replaced it"""
+        try:
+            inode = os.stat(self.path).st_ino
+        except OSError:
+            self._detach()
+            return False
+        if inode == self._inode and self._mapped is not None:
+            return True
+        
+        self._detach()
+        try:
+            with open(self.path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            logger.debug(f"Shared ring {self.path} not available: {e}")
+            return False
+        
+        layout = _read_layout(mapped)
+        if layout is None:
+            mapped.close()
+            return False
+        self._inode, self._mapped, self._layout = inode, mapped, layout
+        return True
+    
+    def _detach(self):
+        if self._mapped is not None:
+            self._mapped.close()
+        self._inode = self._mapped = self._layout = self._columns = None
+        self._first = 0
+    
+    def _sequence(self) -> int:
+        # Read twice so a torn read of a concurrent update is never used
+        while True:
+            first = _SEQUENCE.unpack_from(self._mapped, _SEQUENCE_OFFSET)[0]
+            if _SEQUENCE.unpack_from(self._mapped, _SEQUENCE_OFFSET)[0] == first:
+                return first
+    
+    def _copy(self, start: int, end: int) -> bytes:
+        """Copy records [start, end) out of the ring, following the wrap-around"""
+        capacity = self._layout["capacity"]
+        size = self._layout["record_size"]
+        base = self._layout["header_length"]
+        chunks = []
+        while start < end:
+            slot = start % capacity
+            count = min(end - start, capacity - slot)
+            chunks.append(self._mapped[base + slot * size:base + (slot + count) * size])
+            start += count
+        return b"".join(chunks)
+    
+    def _refresh(self) -> Optional[Dict]:
+        if not self._attach():
+            return None
+        
+        capacity = self._layout["capacity"]
+        names = self._layout["sensors"]
+        sequence = self._sequence()
+        if self._columns is None or sequence < self._first + len(self._columns["timestamps"]):
+            # First use, or the monitor restarted the ring from zero
+            self._columns = {"timestamps": [], "sensors": {name: [] for name in names}}
+            self._first = max(0, sequence - capacity)
+        
+        end = self._first + len(self._columns["timestamps"])
+        start = max(end, sequence - capacity)
+        if start < sequence:
+            data = self._copy(start, sequence)
+            # Slots the writer may have reused while we copied are dropped
+            valid_from = max(start, self._sequence() - capacity + 1)
+            skip = valid_from - start
+            block = decode_records(data[skip * self._layout["record_size"]:], names, sequence - valid_from)
+            
+            if valid_from > end:
+                # Fell behind by more than the whole ring: start over from what was copied
+                self._columns = {"timestamps": [], "sensors": {name: [] for name in names}}
+                self._first = valid_from
+            self._columns["timestamps"].extend(block["timestamps"])
+            for name in names:
+                self._columns["sensors"][name].extend(block["sensors"][name])
+        
+        # Keep the local copy to what the ring itself holds
+        excess = len(self._columns["timestamps"]) - capacity
+        if excess > 0:
+            del self._columns["timestamps"][:excess]
+            for values in self._columns["sensors"].values():
+                del values[:excess]
+            self._first += excess
+        return self._columns
+    
+    def columns(self, since: Optional[str] = None) -> Optional[Dict]:
+        """Return a columnar copy of the readings in the ring, optionally only those at or after since (ISO)"""
+        with self._lock:
+            columns = self._refresh()
+            if columns is None:
+                return None
+            start = 0
+            if since is not None:
+                start = bisect_left(columns["timestamps"], since)
+            return {
+                "timestamps": columns["timestamps"][start:],
+                "sensors": {name: values[start:] for name, values in columns["sensors"].items()},
+            }
+    
+    def oldest_timestamp(self) -> Optional[str]:
+        """Return the timestamp of the oldest reading in the ring, or None if there is none"""
+        with self._lock:
+            columns = self._refresh()
+            if not columns or not columns["timestamps"]:
+                return None
+            return columns["timestamps"][0]
+    
+    def latest(self) -> Optional[Dict]:
+        """Return the most recent reading in the ring, or None if there is none"""
+        with self._lock:
+            columns = self._refresh()
+            if not columns or not columns["timestamps"]:
+                return None
+            return {
+                "timestamp": columns["timestamps"][-1],
+                "sensors": {name: values[-1] for name, values in columns["sensors"].items()},
+            }
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Vectorized summary statistics over columnar temperature data
+"""
+
+import math
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; fall back to the array module
+    np = None
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+def to_array(values: Sequence[Optional[float]]):
+    """Convert a sensor column to a float array with missing readings as NaN"""
+    if np is not None:
+        return np.array(values, dtype=np.float64)
+    return array('d', (math.nan if v is None else v for v in values))
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    """Linear-interpolated percentile, matching numpy's default method"""
+    position = (len(sorted_values) - 1) * q / 100.0
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def summarize_array(values, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Optional[Dict]:
+    """Min/max/avg/stddev/percentiles/current of one sensor column, ignoring NaN"""
+    if np is not None:
+        valid = values[~np.isnan(values)]
+        if not valid.size:
+            return None
+        quantiles = np.percentile(valid, percentiles) if percentiles else []
+        return {
+            "min": float(valid.min()),
+            "max": float(valid.max()),
+            "avg": float(valid.mean()),
+            "stddev": float(valid.std()),
+            "current": float(valid[-1]),
+            "percentiles": {f"p{q:g}": float(v) for q, v in zip(percentiles, quantiles)},
+        }
+    
+    valid = [v for v in values if not math.isnan(v)]
+    if not valid:
+        return None
+    mean = math.fsum(valid) / len(valid)
+    ordered = sorted(valid)
+    return {
+        "min": ordered[0],
+        "max": ordered[-1],
+        "avg": mean,
+        "stddev": math.sqrt(math.fsum((v - mean) ** 2 for v in valid) / len(valid)),
+        "current": valid[-1],
+        "percentiles": {f"p{q:g}": _percentile(ordered, q) for q in percentiles},
+    }
+
+def summarize_columns(columns: Dict, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, Dict]:
+    """Summarize every sensor column of a columnar block"""
+    summary = {}
+    for name, values in columns["sensors"].items():
+        stats = summarize_array(to_array(values), percentiles)
+        if stats:
+            summary[name] = stats
+    return summary
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the fixed-width binary log format and the JSONL converter
+"""
+
+import os
+import json
+import tempfile
+import shutil
+from datetime import datetime
+
+SENSORS = ["inlet", "outlet", "tank_top"]
+
+# Timestamps as the monitor writes them (datetime.now().isoformat(), with microseconds)
+READINGS = [
+    {"timestamp": "2025-01-07T10:00:00.123456", "sensors": {"inlet": 25.562, "outlet": 30.1, "tank_top": 55.0}},
+    {"timestamp": "2025-01-07T10:00:05.234567", "sensors": {"inlet": 25.6, "outlet": None, "tank_top": 55.125}},
+    {"timestamp": "2025-01-07T10:00:10.345678", "sensors": {"inlet": -2.5, "tank_top": 54.875}},
+]
+
+def expected_columns(readings, names):
+    return {
+        "timestamps": [r["timestamp"] for r in readings],
+        "sensors": {name: [r["sensors"].get(name) for r in readings] for name in names},
+    }
+
+def write_jsonl(path, readings):
+    with open(path, 'w') as f:
+        for reading in readings:
+            f.write(json.dumps(reading) + '\n')
+        f.write('\n')  # blank lines are skipped
+
+def test_binary_round_trip():
+    """Test that readings written as records read back unchanged, with and without numpy"""
+    print("=== Testing Binary Log Round Trip ===")
+
+    import binary_log
+    from binary_log import BinaryLogWriter, decode_records, read_columns, read_header
+
+    test_data_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(test_data_dir, "temp_log_20250107_10.bin")
+        writer = BinaryLogWriter(path, SENSORS)
+        for reading in READINGS:
+            writer.append(reading)
+
+        results = [read_columns(path)]
+        numpy_module = binary_log.np
+        binary_log.np = None
+        try:
+            results.append(read_columns(path))
+        finally:
+            binary_log.np = numpy_module
+
+        assert all(columns == expected_columns(READINGS, SENSORS) for columns in results), \
+            f"Unexpected columns: {results}"
+        print("✅ Timestamps and values round-trip, missing and None values come back as None")
+
+        with open(path, 'rb') as f:
+            header = read_header(f)
+            body = f.read()
+        block = decode_records(body, header["sensors"], len(body) // header["record_size"])
+        assert header["sensors"] == SENSORS and block == expected_columns(READINGS, SENSORS), \
+            f"Unexpected decoded block: {block}"
+        print("✅ decode_records reads records straight from a buffer")
+
+        # Reopened with a different sensor set: the file keeps its own columns
+        writer = BinaryLogWriter(path, ["inlet", "new_sensor"])
+        writer.append({"timestamp": "2025-01-07T10:00:15.456789", "sensors": {"inlet": 26.0, "new_sensor": 1.0}})
+        columns = read_columns(path)
+        assert list(columns["sensors"]) == SENSORS and columns["sensors"]["outlet"][-1] is None, \
+            f"Column layout changed: {list(columns['sensors'])}"
+        print("✅ Existing column layout kept when the sensor set changes")
+    finally:
+        shutil.rmtree(test_data_dir, ignore_errors=True)
+
+def test_truncated_record():
+    """Test that a partially written last record is ignored and trimmed before appending"""
+    print("\n=== Testing Truncated Binary Record ===")
+
+    from binary_log import BinaryLogWriter, read_columns
+
+    test_data_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(test_data_dir, "temp_log_20250107_10.bin")
+        writer = BinaryLogWriter(path, SENSORS)
+        for reading in READINGS[:2]:
+            writer.append(reading)
+        complete_size = os.path.getsize(path)
+        with open(path, 'ab') as f:
+            f.write(writer.encode(READINGS[2])[:7])  # power cut in the middle of a write
+
+        assert read_columns(path) == expected_columns(READINGS[:2], SENSORS), \
+            f"Torn record decoded: {read_columns(path)}"
+        print("✅ Torn last record ignored by readers")
+
+        writer = BinaryLogWriter(path, SENSORS)
+        size_after_open = os.path.getsize(path)
+        writer.append(READINGS[2])
+        assert size_after_open == complete_size and read_columns(path) == expected_columns(READINGS, SENSORS), \
+            f"Appends misaligned after a torn record: {read_columns(path)}"
+        print("✅ Torn record trimmed on reopen, later appends stay aligned")
+    finally:
+        shutil.rmtree(test_data_dir, ignore_errors=True)
+
+def test_jsonl_to_binary_migration():
+    """Test the converter that writes .bin companions for existing JSONL files"""
+    print("\n=== Testing JSONL to Binary Migration ===")
+
+    from config import Config
+    from binary_log import binary_path_for, read_columns
+    import migrate_to_binary
+
+    test_data_dir = tempfile.mkdtemp()
+    original_data_dir = Config.DATA_DIR
+    Config.DATA_DIR = test_data_dir
+
+    try:
+        paths = [os.path.join(test_data_dir, f"temp_log_20250107_{hour}.jsonl") for hour in (10, 11, 12)]
+        for path in paths:
+            write_jsonl(path, READINGS)
+        existing = binary_path_for(paths[1])
+        with open(existing, 'wb') as f:
+            f.write(b"already converted")
+
+        migrate_to_binary.main()
+
+        columns = read_columns(binary_path_for(paths[0]))
+        assert columns == expected_columns(READINGS, SENSORS), f"Unexpected converted readings: {columns}"
+        print("✅ Converted file holds the same readings as the JSONL")
+
+        assert os.path.exists(binary_path_for(paths[2])), "Newest file skipped although its hour is long closed"
+        print("✅ Newest file converted once its hour is over")
+
+        current = os.path.join(test_data_dir, f"temp_log_{datetime.now().strftime('%Y%m%d_%H')}.jsonl")
+        write_jsonl(current, READINGS)
+        migrate_to_binary.main()
+
+        with open(existing, 'rb') as f:
+            untouched = f.read() == b"already converted"
+        assert untouched and not os.path.exists(binary_path_for(current)) and os.path.exists(paths[0]), \
+            "Migration touched files it should have skipped"
+        print("✅ Existing .bin files and the current hour left alone, JSONL kept")
+
+        assert not [name for name in os.listdir(test_data_dir) if name.endswith('.tmp')], \
+            "Temporary files left behind"
+        print("✅ No temporary files left behind")
+    finally:
+        Config.DATA_DIR = original_data_dir
+        shutil.rmtree(test_data_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    print("Testing Binary Log")
+    print("=" * 50)
+
+    test_binary_round_trip()
+    test_truncated_record()
+    test_jsonl_to_binary_migration()
+
+    print("\n" + "=" * 50)
+    print("Testing completed!")
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the parsed data file cache used by the web interface
+"""
+
+import os
+import json
+import tempfile
+import shutil
+
+def write_readings(path, readings, mode='w'):
+    with open(path, mode) as f:
+        for reading in readings:
+            f.write(json.dumps(reading) + '\n')
+
+def test_cache_reuses_closed_files():
+    """Test that unchanged files are served from the cache"""
+    print("=== Testing Hourly File Cache ===")
+    
+    from data_cache import HourlyFileCache, columns_to_readings
+    
+    test_data_dir = tempfile.mkdtemp()
+    try:
+        test_file = os.path.join(test_data_dir, "temp_log_20250107_10.jsonl")
+        readings = [
+            {"timestamp": "2025-01-07T10:00:00", "sensors": {"sensor1": 25.5, "sensor2": 30.2}},
+            {"timestamp": "2025-01-07T10:00:05", "sensors": {"sensor1": 25.6, "sensor2": 30.1}}
+        ]
+        write_readings(test_file, readings)
+        
+        cache = HourlyFileCache(1024 * 1024)
+        first = cache.get(test_file)
+        second = cache.get(test_file)
+        
+        assert columns_to_readings(first) == readings, f"Unexpected readings: {columns_to_readings(first)}"
+        print("✅ Columnar block round-trips to the original readings")
+        
+        assert second is first and cache.stats()["hits"] == 1, \
+            f"Unchanged file was parsed again: {cache.stats()}"
+        print("✅ Unchanged file served from cache")
+        
+        write_readings(test_file, [{"timestamp": "2025-01-07T10:00:10", "sensors": {"sensor1": 25.7, "sensor2": 30.0}}], 'a')
+        third = cache.get(test_file)
+        
+        assert len(third["timestamps"]) == 3 and third["sensors"]["sensor1"][-1] == 25.7, \
+            f"Appended line missing: {third}"
+        print("✅ Appended line picked up from the file tail")
+    finally:
+        shutil.rmtree(test_data_dir, ignore_errors=True)
+
+def test_cache_eviction():
+    """Test that the cache stays under its memory cap"""
+    print("\n=== Testing Cache Eviction ===")
+    
+    from data_cache import HourlyFileCache
+    
+    test_data_dir = tempfile.mkdtemp()
+    try:
+        cache = HourlyFileCache(2000)
+        for hour in range(5):
+            test_file = os.path.join(test_data_dir, f"temp_log_20250107_{hour:02d}.jsonl")
+            write_readings(test_file, [
+                {"timestamp": f"2025-01-07T{hour:02d}:00:{s:02d}", "sensors": {"sensor1": 25.0}}
+                for s in range(0, 60, 5)
+            ])
+            cache.get(test_file)
+        
+        stats = cache.stats()
+        assert stats["bytes"] <= stats["max_bytes"] and stats["files"] < 5, f"Cache exceeded its cap: {stats}"
+        print(f"✅ Least recently used files evicted: {stats}")
+    finally:
+        shutil.rmtree(test_data_dir, ignore_errors=True)
+
+def test_archived_hours():
+    """Test that gzipped hours and daily archive members read back like the raw files"""
+    print("\n=== Testing Archived Hours ===")
+    
+    from data_cache import HourlyFileCache, columns_to_readings
+    from log_archive import append_to_day_archive, compress_hour, day_archive_path, member_path
+    
+    test_data_dir = tempfile.mkdtemp()
+    try:
+        hourly = {}
+        for hour in (10, 11):
+            test_file = os.path.join(test_data_dir, f"temp_log_20250107_{hour}.jsonl")
+            hourly[hour] = [
+                {"timestamp": f"2025-01-07T{hour}:00:{s:02d}", "sensors": {"sensor1": 25.0 + s}}
+                for s in range(0, 60, 5)
+            ]
+            write_readings(test_file, hourly[hour])
+        
+        gz_paths = [compress_hour(os.path.join(test_data_dir, f"temp_log_20250107_{hour}.jsonl")) for hour in (10, 11)]
+        cache = HourlyFileCache(1024 * 1024)
+        
+        assert columns_to_readings(cache.get(gz_paths[0])) == hourly[10], \
+            "Gzipped hour differs from the original"
+        print("✅ Gzipped hour reads back unchanged")
+        
+        archive_path = append_to_day_archive(day_archive_path(test_data_dir, "temp_log", "20250107"), gz_paths)
+        member = cache.get(member_path(archive_path, "temp_log_20250107_11"))
+        
+        assert columns_to_readings(member) == hourly[11], \
+            f"Unexpected archive member contents: {columns_to_readings(member)}"
+        print("✅ Single hour read from the daily archive")
+    finally:
+        shutil.rmtree(test_data_dir, ignore_errors=True)
+
+def test_log_tail_reader():
+    """Test that the tail reader follows appends, partial lines, truncation and rotation"""
+    print("\n=== Testing Log Tail Reader ===")
+    
+    from data_cache import LogTailReader
+    
+    def reading(hour, s):
+        return {"timestamp": f"2025-01-07T{hour}:00:{s:02d}", "sensors": {"sensor1": 25.0 + s}}
+    
+    test_data_dir = tempfile.mkdtemp()
+    try:
+        test_file = os.path.join(test_data_dir, "temp_log_20250107_10.jsonl")
+        write_readings(test_file, [reading(10, s) for s in range(0, 60, 5)])
+        
+        tail = LogTailReader()
+        tail.INITIAL_CHUNK = 16  # shorter than a line: the backwards seek has to widen
+        assert tail.latest(test_file) == reading(10, 55), f"Unexpected latest reading: {tail.latest(test_file)}"
+        print("✅ Last line found by seeking back from the end")
+        
+        offset = tail._offset
+        write_readings(test_file, [reading(10, 56)], 'a')
+        assert tail.latest(test_file) == reading(10, 56) and tail._offset > offset, \
+            f"Appended line missed: {tail.latest(test_file)}"
+        print("✅ Appended line read from the previous offset")
+        
+        line = json.dumps(reading(10, 57)) + '\n'
+        with open(test_file, 'a') as f:
+            f.write(line[:20])
+        assert tail.latest(test_file) == reading(10, 56), f"Partial line returned: {tail.latest(test_file)}"
+        print("✅ Partial trailing line ignored")
+        
+        with open(test_file, 'a') as f:
+            f.write(line[20:])
+        assert tail.latest(test_file) == reading(10, 57), f"Completed line missed: {tail.latest(test_file)}"
+        print("✅ Line picked up once it is complete")
+        
+        write_readings(test_file, [reading(10, 1)])
+        assert tail.latest(test_file) == reading(10, 1), f"Stale reading after truncation: {tail.latest(test_file)}"
+        print("✅ Truncated file read again from the start")
+        
+        next_file = os.path.join(test_data_dir, "temp_log_20250107_11.jsonl")
+        with open(next_file, 'w') as f:
+            f.write(json.dumps(reading(11, 0))[:20])
+        assert tail.latest(next_file) is None, f"Reading from the old file after rotation: {tail.latest(next_file)}"
+        print("✅ New hour with only a partial line has no reading yet")
+        
+        with open(next_file, 'w') as f:
+            f.write(json.dumps(reading(11, 0)) + '\n')
+        assert tail.latest(next_file) == reading(11, 0), f"Rotated file not followed: {tail.latest(next_file)}"
+        print("✅ Rotation to the next hour's file followed")
+    finally:
+        shutil.rmtree(test_data_dir, ignore_errors=True)
+
+def test_shared_ring():
+    """Test that readings published in the shared ring reach the reader, including after wrap-around"""
+    print("\n=== Testing Shared Ring Buffer ===")
+    
+    from shared_ring import SharedRingReader, SharedRingWriter
+    
+    test_data_dir = tempfile.mkdtemp()
+    try:
+        ring_path = os.path.join(test_data_dir, "recent.ring")
+        writer = SharedRingWriter(ring_path, ["sensor1", "sensor2"], capacity=10)
+        reader = SharedRingReader(ring_path)
+        
+        assert reader.latest() is None, f"Unexpected reading in empty ring: {reader.latest()}"
+        print("✅ Empty ring has no latest reading")
+        
+        for s in range(25):
+            writer.append({"timestamp": f"2025-01-07T10:00:{s:02d}", "sensors": {"sensor1": 25.0 + s, "sensor2": None}})
+            if s == 3:
+                reader.columns()  # read part-way so later calls are incremental
+        
+        columns = reader.columns()
+        latest = reader.latest()
+        assert len(columns["timestamps"]) < 10 and columns["sensors"]["sensor1"][-1] == 49.0, \
+            f"Unexpected ring contents: {columns['sensors']['sensor1']}"
+        print(f"✅ Reader kept up with the wrapped ring ({len(columns['timestamps'])} readings)")
+        
+        assert latest["timestamp"].startswith("2025-01-07T10:00:24") and latest["sensors"] == {"sensor1": 49.0, "sensor2": None}, \
+            f"Unexpected latest reading: {latest}"
+        print("✅ Latest reading served from the ring")
+        
+        since = reader.columns(since="2025-01-07T10:00:22")
+        assert since["sensors"]["sensor1"] == [47.0, 48.0, 49.0], \
+            f"Unexpected window: {since['sensors']['sensor1']}"
+        print("✅ Window selected by timestamp")
+        
+        assert reader.oldest_timestamp() == columns["timestamps"][0], \
+            f"Unexpected oldest timestamp: {reader.oldest_timestamp()}"
+        print("✅ Oldest timestamp in the ring reported")
+        writer.close()
+    finally:
+        shutil.rmtree(test_data_dir, ignore_errors=True)
+
+def test_recent_columns_window():
+    """Test that the data reader takes only the window it asks for from the ring"""
+    print("\n=== Testing Recent Readings Window ===")
+    
+    from datetime import datetime, timedelta
+    from shared_ring import SharedRingReader, SharedRingWriter
+    from web_app import DataReader
+    
+    test_data_dir = tempfile.mkdtemp()
+    try:
+        ring_path = os.path.join(test_data_dir, "recent.ring")
+        writer = SharedRingWriter(ring_path, ["sensor1"], capacity=100)
+        now = datetime.now().replace(microsecond=250000)  # the ring keeps microseconds
+        timestamps = [(now - timedelta(seconds=5 * (9 - i))).isoformat() for i in range(10)]
+        for i, timestamp in enumerate(timestamps):
+            writer.append({"timestamp": timestamp, "sensors": {"sensor1": float(i)}})
+        
+        reader = DataReader()
+        reader.recent = SharedRingReader(ring_path)
+        
+        columns, until = reader.get_recent_columns(timestamps[7])
+        assert columns["timestamps"] == timestamps[7:] and until == timestamps[7], \
+            f"Unexpected window: {columns['timestamps']}, until {until}"
+        print("✅ Ring cut to the window, files needed only before it")
+        
+        columns, until = reader.get_recent_columns((now - timedelta(hours=1)).isoformat())
+        assert columns["timestamps"] == timestamps and until == timestamps[0], \
+            f"Unexpected early window: until {until}"
+        print("✅ Window reaching before the ring leaves the gap to the files")
+        writer.close()
+    finally:
+        shutil.rmtree(test_data_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    print("Testing Data Cache")
+    print("=" * 50)
+    
+    test_cache_reuses_closed_files()
+    test_cache_eviction()
+    test_archived_hours()
+    test_log_tail_reader()
+    test_shared_ring()
+    test_recent_columns_window()
+    
+    print("\n" + "=" * 50)
+    print("Testing completed!")
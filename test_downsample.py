@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test script to verify downsampling of readings for charts
+"""
+
+import math
+from datetime import datetime, timedelta
+
+SENSORS = ("inlet", "outlet", "tank_top", "tank_bottom")
+
+def make_readings(count, step_seconds=5):
+    start = datetime(2025, 1, 7, 10, 0, 0)
+    readings = []
+    for i in range(count):
+        sensors = {name: 20.0 + k + math.sin(i / (10.0 + k)) for k, name in enumerate(SENSORS)}
+        if i % 7 == 3:
+            sensors["outlet"] = None
+        readings.append({"timestamp": (start + timedelta(seconds=i * step_seconds)).isoformat(), "sensors": sensors})
+    return readings
+
+def test_bucket_downsampling():
+    """Test min/max/mean buckets against max_points and resolution"""
+    print("=== Testing Bucket Downsampling ===")
+
+    from downsample import downsample_readings
+
+    readings = make_readings(1000)
+    over = []
+    for max_points in (2, 3, 7, 100, 999):
+        rows = downsample_readings(readings, max_points=max_points)
+        if len(rows) > max_points or sum(r["count"] for r in rows) != len(readings):
+            over.append((max_points, len(rows)))
+    assert not over, f"Bucket counts off: {over}"
+    print("✅ Buckets stay within max_points and cover every reading")
+
+    rows = downsample_readings(readings[:12], resolution=30)
+    first = readings[:6]
+    mean = sum(r["sensors"]["inlet"] for r in first) / 6
+    assert (len(rows) == 2 and rows[0]["count"] == 6 and math.isclose(rows[0]["sensors"]["inlet"], mean)
+            and rows[0]["min"]["inlet"] == min(r["sensors"]["inlet"] for r in first)
+            and rows[0]["max"]["inlet"] == max(r["sensors"]["inlet"] for r in first)), \
+        f"Unexpected buckets: {rows[:1]}"
+    print("✅ Each bucket carries mean, min, max and count")
+
+    assert rows[0]["min"]["outlet"] is not None and rows[0]["sensors"]["outlet"] is not None, \
+        f"Missing value spoiled the bucket: {rows[0]}"
+    print("✅ Missing values left out of the bucket statistics")
+
+def test_lttb_downsampling():
+    """Test that LTTB keeps to max_points, also with more sensors than the budget allows"""
+    print("\n=== Testing LTTB Downsampling ===")
+
+    from downsample import downsample_readings, lttb_indices
+
+    readings = make_readings(1000)
+    over = []
+    for max_points in (2, 3, 5, 11, 12, 40, 999):
+        rows = downsample_readings(readings, max_points=max_points, method='lttb')
+        if len(rows) > max_points or rows[0] is not readings[0] or rows[-1] is not readings[-1]:
+            over.append((max_points, len(rows)))
+    assert not over, f"LTTB row counts off: {over}"
+    print("✅ LTTB stays within max_points and keeps the end points")
+
+    xs = list(range(100))
+    ys = [0.0] * 100
+    ys[37] = 10.0
+    assert 37 in lttb_indices(xs, ys, 5), "LTTB dropped the spike"
+    print("✅ LTTB keeps a lone spike")
+
+    rows = downsample_readings(readings, resolution=600, method='lttb')
+    span = 999 * 5
+    assert len(rows) <= span // 600 + 1, f"Too many LTTB rows for the resolution: {len(rows)}"
+    print(f"✅ Resolution limits LTTB to one point per interval ({len(rows)} rows)")
+
+def test_columnar_downsampling():
+    """Test bucketing straight from a columnar block, across a gap and with rows out of order"""
+    print("\n=== Testing Columnar Downsampling ===")
+
+    from data_cache import append_readings, empty_columns
+    from downsample import downsample_columns, downsample_readings
+
+    readings = make_readings(600)
+    readings = readings[:200] + readings[400:]  # a gap of several buckets
+    block = append_readings(empty_columns(), readings)
+
+    start = datetime.fromisoformat(readings[0]["timestamp"])
+    expected = {}
+    for reading in readings:
+        key = int((datetime.fromisoformat(reading["timestamp"]) - start).total_seconds() // 60)
+        expected.setdefault(key, []).append(reading["sensors"]["inlet"])
+
+    rows = downsample_columns(block, resolution=60)
+    assert ([r["count"] for r in rows] == [len(v) for _, v in sorted(expected.items())]
+            and [r["min"]["inlet"] for r in rows] == [min(v) for _, v in sorted(expected.items())]), \
+        f"Buckets differ from a row-by-row grouping: {[r['count'] for r in rows]}"
+    print(f"✅ Buckets match a row-by-row grouping across the gap ({len(rows)} buckets)")
+
+    shuffled = readings[1::2] + readings[0::2]
+    unordered = downsample_columns(append_readings(empty_columns(), shuffled), resolution=60)
+    def summary(buckets):
+        return [(r["timestamp"], r["count"], r["min"], r["max"]) for r in buckets]
+    assert summary(unordered) == summary(rows), "Rows out of order bucketed differently"
+    print("✅ Rows out of order land in the same buckets")
+
+    over = []
+    for max_points in (2, 7, 100):
+        if len(downsample_columns(block, max_points=max_points)) > max_points:
+            over.append(max_points)
+    assert not over, f"max_points exceeded: {over}"
+    print("✅ Columnar buckets stay within max_points")
+
+    assert downsample_columns(block, max_points=40, method='lttb') == \
+        downsample_readings(readings, max_points=40, method='lttb'), "LTTB picked different rows from columns"
+    print("✅ LTTB on columns picks the same rows as on readings")
+
+if __name__ == "__main__":
+    print("Testing Downsampling")
+    print("=" * 50)
+
+    test_bucket_downsampling()
+    test_lttb_downsampling()
+    test_columnar_downsampling()
+
+    print("\n" + "=" * 50)
+    print("Testing completed!")
@@ -7,7 +7,8 @@ import os
 import json
 import tempfile
 import shutil
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 
 def test_append_only_logging():
     """Test the new append-only logging system"""
@@ -19,11 +20,15 @@ def test_append_only_logging():
         test_data_dir = tempfile.mkdtemp()
         
         original_data_dir = None
+        from config import Config
+        original_shared_ring = Config.SHARED_RING
+        original_live_socket = Config.LIVE_SOCKET_PATH
         try:
-            from config import Config
             config = Config()
             original_data_dir = config.DATA_DIR
             config.DATA_DIR = test_data_dir
+            Config.SHARED_RING = False  # keep clear of the live /dev/shm ring
+            Config.LIVE_SOCKET_PATH = os.path.join(test_data_dir, "live.sock")
             
             monitor = SolarMonitor()
             
@@ -53,6 +58,8 @@ def test_append_only_logging():
         finally:
             if original_data_dir:
                 config.DATA_DIR = original_data_dir
+            Config.SHARED_RING = original_shared_ring
+            Config.LIVE_SOCKET_PATH = original_live_socket
             shutil.rmtree(test_data_dir, ignore_errors=True)
             
     except Exception as e:
@@ -173,6 +180,574 @@ def test_migration_script():
     except Exception as e:
         print(f"❌ Migration script test failed: {e}")
 
+def test_live_stream():
+    """Test SSE fan-out and Last-Event-ID resume"""
+    print("\n=== Testing Live Stream ===")
+    
+    from live_stream import ReadingBroadcaster
+    
+    broadcaster = ReadingBroadcaster(lambda: None, backlog=3, poll_interval=0.05, keepalive=0.1)
+    first = broadcaster.events()
+    second = broadcaster.events()
+    next(first)
+    next(second)
+    
+    broadcaster.publish({"timestamp": "2025-01-07T10:00:00", "sensors": {"sensor1": 25.5}})
+    assert "2025-01-07T10:00:00" in next(first) and "2025-01-07T10:00:00" in next(second), \
+        "Reading not delivered to all clients"
+    print("✅ Reading pushed to every connected client")
+    
+    broadcaster.publish({"timestamp": "2025-01-07T10:00:00", "sensors": {"sensor1": 25.5}})
+    assert next(first).startswith(": keepalive"), "Duplicate reading was sent again"
+    print("✅ Duplicate reading not sent twice")
+    
+    for s in (5, 10, 15):
+        broadcaster.publish({"timestamp": f"2025-01-07T10:00:{s:02d}", "sensors": {"sensor1": 25.5}})
+    resumed = broadcaster.events("2025-01-07T10:00:05")
+    next(resumed)
+    ids = [next(resumed).split("\n")[0] for _ in range(2)]
+    assert ids == ["id: 2025-01-07T10:00:10", "id: 2025-01-07T10:00:15"], \
+        f"Unexpected events after reconnect: {ids}"
+    print("✅ Reconnecting client resumes after its Last-Event-ID")
+    
+    for stream in (first, second, resumed):
+        stream.close()
+    assert broadcaster.clients == 0, f"{broadcaster.clients} clients still registered"
+    print("✅ Disconnected clients released")
+    
+    limited = ReadingBroadcaster(lambda: None, backlog=3, poll_interval=0.05, max_clients=1)
+    stream = limited.events()
+    refused = limited.events()
+    stream.close()  # never iterated, still gives its slot back
+    again = limited.events()
+    assert refused is None and again is not None, "Stream limit not enforced"
+    print("✅ Streams beyond max_clients refused, slots freed on close")
+    again.close()
+    
+    time.sleep(0.2)
+    assert limited._thread is None, "Polling thread still running without clients"
+    print("✅ Polling stops when the last client disconnects")
+
+def test_live_socket():
+    """Test that readings sent by the monitor reach stream clients one by one"""
+    print("\n=== Testing Live Reading Socket ===")
+    
+    from live_stream import ReadingBroadcaster, ReadingPublisher
+    
+    test_data_dir = tempfile.mkdtemp()
+    broadcaster = ReadingBroadcaster(lambda: None, backlog=10, poll_interval=0.05, keepalive=2)
+    try:
+        socket_path = os.path.join(test_data_dir, "live.sock")
+        broadcaster.listen(socket_path)
+        stream = broadcaster.events("2025-01-07T09:59:59")
+        next(stream)
+        
+        publisher = ReadingPublisher(socket_path)
+        # A whole batch of readings taken before the log file is written
+        for s in (0, 5, 10):
+            publisher.publish({"timestamp": f"2025-01-07T10:00:{s:02d}", "sensors": {"sensor1": 25.0 + s}})
+        publisher.close()
+        
+        ids = [next(stream).split("\n")[0] for _ in range(3)]
+        assert ids == ["id: 2025-01-07T10:00:00", "id: 2025-01-07T10:00:05", "id: 2025-01-07T10:00:10"], \
+            f"Unexpected events from the socket: {ids}"
+        print("✅ Every reading sent by the monitor pushed to the client")
+        stream.close()
+        
+        unheard = ReadingPublisher(os.path.join(test_data_dir, "nobody.sock"))
+        unheard.publish({"timestamp": "2025-01-07T10:00:15", "sensors": {}})
+        unheard.close()
+        print("✅ Publishing without a listening web app is a no-op")
+    finally:
+        broadcaster.close()
+        shutil.rmtree(test_data_dir, ignore_errors=True)
+
+def test_streams_leave_threads_free():
+    """Test that the API still answers while the server's stream limit is reached"""
+    print("\n=== Testing Stream Limit on the Thread Pool ===")
+    
+    import base64
+    import http.client
+    import threading
+    import web_app
+    from live_stream import ReadingBroadcaster
+    from web_server import PooledWSGIServer
+    
+    config = web_app.config
+    original = web_app.broadcaster
+    web_app.broadcaster = ReadingBroadcaster(lambda: None, backlog=3, poll_interval=0.05,
+                                             keepalive=0.2, max_clients=config.SSE_MAX_CLIENTS)
+    server = PooledWSGIServer("127.0.0.1", 0, web_app.app, config.WEB_THREADS, backlog=8, keepalive_timeout=5)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    headers = {'Authorization': 'Basic ' + base64.b64encode(b'admin:solar123').decode()}
+    
+    def get(path):
+        connection = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=5)
+        connection.request("GET", path, headers=headers)
+        return connection, connection.getresponse()
+    
+    streams = []
+    try:
+        for _ in range(config.SSE_MAX_CLIENTS):
+            streams.append(get('/api/stream'))
+        statuses = [response.status for _, response in streams]
+        
+        connection, response = get('/api/stream')
+        refused = response.status
+        response.close()
+        connection.close()
+        
+        connection, response = get('/api/current')
+        answered = response.status
+        response.close()
+        connection.close()
+        
+        assert statuses == [200] * config.SSE_MAX_CLIENTS and refused == 503, \
+            f"Unexpected stream statuses: {statuses}, then {refused}"
+        print(f"✅ {config.SSE_MAX_CLIENTS} streams open, the next one refused with 503")
+        assert answered in (200, 404), f"API did not answer: {answered}"
+        print(f"✅ API answered with {config.WEB_THREADS} threads and every stream slot taken")
+    finally:
+        for connection, response in streams:
+            response.close()
+            connection.close()
+        # Streams notice the closed connections when a keepalive fails to send
+        deadline = time.monotonic() + 5
+        while web_app.broadcaster.clients and time.monotonic() < deadline:
+            time.sleep(0.1)
+        held = web_app.broadcaster.clients
+        web_app.broadcaster.close()
+        web_app.broadcaster = original
+        server.shutdown()
+        server.drain(1)
+        server.server_close()
+    
+    assert held == 0, f"{held} stream slots still held"
+    print("✅ Stream slots released after the clients disconnected")
+
+def test_conditional_responses():
+    """Test ETag/Last-Modified validation and 304 responses"""
+    print("\n=== Testing Conditional Responses ===")
+    
+    from datetime import datetime, timezone
+    from flask import Flask
+    from web_app import conditional
+    
+    version = {"tag": "v1", "calls": 0}
+    app = Flask(__name__)
+    
+    @app.route('/data')
+    @conditional(lambda: (version["tag"], datetime(2025, 1, 7, 10, 0, tzinfo=timezone.utc)), 'private, no-cache')
+    def data():
+        version["calls"] += 1
+        return {"value": 1}
+    
+    client = app.test_client()
+    response = client.get('/data')
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    assert response.status_code == 200 and etag and last_modified and response.headers.get('Cache-Control') == 'private, no-cache', \
+        f"Missing validators: {dict(response.headers)}"
+    print("✅ Validators and Cache-Control set on full response")
+    
+    response = client.get('/data', headers={'If-None-Match': etag})
+    assert response.status_code == 304 and version["calls"] == 1, f"Expected 304, got {response.status_code}"
+    print("✅ Matching ETag answered with 304 without running the view")
+    
+    response = client.get('/data', headers={'If-Modified-Since': last_modified})
+    assert response.status_code == 304, f"Expected 304 for If-Modified-Since, got {response.status_code}"
+    print("✅ If-Modified-Since answered with 304")
+    
+    version["tag"] = "v2"
+    response = client.get('/data', headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.headers.get('ETag') != etag, \
+        f"Stale ETag still matched: {response.status_code}"
+    print("✅ Changed data returns a new ETag")
+
+def test_api_encoding():
+    """Test response compression and the columnar data shape"""
+    print("\n=== Testing API Encoding ===")
+    
+    import gzip
+    from flask import Flask, jsonify
+    from api_encoding import FastJSONProvider, compress_response, readings_to_columns
+    
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    payload = {"data": [{"timestamp": f"2025-01-07T10:00:{s:02d}", "sensors": {"inlet": 20.5}} for s in range(60)]}
+    
+    with app.test_request_context():
+        response = compress_response(jsonify(payload), 'gzip', min_size=1024)
+        assert (response.headers.get('Content-Encoding') == 'gzip'
+                and json.loads(gzip.decompress(response.get_data())) == payload), \
+            "Response not compressed correctly"
+        print("✅ Large JSON response gzip compressed")
+        
+        response = compress_response(jsonify({"ok": True}), 'gzip', min_size=1024)
+        assert 'Content-Encoding' not in response.headers and 'Accept-Encoding' in response.headers.get('Vary', ''), \
+            "Small response was compressed"
+        print("✅ Small response sent as-is")
+    
+    rows = [
+        {"timestamp": "2025-01-07T10:00:00", "sensors": {"inlet": 20.5, "tank_top": 55.0}},
+        {"timestamp": "2025-01-07T10:00:05", "sensors": {"inlet": 20.6}},
+    ]
+    columns = readings_to_columns(rows)
+    assert columns == {"t": ["2025-01-07T10:00:00", "2025-01-07T10:00:05"],
+                       "inlet": [20.5, 20.6], "tank_top": [55.0, None]}, \
+        f"Unexpected columns: {columns}"
+    print("✅ Rows converted to columnar shape")
+
+def test_streaming_export():
+    """Test chunked NDJSON/CSV export encoding"""
+    print("\n=== Testing Streaming Export ===")
+    
+    from web_app import EXPORT_CHUNK_ROWS, export_csv, export_ndjson
+    
+    def readings():
+        for i in range(EXPORT_CHUNK_ROWS * 2 + 1):
+            yield {"timestamp": f"2025-01-07T10:{i // 60:02d}:{i % 60:02d}", "sensors": {"inlet": 20.0 + i, "tank_top": None}}
+    
+    chunks = list(export_ndjson(readings()))
+    rows = [json.loads(line) for line in "".join(chunks).splitlines()]
+    assert len(chunks) == 3 and len(rows) == EXPORT_CHUNK_ROWS * 2 + 1 and rows[-1]["sensors"]["inlet"] == 20.0 + EXPORT_CHUNK_ROWS * 2, \
+        f"Unexpected NDJSON export: {len(chunks)} chunks, {len(rows)} rows"
+    print("✅ NDJSON export streamed in chunks")
+    
+    lines = "".join(export_csv(readings())).splitlines()
+    assert lines[0] == "timestamp,inlet,tank_top" and lines[1] == "2025-01-07T10:00:00,20.0," and len(lines) == EXPORT_CHUNK_ROWS * 2 + 2, \
+        f"Unexpected CSV export: {lines[:2]}"
+    print("✅ CSV export has header and empty cells for missing values")
+
+def test_range_queries():
+    """Test arbitrary time-range queries through the file index"""
+    print("\n=== Testing Range Queries ===")
+    
+    from web_app import DataReader
+    
+    test_data_dir = tempfile.mkdtemp()
+    for hour in range(10, 14):
+        with open(os.path.join(test_data_dir, f"temp_log_20250107_{hour}.jsonl"), 'w') as f:
+            for minute in (0, 30):
+                reading = {"timestamp": f"2025-01-07T{hour}:{minute:02d}:00", "sensors": {"inlet": hour + minute / 100, "tank_top": 55.0}}
+                f.write(json.dumps(reading) + '\n')
+    
+    reader = DataReader()
+    reader.config.DATA_DIR = test_data_dir
+    reader.recent = None
+    
+    try:
+        files = reader.get_data_files_for_range(datetime(2025, 1, 7, 12, 2), datetime(2025, 1, 7, 12, 50))
+        assert [os.path.basename(f) for f in files] == ["temp_log_20250107_11.jsonl", "temp_log_20250107_12.jsonl"], \
+            f"Unexpected files: {files}"
+        print("✅ Only files overlapping the range selected")
+        
+        columns = reader.get_columns_for_range(datetime(2025, 1, 7, 11, 30), datetime(2025, 1, 7, 13, 0), ["inlet"])
+        assert (columns["timestamps"] == ["2025-01-07T11:30:00", "2025-01-07T12:00:00", "2025-01-07T12:30:00"]
+                and list(columns["sensors"]) == ["inlet"]), \
+            f"Unexpected range result: {columns}"
+        print("✅ Range cut to [start, end) with only the requested sensors")
+        
+        import base64
+        import web_app
+        served = web_app.data_reader
+        original = (served.config.DATA_DIR, served.recent)
+        served.config.DATA_DIR = test_data_dir
+        served.recent = None
+        client = web_app.app.test_client()
+        headers = {'Authorization': 'Basic ' + base64.b64encode(b'admin:solar123').decode()}
+        try:
+            day = client.get('/api/range?start=2025-01-07T10:00&end=2025-01-07T14:00', headers=headers)
+            months = client.get('/api/range?start=2024-10-01T00:00&end=2025-01-08T00:00', headers=headers)
+            stepped = client.get('/api/range?start=2024-10-01T00:00&end=2025-01-08T00:00&step=3600', headers=headers)
+            limited = client.get('/api/range?start=2024-10-01T00:00&end=2025-01-08T00:00&max_points=3', headers=headers)
+        finally:
+            served.config.DATA_DIR, served.recent = original
+        assert day.status_code == 200 and day.get_json()["count"] == 8, f"Unexpected raw range: {day.status_code}"
+        assert months.status_code == 400 and "/api/export" in months.get_json()["error"], \
+            f"Raw range of months not refused: {months.status_code}"
+        print("✅ Raw readings limited to a week, longer ranges pointed at /api/export")
+        assert stepped.status_code == 200 and stepped.get_json()["count"] == 4, \
+            f"Unexpected stepped range: {stepped.status_code}"
+        assert limited.status_code == 200 and limited.get_json()["count"] <= 3, \
+            f"Unexpected max_points range: {limited.status_code}"
+        print("✅ Long ranges served with step or max_points")
+    finally:
+        shutil.rmtree(test_data_dir, ignore_errors=True)
+
+def test_period_filtering():
+    """Test period filtering without per-row datetime parsing"""
+    print("\n=== Testing Period Filtering ===")
+    
+    from datetime import timedelta
+    from web_app import DataReader
+    
+    test_data_dir = tempfile.mkdtemp()
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    expected = []
+    for hours_ago in range(3, -1, -1):
+        hour = now - timedelta(hours=hours_ago)
+        with open(os.path.join(test_data_dir, f"temp_log_{hour:%Y%m%d_%H}.jsonl"), 'w') as f:
+            for minute in (0, 20, 40):
+                timestamp = (hour + timedelta(minutes=minute)).isoformat()
+                f.write(json.dumps({"timestamp": timestamp, "sensors": {"inlet": 20.0}}) + '\n')
+                if hour + timedelta(minutes=minute) >= datetime.now() - timedelta(hours=2):
+                    expected.append(timestamp)
+    # A legacy file without an hour in its name, out of order and overlapping the hourly files
+    legacy = [(now - timedelta(minutes=m)).isoformat() for m in (50, 170, 10)]
+    with open(os.path.join(test_data_dir, "temp_log_legacy.json"), 'w') as f:
+        json.dump([{"timestamp": t, "sensors": {"inlet": 21.0}} for t in legacy], f)
+    expected = sorted(expected + [t for t in legacy if t >= (datetime.now() - timedelta(hours=2)).isoformat()])
+    
+    reader = DataReader()
+    reader.config.DATA_DIR = test_data_dir
+    reader.recent = None
+    
+    try:
+        timestamps = [r["timestamp"] for r in reader.get_data_for_period(2)]
+        assert timestamps == expected, f"Unexpected readings: {timestamps} (expected {expected})"
+        print(f"✅ Period cut and merged in time order ({len(timestamps)} readings)")
+    finally:
+        shutil.rmtree(test_data_dir, ignore_errors=True)
+
+def test_spectrogram():
+    """Test the server-side STFT of acoustic captures"""
+    print("\n=== Testing Spectrogram ===")
+    
+    import math
+    from acoustic import SpectrogramCache, compute_spectrogram
+    
+    sample_rate = 8000
+    tone = [math.sin(2 * math.pi * 1000 * i / sample_rate) for i in range(sample_rate)]
+    spectrogram = compute_spectrogram(tone, 1024, 256)
+    frames = spectrogram["frames"]
+    
+    assert spectrogram["num_frames"] == (len(tone) - 1024) // 256 + 1 and spectrogram["num_bins"] == 512, \
+        f"Unexpected shape: {spectrogram['num_frames']} x {spectrogram['num_bins']}"
+    print(f"✅ {spectrogram['num_frames']} frames of 512 bins")
+    
+    peak_hz = int(frames[3].argmax()) * sample_rate / 1024
+    assert peak_hz == 1000 and frames.dtype.itemsize == 1, f"Peak at {peak_hz} Hz"
+    print("✅ 1 kHz tone peaks in the 1 kHz bin of the quantized frames")
+    
+    # Batches of a few frames give the same result as one big batch
+    import acoustic
+    batch_samples = acoustic.STFT_BATCH_SAMPLES
+    acoustic.STFT_BATCH_SAMPLES = 3 * 1024
+    try:
+        batched = compute_spectrogram(tone, 1024, 256)
+    finally:
+        acoustic.STFT_BATCH_SAMPLES = batch_samples
+    assert (batched["frames"] == frames).all() and batched["db_offset"] == spectrogram["db_offset"], \
+        "Batched STFT differs"
+    print("✅ Batched STFT matches a single batch")
+    
+    try:
+        compute_spectrogram([0.0] * (acoustic.MAX_SPECTROGRAM_CELLS // 256 + 2048), 512, 1)
+        refused = False
+    except ValueError:
+        refused = True
+    assert refused, "Oversized spectrogram was computed"
+    print("✅ Oversized spectrogram refused")
+    
+    cache = SpectrogramCache(max_bytes=frames.nbytes)
+    cache.put(("a",), spectrogram)
+    cache.put(("b",), spectrogram)
+    assert cache.get(("a",)) is None and cache.get(("b",)) is spectrogram, "Spectrogram cache not bounded"
+    print("✅ Spectrogram cache evicts least recently used")
+
+def test_acoustic_loader():
+    """Test bulk CSV parsing and the memory-mapped sample sidecar"""
+    print("\n=== Testing Acoustic Loader ===")
+    
+    from acoustic import _parse_csv, load_acoustic_file, sidecar_path, to_list
+    
+    test_dir = tempfile.mkdtemp()
+    try:
+        capture = os.path.join(test_dir, "capture.csv")
+        with open(capture, 'w') as f:
+            f.write("# sample_rate=4000\nt_s,x_g,y_g,z_g\n")
+            for i in range(1000):
+                f.write(f"{i / 4000:.6f},{i * 0.001:.5f},{-i * 0.002:.5f},0.98\n")
+        
+        expected = _parse_csv(capture)
+        first = load_acoustic_file(capture)
+        second = load_acoustic_file(capture)
+        
+        matches = all(
+            {axis: to_list(values) for axis, values in loaded['axes'].items()} == expected['axes']
+            and loaded['sample_rate'] == 4000
+            for loaded in (first, second)
+        )
+        assert matches, "Loaded samples differ from the line parser"
+        print("✅ Bulk-parsed samples match the line parser")
+        
+        if os.path.exists(sidecar_path(capture)):
+            assert type(second['axes']['x']).__name__ == 'memmap', "Sample sidecar not used"
+            print("✅ Later loads memory-map the .npy sidecar")
+        else:
+            assert isinstance(first['axes']['x'], list), "Sample sidecar not written"
+            print("✅ numpy not installed, line parser used")
+        
+        if os.path.exists(sidecar_path(capture)):
+            with open(capture, 'a') as f:
+                f.write("0.250000,9.0,9.0,9.0\n")
+            os.utime(capture, ns=(os.stat(sidecar_path(capture)).st_mtime_ns + 10**9,) * 2)
+            assert len(load_acoustic_file(capture)['axes']['x']) == 1001, "Stale sidecar still used"
+            print("✅ Stale sidecar replaced after the CSV changed")
+            
+            # A CSV replaced by an older copy (cp -p, rsync) must not match the sidecar either
+            with open(capture, 'a') as f:
+                f.write("0.250250,8.0,8.0,8.0\n")
+            os.utime(capture, ns=(10**18, 10**18))
+            assert len(load_acoustic_file(capture)['axes']['x']) == 1002, "Sidecar of a different CSV used"
+            print("✅ Sidecar rebuilt for a CSV with an older mtime")
+        
+        # The body is scanned in chunks; a comment split across two must still be seen
+        import acoustic
+        single = os.path.join(test_dir, "single.csv")
+        with open(single, 'w') as f:
+            f.write("".join(f"{i * 0.5}\n" for i in range(200)))
+            f.write("# sample_rate=2000\n")
+            f.write("".join(f"{i * 0.25}\n" for i in range(200)))
+        chunk_bytes = acoustic.PARSE_CHUNK_BYTES
+        acoustic.PARSE_CHUNK_BYTES = 37
+        try:
+            loaded = load_acoustic_file(single)
+        finally:
+            acoustic.PARSE_CHUNK_BYTES = chunk_bytes
+        assert to_list(loaded['samples']) == _parse_csv(single)['samples'] and loaded['sample_rate'] == 2000, \
+            f"Chunked scan result differs (sample rate {loaded['sample_rate']})"
+        print("✅ Chunked scan finds comments in the body")
+    finally:
+        shutil.rmtree(test_dir, ignore_errors=True)
+
+def test_acoustic_decimation():
+    """Test min/max envelopes and anti-aliased decimation of acoustic samples"""
+    print("\n=== Testing Acoustic Decimation ===")
+    
+    import math
+    from acoustic import decimate_filtered, minmax_envelope
+    
+    signal = [math.sin(i * 0.01) for i in range(10000)]
+    signal[5003] = 5.0
+    envelope, bucket = minmax_envelope(signal, 1000)
+    assert len(envelope) <= 1000 and max(envelope) == 5.0 and min(envelope) == min(signal), \
+        "Envelope lost peaks or is too long"
+    print(f"✅ Envelope of {len(envelope)} values keeps the peaks (buckets of {bucket})")
+    
+    sample_rate = 8000
+    low = [math.sin(2 * math.pi * 50 * i / sample_rate) for i in range(sample_rate)]
+    mixed = [v + math.sin(2 * math.pi * 3000 * i / sample_rate) for i, v in enumerate(low)]
+    decimated, factor = decimate_filtered(mixed, 10)
+    error = max(abs(d - low[i * factor]) for i, d in enumerate(decimated[50:-50], start=50))
+    assert factor == 10 and error < 0.01, f"Aliasing after decimation (factor {factor}, error {error:.3f})"
+    print("✅ Decimation filters out content above the new Nyquist frequency")
+
+def test_restart_within_hour():
+    """Test that an hour compressed before a restart keeps both of its parts"""
+    print("\n=== Testing Restart Within an Hour ===")
+    
+    from log_archive import append_to_day_archive, compress_hour, load_index, read_archived, member_path
+    from web_app import DataReader
+    
+    test_data_dir = tempfile.mkdtemp()
+    hour = datetime(2025, 1, 7, 10)
+    first = [{"timestamp": f"2025-01-07T10:{m:02d}:00", "sensors": {"inlet": 20.0}} for m in (0, 10, 20)]
+    second = [{"timestamp": f"2025-01-07T10:{m:02d}:00", "sensors": {"inlet": 21.0}} for m in (40, 50)]
+    
+    def write_part(path, readings):
+        with open(path, 'w') as f:
+            for reading in readings:
+                f.write(json.dumps(reading) + '\n')
+    
+    try:
+        raw_path = os.path.join(test_data_dir, f"temp_log_{hour:%Y%m%d_%H}.jsonl")
+        
+        # First run: the hour is compressed at a rotation or catch-up, then the monitor comes back
+        write_part(raw_path, first)
+        gz_path = compress_hour(raw_path)
+        write_part(raw_path, second)
+        
+        reader = DataReader()
+        reader.config.DATA_DIR = test_data_dir
+        reader.recent = None
+        timestamps = [r["timestamp"] for r in reader.iter_readings(hour, hour + timedelta(hours=1))]
+        assert timestamps == [r["timestamp"] for r in first + second], \
+            f"Unexpected readings for the split hour: {timestamps}"
+        print("✅ Archived and raw parts of the hour are both read, in order")
+        
+        # Second compression of the same hour appends rather than overwrites
+        compress_hour(raw_path)
+        content = [json.loads(line) for line in read_archived(gz_path).splitlines()]
+        assert content == first + second and not os.path.exists(raw_path), \
+            f"Hour archive lost readings: {len(content)} of {len(first + second)}"
+        print("✅ Recompressing the hour appends a gzip member")
+        
+        # Folding into the daily archive keeps every part of an hour seen twice
+        archive_path = os.path.join(test_data_dir, "temp_log_20250107.jsonl.gz")
+        append_to_day_archive(archive_path, [gz_path])
+        os.remove(gz_path)
+        write_part(raw_path, [{"timestamp": "2025-01-07T10:59:00", "sensors": {"inlet": 22.0}}])
+        append_to_day_archive(archive_path, [compress_hour(raw_path)])
+        append_to_day_archive(archive_path, [gz_path])  # a pass that stopped before removing the file
+        
+        stem = f"temp_log_{hour:%Y%m%d_%H}"
+        content = read_archived(member_path(archive_path, stem)).splitlines()
+        assert len(load_index(archive_path)[stem]) == 4 and len(content) == 6, \
+            f"Daily archive index: {load_index(archive_path)}, {len(content)} readings"
+        print("✅ Daily archive index keeps both parts of the hour")
+    finally:
+        shutil.rmtree(test_data_dir, ignore_errors=True)
+
+def test_rollup_downsampling():
+    """Test that hour-sized chart buckets keep to max_points and the clock"""
+    print("\n=== Testing Rollup Downsampling ===")
+    
+    import base64
+    import web_app
+    
+    def bucket(t):
+        return (t.toordinal() * 24 + t.hour) // 2
+    
+    test_data_dir = tempfile.mkdtemp()
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    expected = set()
+    for hours_ago in range(30):
+        if hours_ago == 5:
+            continue  # a gap must not shift the buckets after it
+        hour = now - timedelta(hours=hours_ago)
+        with open(os.path.join(test_data_dir, f"temp_log_{hour:%Y%m%d_%H}.jsonl"), 'w') as f:
+            for minute in (0, 20, 40):
+                timestamp = hour + timedelta(minutes=minute)
+                f.write(json.dumps({"timestamp": timestamp.isoformat(), "sensors": {"inlet": 20.0}}) + '\n')
+                if timestamp >= datetime.now() - timedelta(hours=24):
+                    expected.add(bucket(timestamp))
+    
+    reader = web_app.data_reader
+    original = (reader.config.DATA_DIR, reader.recent)
+    reader.config.DATA_DIR = test_data_dir
+    reader.recent = None
+    client = web_app.app.test_client()
+    headers = {'Authorization': 'Basic ' + base64.b64encode(b'admin:solar123').decode()}
+    
+    try:
+        over = []
+        for max_points in (3, 7, 12, 24):
+            body = client.get(f'/api/data/24h?max_points={max_points}', headers=headers).get_json()
+            if body["count"] > max_points or sum(r["count"] for r in body["data"]) != body["raw_count"]:
+                over.append((max_points, body["count"]))
+        assert not over, f"max_points exceeded: {over}"
+        print("✅ Rollup buckets never exceed max_points and cover every reading")
+        
+        body = client.get('/api/data/24h?resolution=7200', headers=headers).get_json()
+        buckets = [bucket(datetime.fromisoformat(r["timestamp"])) for r in body["data"]]
+        assert buckets == sorted(expected), f"Buckets not aligned: {[r['timestamp'] for r in body['data']]}"
+        print(f"✅ Two-hour buckets aligned to the clock across a missing hour ({body['count']} buckets)")
+    finally:
+        reader.config.DATA_DIR, reader.recent = original
+        shutil.rmtree(test_data_dir, ignore_errors=True)
+
 if __name__ == "__main__":
     print("Testing Solar Monitor Improvements")
     print("=" * 50)
@@ -181,6 +756,19 @@ if __name__ == "__main__":
     test_web_app_data_reading()
     test_security_config()
     test_migration_script()
+    test_live_stream()
+    test_live_socket()
+    test_streams_leave_threads_free()
+    test_conditional_responses()
+    test_api_encoding()
+    test_streaming_export()
+    test_range_queries()
+    test_period_filtering()
+    test_spectrogram()
+    test_acoustic_loader()
+    test_acoustic_decimation()
+    test_restart_within_hour()
+    test_rollup_downsampling()
     
     print("\n" + "=" * 50)
     print("Testing completed!")
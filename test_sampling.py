@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test script to verify parallel sensor sampling and the fixed-cadence scheduler
+"""
+
+import os
+import time
+import tempfile
+import shutil
+
+class SlowSensor:
+    """Fake sensor that blocks like a DS18B20 conversion"""
+
+    def __init__(self, sensor_id, delay):
+        self.sensor_id = sensor_id
+        self.delay = delay
+
+    def get_temperature(self):
+        time.sleep(self.delay)
+        return 21.5
+
+def test_parallel_sensor_reads():
+    """Test that sensors are sampled concurrently with a per-sensor timeout"""
+    print("=== Testing Parallel Sensor Reads ===")
+
+    from config import Config
+    from sensor_monitor import SolarMonitor
+
+    test_data_dir = tempfile.mkdtemp()
+    original_data_dir = Config.DATA_DIR
+    original_timeout = Config.SENSOR_READ_TIMEOUT
+    original_shared_ring = Config.SHARED_RING
+    original_live_socket = Config.LIVE_SOCKET_PATH
+    Config.DATA_DIR = test_data_dir
+    Config.SENSOR_READ_TIMEOUT = 1.0
+    Config.SHARED_RING = False  # keep clear of the live /dev/shm ring
+    Config.LIVE_SOCKET_PATH = os.path.join(test_data_dir, "live.sock")
+
+    try:
+        monitor = SolarMonitor()
+        monitor.sensors = [SlowSensor(f"s{i}", 0.3) for i in range(3)] + [SlowSensor("stuck", 3.0)]
+
+        start = time.monotonic()
+        reading = monitor.read_sensors()
+        elapsed = time.monotonic() - start
+
+        assert elapsed < 1.5, f"Sensor reads took {elapsed:.2f}s, expected them to run concurrently"
+        print(f"✅ Four sensors read in {elapsed:.2f}s (one conversion time + timeout)")
+
+        assert reading["sensors"]["stuck"] is None and reading["sensors"]["s0"] == 21.5, \
+            f"Unexpected readings: {reading['sensors']}"
+        print("✅ Timed-out sensor reported as None, others unaffected")
+
+        assert all(monitor.read_latencies.get(f"s{i}") for i in range(3)), \
+            f"Missing read latencies: {monitor.read_latencies}"
+        print(f"✅ Per-sensor latency recorded: {monitor.read_latencies}")
+    finally:
+        Config.DATA_DIR = original_data_dir
+        Config.SENSOR_READ_TIMEOUT = original_timeout
+        Config.SHARED_RING = original_shared_ring
+        Config.LIVE_SOCKET_PATH = original_live_socket
+        shutil.rmtree(test_data_dir, ignore_errors=True)
+
+def test_interval_scheduler():
+    """Test that the scheduler keeps cadence and skips missed ticks"""
+    print("\n=== Testing Interval Scheduler ===")
+
+    from sensor_monitor import IntervalScheduler
+
+    scheduler = IntervalScheduler(0.1)
+    start = time.monotonic()
+    for i in range(6):
+        scheduler.wait()
+        time.sleep(0.25 if i == 2 else 0.04)
+    elapsed = time.monotonic() - start
+    stats = scheduler.stats()
+
+    assert stats["skipped_ticks"] == 1 and stats["overruns"] == 1, f"Unexpected scheduler stats: {stats}"
+    print(f"✅ Overrun detected and missed tick coalesced: {stats}")
+
+    # 6 ticks + 1 skipped = 6 intervals from the first tick, plus the last tick's work
+    assert abs(elapsed - 0.64) < 0.05, f"Loop drifted: {elapsed:.2f}s"
+    print(f"✅ Cadence held without drift ({elapsed:.2f}s)")
+
+def test_batched_log_writes():
+    """Test that readings are buffered and written per batch or durability window"""
+    print("\n=== Testing Batched Log Writes ===")
+
+    from log_writer import BufferedLogWriter
+
+    test_data_dir = tempfile.mkdtemp()
+    try:
+        test_file = os.path.join(test_data_dir, "temp_log_20250107_10.jsonl")
+        writer = BufferedLogWriter(test_file, batch_size=3, flush_interval=0.2)
+
+        writer.write(b'{"n": 1}\n')
+        writer.write(b'{"n": 2}\n')
+        assert os.path.getsize(test_file) == 0 and writer.pending() == 2, \
+            f"Readings written early ({os.path.getsize(test_file)} bytes)"
+        print("✅ Readings buffered until the batch fills")
+
+        writer.write(b'{"n": 3}\n')
+        assert writer.pending() == 0 and os.path.getsize(test_file) == 27, \
+            f"Batch not written: {writer.pending()} pending"
+        print("✅ Full batch written in one go")
+
+        writer.write(b'{"n": 4}\n')
+        time.sleep(0.25)
+        writer.write(b'{"n": 5}\n')
+        assert writer.pending() == 0, f"Partial batch held past the window: {writer.pending()} pending"
+        print("✅ Partial batch written once the durability window passed")
+
+        writer.write(b'{"n": 6}\n')
+        writer.close()
+        with open(test_file) as f:
+            lines = f.readlines()
+        assert len(lines) == 6, "Readings lost on close"
+        print("✅ Close flushed the remaining readings")
+    finally:
+        shutil.rmtree(test_data_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    print("Testing Sensor Sampling")
+    print("=" * 50)
+
+    test_parallel_sensor_reads()
+    test_interval_scheduler()
+    test_batched_log_writes()
+
+    print("\n" + "=" * 50)
+    print("Testing completed!")
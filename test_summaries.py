@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Test script to verify hourly rollups and summary statistics
+"""
+
+import math
+
+READINGS = [
+    {"timestamp": "2025-01-07T10:00:00", "sensors": {"sensor1": 20.0, "sensor2": 30.0}},
+    {"timestamp": "2025-01-07T10:00:05", "sensors": {"sensor1": 22.0, "sensor2": None}},
+    {"timestamp": "2025-01-07T10:00:10", "sensors": {"sensor1": 21.0, "sensor2": 34.0}},
+    {"timestamp": "2025-01-07T10:00:15", "sensors": {"sensor1": 25.0, "sensor2": 32.0}}
+]
+
+def test_rollup_summary():
+    """Test that merged rollups give the same summary as the raw readings"""
+    print("=== Testing Hourly Rollups ===")
+    
+    from rollups import compute_rollup, merge_rollups, summarize_rollup
+    
+    merged = merge_rollups([compute_rollup(READINGS[:2]), compute_rollup(READINGS[2:])])
+    summary = summarize_rollup(merged)
+    
+    assert merged["count"] == 4 and merged["start"] == READINGS[0]["timestamp"], \
+        f"Unexpected merged rollup: {merged}"
+    print("✅ Rollups merged across hours")
+    
+    expected = {"min": 20.0, "max": 25.0, "avg": 22.0, "current": 25.0}
+    assert all(summary["sensor1"][k] == v for k, v in expected.items()), \
+        f"Unexpected rollup summary: {summary['sensor1']}"
+    print("✅ Rollup summary matches raw min/max/avg/current")
+    
+    assert math.isclose(summary["sensor2"]["stddev"], math.sqrt(8 / 3)), \
+        f"Unexpected stddev: {summary['sensor2']}"
+    print("✅ Standard deviation derived from sum of squares, missing values skipped")
+
+def test_column_summary():
+    """Test vectorized summary statistics with and without numpy"""
+    print("\n=== Testing Column Summary Statistics ===")
+    
+    import summary_stats
+    from data_cache import append_readings, empty_columns
+    
+    columns = append_readings(empty_columns(), READINGS)
+    results = [summary_stats.summarize_columns(columns, [50])]
+    
+    numpy_module = summary_stats.np
+    summary_stats.np = None
+    try:
+        results.append(summary_stats.summarize_columns(columns, [50]))
+    finally:
+        summary_stats.np = numpy_module
+    
+    for stats in results:
+        assert stats["sensor1"]["percentiles"]["p50"] == 21.5 and stats["sensor2"]["max"] == 34.0, \
+            f"Unexpected column summary: {stats}"
+        print("✅ Percentiles and extremes computed, missing values ignored")
+
+if __name__ == "__main__":
+    print("Testing Summaries")
+    print("=" * 50)
+    
+    test_rollup_summary()
+    test_column_summary()
+    
+    print("\n" + "=" * 50)
+    print("Testing completed!")
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Test script to verify Google Drive uploads without a real rclone
+"""
+
+import os
+import threading
+import tempfile
+import shutil
+import subprocess
+from unittest import mock
+
+class FakeRclone:
+    """Stands in for subprocess.run: records rclone calls and fails copies on request"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.copies = []
+        self.checks = 0
+
+    def __call__(self, cmd, **kwargs):
+        if cmd[:2] == ["rclone", "version"]:
+            self.checks += 1
+        if cmd[:2] == ["rclone", "lsd"]:
+            return subprocess.CompletedProcess(cmd, 0, "          -1 2025-01-07 10:00:00        -1 solar-monitor-data\n", "")
+        if cmd[:2] == ["rclone", "copy"]:
+            files_from = None
+            if "--files-from" in cmd:
+                # The list is a temporary file removed after the call, so read it now
+                with open(cmd[cmd.index("--files-from") + 1]) as f:
+                    files_from = f.read()
+            self.copies.append((cmd[2:], files_from))
+            if self.failures:
+                self.failures -= 1
+                return subprocess.CompletedProcess(cmd, 1, "", "network unreachable")
+        return subprocess.CompletedProcess(cmd, 0, "", "")
+
+def write_file(path, content="{}\n"):
+    with open(path, 'a') as f:
+        f.write(content)
+
+def test_manifest_skips_uploaded_files():
+    """Test that files in the upload manifest are not sent again"""
+    print("=== Testing Upload Manifest ===")
+
+    from config import Config
+    from google_drive_uploader import GoogleDriveUploader
+
+    test_data_dir = tempfile.mkdtemp()
+    original_data_dir = Config.DATA_DIR
+    Config.DATA_DIR = test_data_dir
+
+    try:
+        paths = [os.path.join(test_data_dir, f"temp_log_20250107_{hour}.jsonl") for hour in (10, 11, 12)]
+        for path in paths:
+            write_file(path)
+
+        rclone = FakeRclone()
+        with mock.patch("subprocess.run", rclone):
+            uploaded = GoogleDriveUploader().upload_files(paths)
+            # A new uploader (e.g. after a restart) reads the manifest from disk
+            again = GoogleDriveUploader().upload_files(paths)
+
+        assert sorted(uploaded) == paths and again == paths and len(rclone.copies) == 1, \
+            f"Unexpected uploads: {len(rclone.copies)} rclone copies, second pass {again}"
+        print("✅ Uploaded files recorded and skipped on the next pass")
+
+        write_file(paths[1], '{"late": true}\n')
+        rclone = FakeRclone()
+        with mock.patch("subprocess.run", rclone):
+            uploader = GoogleDriveUploader()
+            uploader.upload_files(paths)
+            missing = uploader.sync_pending_files(test_data_dir)
+
+        assert [args[0] for args, _ in rclone.copies] == [paths[1]] and missing == [], \
+            f"Unexpected copies after a change: {rclone.copies}"
+        print("✅ Only the file that changed since its upload is sent again")
+    finally:
+        Config.DATA_DIR = original_data_dir
+        shutil.rmtree(test_data_dir, ignore_errors=True)
+
+def test_files_from_list():
+    """Test that a batch is sent as one rclone copy with a --files-from list"""
+    print("\n=== Testing Batched Upload List ===")
+
+    from config import Config
+    from google_drive_uploader import GoogleDriveUploader
+
+    test_data_dir = tempfile.mkdtemp()
+    original_data_dir = Config.DATA_DIR
+    Config.DATA_DIR = test_data_dir
+
+    try:
+        paths = [os.path.join(test_data_dir, name) for name in
+                 ("temp_log_20250107_10.jsonl.gz", "temp_log_20250107_11.jsonl", "temp_log_20250106.jsonl.gz")]
+        for path in paths:
+            write_file(path)
+        write_file(os.path.join(test_data_dir, "temp_log_20250107_09.jsonl"))  # not asked for
+
+        rclone = FakeRclone()
+        with mock.patch("subprocess.run", rclone):
+            GoogleDriveUploader().upload_files(paths)
+
+        assert len(rclone.copies) == 1, f"Unexpected rclone calls: {rclone.copies}"
+        args, files_from = rclone.copies[0]
+        assert args[:2] == [os.path.abspath(test_data_dir), "gdrive:solar-monitor-data/"], \
+            f"Unexpected rclone copy: {args}"
+        print("✅ One rclone copy from the data directory")
+
+        assert files_from == "".join(os.path.basename(p) + "\n" for p in paths), \
+            f"Unexpected --files-from list: {files_from!r}"
+        print("✅ --files-from lists exactly the requested files by name")
+
+        assert not os.path.exists(args[args.index("--files-from") + 1]), "Temporary file list left behind"
+        print("✅ Temporary file list removed")
+    finally:
+        Config.DATA_DIR = original_data_dir
+        shutil.rmtree(test_data_dir, ignore_errors=True)
+
+def test_upload_backoff():
+    """Test the retry delays of a failing upload and their cap"""
+    print("\n=== Testing Upload Backoff ===")
+
+    from config import Config
+    from google_drive_uploader import GoogleDriveUploader
+
+    test_data_dir = tempfile.mkdtemp()
+    originals = (Config.DATA_DIR, Config.UPLOAD_MAX_ATTEMPTS, Config.UPLOAD_BACKOFF_BASE, Config.UPLOAD_BACKOFF_MAX)
+    Config.DATA_DIR = test_data_dir
+    Config.UPLOAD_MAX_ATTEMPTS = 6
+    Config.UPLOAD_BACKOFF_BASE = 2.0
+    Config.UPLOAD_BACKOFF_MAX = 5.0
+
+    try:
+        path = os.path.join(test_data_dir, "temp_log_20250107_10.jsonl")
+        write_file(path)
+
+        rclone = FakeRclone(failures=100)
+        with mock.patch("subprocess.run", rclone), mock.patch("time.sleep") as sleep:
+            uploader = GoogleDriveUploader()
+            result = uploader.upload_file(path)
+        delays = [call.args[0] for call in sleep.call_args_list]
+
+        assert result is None and len(rclone.copies) == 6 and delays == [2.0, 4.0, 5.0, 5.0, 5.0], \
+            f"Unexpected retries: {len(rclone.copies)} attempts, delays {delays}"
+        print("✅ Delays double up to UPLOAD_BACKOFF_MAX, no sleep after the last attempt")
+
+        assert uploader._ready_until is None and not uploader.is_uploaded(path), \
+            "Failed upload left the uploader state unchanged"
+        print("✅ Failed upload not recorded and rclone re-checked next time")
+
+        rclone = FakeRclone(failures=2)
+        with mock.patch("subprocess.run", rclone), mock.patch("time.sleep"):
+            result = uploader.upload_file(path)
+        assert result and len(rclone.copies) == 3 and uploader.is_uploaded(path), \
+            f"Unexpected result after transient failures: {result}, {len(rclone.copies)} attempts"
+        print("✅ Upload succeeds on a later attempt")
+    finally:
+        Config.DATA_DIR, Config.UPLOAD_MAX_ATTEMPTS, Config.UPLOAD_BACKOFF_BASE, Config.UPLOAD_BACKOFF_MAX = originals
+        shutil.rmtree(test_data_dir, ignore_errors=True)
+
+def test_rclone_check_ttl():
+    """Test that the rclone/folder check is cached for RCLONE_CHECK_TTL and redone when it expires"""
+    print("\n=== Testing rclone Check Cache ===")
+
+    from config import Config
+    from google_drive_uploader import GoogleDriveUploader
+
+    test_data_dir = tempfile.mkdtemp()
+    originals = (Config.DATA_DIR, Config.RCLONE_CHECK_TTL, Config.UPLOAD_MAX_ATTEMPTS)
+    Config.DATA_DIR = test_data_dir
+    Config.RCLONE_CHECK_TTL = 3600
+    Config.UPLOAD_MAX_ATTEMPTS = 1
+    clock = [1000.0]
+
+    try:
+        paths = [os.path.join(test_data_dir, f"temp_log_20250107_{hour}.jsonl") for hour in range(10, 14)]
+        for path in paths:
+            write_file(path)
+
+        rclone = FakeRclone()
+        with mock.patch("subprocess.run", rclone), mock.patch("time.monotonic", lambda: clock[0]):
+            uploader = GoogleDriveUploader()
+            checks = [rclone.checks]
+            uploader.upload_file(paths[0])
+            checks.append(rclone.checks)
+            clock[0] += 3599
+            uploader.upload_file(paths[1])
+            checks.append(rclone.checks)
+            clock[0] += 2
+            uploader.upload_file(paths[2])
+            checks.append(rclone.checks)
+
+            rclone.failures = 1
+            uploader.upload_file(paths[3])
+            uploader.upload_file(paths[3])
+            checks.append(rclone.checks)
+
+        assert checks[:4] == [0, 1, 1, 2], f"Unexpected rclone checks: {checks}"
+        print("✅ Check run lazily, trusted within the TTL and redone once it expired")
+
+        assert checks[4] == 3 and uploader.is_uploaded(paths[3]), f"Check not redone after a failed copy: {checks}"
+        print("✅ A failed copy invalidates the cached check")
+    finally:
+        Config.DATA_DIR, Config.RCLONE_CHECK_TTL, Config.UPLOAD_MAX_ATTEMPTS = originals
+        shutil.rmtree(test_data_dir, ignore_errors=True)
+
+class FakeUploader:
+    """Stands in for GoogleDriveUploader in the upload worker; fails the first `failures` batches
+
+    With a `gate`, each batch blocks until the gate is set, so a test can act while a pass is running.
+    """
+
+    def __init__(self, failures=0, gate=None):
+        self.failures = failures
+        self.gate = gate
+        self.batches = []
+        self.uploaded = set()
+        self._changed = threading.Condition()
+
+    def upload_files(self, file_paths):
+        with self._changed:
+            self.batches.append(list(file_paths))
+            self._changed.notify_all()
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.failures:
+            self.failures -= 1
+            return []
+        self.uploaded.update(file_paths)
+        return list(file_paths)
+
+    def wait_for_batches(self, count, timeout=5.0):
+        with self._changed:
+            return self._changed.wait_for(lambda: len(self.batches) >= count, timeout)
+
+    def is_uploaded(self, file_path):
+        return file_path in self.uploaded
+
+    def mark_uploaded(self, file_paths):
+        self.uploaded.update(file_paths)
+
+    def sync_pending_files(self, data_dir, exclude=None):
+        return []
+
+def test_upload_queue():
+    """Test that queued uploads survive a restart, are retried and are kept at shutdown"""
+    print("\n=== Testing Upload Queue ===")
+
+    from config import Config
+    from upload_worker import UploadWorker
+
+    test_data_dir = tempfile.mkdtemp()
+    originals = (Config.DATA_DIR, Config.UPLOAD_RETRY_INTERVAL, Config.ARCHIVE_CLOSED_HOURS)
+    Config.DATA_DIR = test_data_dir
+    Config.UPLOAD_RETRY_INTERVAL = 0.05
+    Config.ARCHIVE_CLOSED_HOURS = False
+
+    try:
+        paths = [os.path.join(test_data_dir, f"temp_log_20250107_{hour}.jsonl") for hour in (10, 11)]
+        for path in paths:
+            write_file(path)
+
+        worker = UploadWorker()
+        for path in paths:
+            worker.enqueue(path)
+        worker.enqueue(paths[0])  # queued twice, uploaded once
+        # Never started (e.g. the monitor crashed): a new worker finds the files queued on disk
+        restarted = UploadWorker()
+        assert restarted.pending_files() == paths, f"Queue after restart: {restarted.pending_files()}"
+        print("✅ Queued files survive a restart")
+
+        uploader = FakeUploader(failures=2)
+        restarted._uploader = uploader
+        restarted.start()
+        assert uploader.wait_for_batches(3), f"Failed uploads not retried: {uploader.batches}"
+        restarted.stop(timeout=5)
+        assert uploader.batches[:3] == [paths] * 3 and uploader.uploaded == set(paths), \
+            f"Unexpected retries: {uploader.batches}"
+        assert restarted.pending_files() == [] and UploadWorker().pending_files() == [], \
+            "Uploaded files still in the queue file"
+        print("✅ Failed uploads stay queued, are retried and leave the queue file once uploaded")
+
+        # Shutdown requested while a pass is uploading: the file queued with it still goes out
+        Config.UPLOAD_RETRY_INTERVAL = 60
+        first = os.path.join(test_data_dir, "temp_log_20250107_12.jsonl")
+        late = os.path.join(test_data_dir, "temp_log_20250107_13.jsonl")
+        write_file(first)
+        write_file(late)
+        gate = threading.Event()
+        uploader = FakeUploader(gate=gate)
+        busy = UploadWorker()
+        busy._uploader = uploader
+        busy.start()
+        busy.enqueue(first)
+        assert uploader.wait_for_batches(1), "Worker did not start its pass"
+        busy.enqueue(late)
+        stopper = threading.Thread(target=busy.stop, kwargs={"timeout": 5})
+        stopper.start()
+        assert busy._stop.wait(5), "stop() not requested"
+        gate.set()
+        stopper.join(10)
+        assert not busy._thread.is_alive(), "Worker still running after stop()"
+        assert uploader.uploaded == {first, late} and UploadWorker().pending_files() == [], \
+            f"Worker did not finish its last pass at shutdown: uploaded {uploader.uploaded}"
+        print("✅ A file queued during the last pass is uploaded before the worker stops")
+
+        # Offline at shutdown: the file is kept for the next run
+        offline = UploadWorker()
+        offline._uploader = FakeUploader(failures=100)
+        offline.start()
+        last = os.path.join(test_data_dir, "temp_log_20250107_14.jsonl")
+        write_file(last)
+        offline.enqueue(last)
+        offline.stop(timeout=5)
+        assert not offline._thread.is_alive(), "Worker still running after stop()"
+        assert UploadWorker().pending_files() == [last], "Pending file lost at shutdown"
+        print("✅ Files not uploaded by shutdown stay queued on disk")
+    finally:
+        Config.DATA_DIR, Config.UPLOAD_RETRY_INTERVAL, Config.ARCHIVE_CLOSED_HOURS = originals
+        shutil.rmtree(test_data_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    print("Testing Uploads")
+    print("=" * 50)
+
+    test_manifest_skips_uploaded_files()
+    test_files_from_list()
+    test_upload_backoff()
+    test_rclone_check_ttl()
+    test_upload_queue()
+
+    print("\n" + "=" * 50)
+    print("Testing completed!")
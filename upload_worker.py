@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Background worker that uploads closed log files and prunes old data
+off the sensor sampling thread
+"""
+
+import os
+import glob
+import json
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+from config import Config
+from log_archive import append_to_day_archive, compress_hour, day_archive_path, find_closed_days
+
+logger = logging.getLogger(__name__)
+
+class UploadWorker:
+    """Upload closed hourly files to Google Drive from a background thread.
+    
+    Pending uploads are persisted to a small JSON queue file in DATA_DIR, so
+    files closed before a crash, reboot or network outage are still uploaded
+    once the worker runs again.
+    """
+    
+    def __init__(self, cleanup: Optional[Callable[[], None]] = None,
+                 active_file: Optional[Callable[[], Optional[str]]] = None):
+        self.config = Config()
+        self.queue_file = os.path.join(self.config.DATA_DIR, self.config.UPLOAD_QUEUE_FILE)
+        self._cleanup = cleanup
+        self._cleanup_requested = False
+        self._active_file = active_file
+        self._catch_up_requested = True
+        self._uploader = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._pending = self._load_queue()
+        
+        if self._pending:
+            logger.info(f"Upload queue has {len(self._pending)} pending file(s) from a previous run")
+    
+    def _load_queue(self) -> List[str]:
+        """Load pending uploads from the on-disk queue"""
+        try:
+            with open(self.queue_file, 'r') as f:
+                return list(json.load(f))
+        except FileNotFoundError:
+            return []
+        except Exception as e:
+            logger.error(f"Error reading upload queue {self.queue_file}: {e}")
+            return []
+    
+    def _save_queue(self):
+        """Persist pending uploads (write-then-rename so a power cut can't corrupt it)"""
+        tmp_path = self.queue_file + '.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(self._pending, f)
+            os.replace(tmp_path, self.queue_file)
+        except Exception as e:
+            logger.error(f"Error writing upload queue {self.queue_file}: {e}")
+    
+    def start(self):
+        """Start the background upload thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="upload-worker", daemon=True)
+        self._thread.start()
+        if self._pending:
+            self._wakeup.set()
+    
+    def stop(self, timeout: float = 30.0):
+        """Finish the current pass (including any just-queued file) and stop"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logger.warning("Upload worker still busy at shutdown, pending files stay queued")
+    
+    def enqueue(self, file_path: str):
+        """Queue a closed log file for upload; returns immediately"""
+        with self._lock:
+            if file_path not in self._pending:
+                self._pending.append(file_path)
+                self._save_queue()
+        self._wakeup.set()
+    
+    def request_cleanup(self):
+        """Ask the worker to prune old data files after its next upload pass"""
+        self._cleanup_requested = True
+        self._wakeup.set()
+    
+    def pending_files(self) -> List[str]:
+        """Return a snapshot of files waiting to be uploaded"""
+        with self._lock:
+            return list(self._pending)
+    
+    def _run(self):
+        """Worker loop: upload pending files, retrying periodically while offline"""
+        while True:
+            self._wakeup.wait(self.config.UPLOAD_RETRY_INTERVAL)
+            self._wakeup.clear()
+            # Read once per pass: a stop() arriving mid-pass gets one more pass for files queued with it
+            stopping = self._stop.is_set()
+            
+            self._process_queue()
+            
+            if self.config.ARCHIVE_CLOSED_HOURS:
+                try:
+                    self._compact_archives()
+                except Exception as e:
+                    logger.error(f"Error archiving closed log files: {e}")
+            
+            if self._catch_up_requested and not self.pending_files():
+                self._catch_up()
+            
+            if self._cleanup_requested and self._cleanup:
+                self._cleanup_requested = False
+                try:
+                    self._cleanup()
+                except Exception as e:
+                    logger.error(f"Error during file cleanup: {e}")
+            
+            if stopping:
+                break
+    
+    def _get_uploader(self):
+        """Create the uploader lazily so rclone checks also run off the sampling thread"""
+        if self._uploader is None:
+            from google_drive_uploader import GoogleDriveUploader
+            self._uploader = GoogleDriveUploader()
+        return self._uploader
+    
+    def _process_queue(self):
+        """Upload all queued files in one batch; failures stay queued for the next pass"""
+        pending = self.pending_files()
+        if not pending:
+            return
+        
+        if self.config.ARCHIVE_CLOSED_HOURS:
+            pending = self._compress_pending(pending)
+        
+        existing = [p for p in pending if os.path.exists(p)]
+        for file_path in pending:
+            if file_path not in existing:
+                logger.warning(f"Queued file no longer exists, dropping: {file_path}")
+        
+        try:
+            uploaded = set(self._get_uploader().upload_files(existing)) if existing else set()
+        except Exception as e:
+            logger.error(f"Failed to upload to Google Drive: {e}")
+            uploaded = set()
+        
+        done = uploaded | (set(pending) - set(existing))
+        with self._lock:
+            self._pending = [p for p in self._pending if p not in done]
+            self._save_queue()
+        
+        failed = len(existing) - len(uploaded)
+        if failed:
+            self._catch_up_requested = True
+            logger.warning(f"{failed} file(s) not uploaded, retrying in {self.config.UPLOAD_RETRY_INTERVAL}s")
+    
+    def _compress_pending(self, pending: List[str]) -> List[str]:
+        """Replace queued raw hourly files with their gzipped version, which is what gets uploaded"""
+        for file_path in pending:
+            if not file_path.endswith('.jsonl') or not os.path.exists(file_path):
+                continue
+            try:
+                gz_path = compress_hour(file_path)
+            except Exception as e:
+                logger.error(f"Error compressing {file_path}, uploading it uncompressed: {e}")
+                continue
+            with self._lock:
+                self._pending = [gz_path if p == file_path else p for p in self._pending]
+                self._save_queue()
+        return self.pending_files()
+    
+    def _compact_archives(self):
+        """Compress leftover raw hours and fold the hours of finished days into daily archives
+        
+        An archive built only from hours that were already uploaded is recorded
+        as uploaded too, so it is not sent a second time.
+        """
+        data_dir = self.config.DATA_DIR
+        prefix = self.config.LOG_FILE_PREFIX
+        pending = set(self.pending_files())
+        active = self._active_file() if self._active_file else None
+        uploader = self._get_uploader()
+        
+        # Closed hours written before archiving was enabled; stay clear of the hour
+        # just rotated, which the monitor may still be reading for its rollup
+        settled = (datetime.now() - timedelta(hours=2)).strftime("%Y%m%d_%H")
+        for file_path in sorted(glob.glob(os.path.join(data_dir, f"{prefix}_*.jsonl"))):
+            stem = os.path.basename(file_path)[len(prefix) + 1:-len('.jsonl')]
+            if file_path == active or file_path in pending or len(stem) != 11 or stem >= settled:
+                continue
+            uploaded = uploader.is_uploaded(file_path)
+            gz_path = compress_hour(file_path)
+            if uploaded:
+                uploader.mark_uploaded([gz_path])
+            else:
+                self.enqueue(gz_path)
+        
+        pending = set(self.pending_files())
+        for day, hourly_paths in find_closed_days(data_dir, prefix).items():
+            if any(p in pending for p in hourly_paths):
+                continue  # fold them in once their upload went through
+            
+            archive_path = day_archive_path(data_dir, prefix, day)
+            uploaded = all(uploader.is_uploaded(p) for p in hourly_paths)
+            if os.path.exists(archive_path):
+                uploaded = uploaded and uploader.is_uploaded(archive_path)
+            
+            append_to_day_archive(archive_path, hourly_paths)
+            if uploaded:
+                uploader.mark_uploaded([archive_path])
+            else:
+                self.enqueue(archive_path)
+            for hourly_path in hourly_paths:
+                os.remove(hourly_path)
+            logger.info(f"Archived {len(hourly_paths)} hourly file(s) into {os.path.basename(archive_path)}")
+    
+    def _catch_up(self):
+        """Upload any local files missing from the upload manifest (e.g. after an outage)"""
+        try:
+            exclude = [self._active_file()] if self._active_file else []
+            self._get_uploader().sync_pending_files(self.config.DATA_DIR, exclude=exclude)
+            self._catch_up_requested = False
+        except Exception as e:
+            logger.error(f"Error catching up pending uploads: {e}")
@@ -5,20 +5,48 @@ Web interface for solar water heater monitoring system
 
 import os
 import json
+import math
+import hashlib
+import io
 import csv as csv_module
+import time
+import heapq
 import logging
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
 from functools import wraps
-from flask import Flask, render_template, jsonify, request, Response
+from operator import itemgetter
+from flask import Flask, render_template, jsonify, request, Response, make_response
 from config import Config
+from binary_log import read_columns as read_binary_columns
+from data_cache import HourlyFileCache, LogTailReader, columns_to_readings
+from shared_ring import SharedRingReader, default_ring_path
+from log_archive import HOUR_ARCHIVE_SUFFIX, is_archived, load_index, member_path, read_archived, split_member_path
+from downsample import DOWNSAMPLE_METHODS, downsample_columns
+from rollups import RollupIndex, bucket_rollups, compute_rollup, merge_rollups, rollup_to_reading, summarize_rollup
+from summary_stats import summarize_columns
+from live_stream import ReadingBroadcaster, default_socket_path
+from web_server import serve
+from acoustic import (MAX_FFT_SIZE, MAX_JSON_SPECTROGRAM_CELLS, MAX_SPECTROGRAM_CELLS, MIN_FFT_SIZE, MIN_HOP_DIVISOR,
+                      STFT_WINDOWS, SpectrogramCache, compute_spectrogram, decimate_filtered, load_acoustic_file,
+                      minmax_envelope, spectrogram_shape, to_list)
+from api_encoding import FastJSONProvider, compress_response, negotiate_encoding, readings_to_columns
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 config = Config()
 
+@app.after_request
+def compress_api_response(response):
+    """Compress API payloads for clients that accept gzip or brotli"""
+    if config.API_COMPRESSION and request.path.startswith('/api/'):
+        compress_response(response, negotiate_encoding(request.accept_encodings), config.API_COMPRESS_MIN_BYTES)
+    return response
+
 def check_auth(username, password):
     """Check if username/password combination is valid"""
     return username == config.WEB_USERNAME and password == config.WEB_PASSWORD
@@ -40,11 +68,67 @@ def requires_auth(f):
         return f(*args, **kwargs)
     return decorated
 
+def conditional(validator, cache_control: str):
+    """Decorator adding ETag/Last-Modified/Cache-Control and answering 304 Not Modified
+    
+    validator gets the view's arguments and returns (version, last_modified)
+    describing the data behind the response, or None to skip caching. It is
+    checked before the view runs, so a 304 costs no data processing at all.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            validated = validator(*args, **kwargs)
+            if validated is None:
+                return f(*args, **kwargs)
+            
+            version, last_modified = validated
+            # Weak: the representation may differ (e.g. compressed) for the same data
+            etag = hashlib.sha1(f"{request.full_path}|{version}".encode('utf-8')).hexdigest()[:16]
+            last_modified = last_modified.replace(microsecond=0)
+            
+            if request.if_none_match:
+                fresh = request.if_none_match.contains_weak(etag)
+            else:
+                fresh = request.if_modified_since is not None and last_modified <= request.if_modified_since
+            
+            if fresh:
+                response = Response(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            
+            response.set_etag(etag, weak=True)
+            response.last_modified = last_modified
+            response.headers['Cache-Control'] = cache_control
+            return response
+        return decorated
+    return decorator
+
+# Hourly files are rotated a few seconds after :00, so a file can hold the
+# first readings of the following hour as well
+FILE_ROTATION_SLACK = timedelta(minutes=5)
+
+# A shared ring that hasn't been written for this long is left over from a
+# monitor that stopped (or runs with SHARED_RING off); the files are used instead
+RING_STALE_AFTER = timedelta(minutes=2)
+
+# The file index is rebuilt when the data directory changes; this bounds how long
+# it can miss a change that doesn't touch the directory (e.g. binary logging turned off)
+FILE_INDEX_MAX_AGE = 60  # seconds
+
 class DataReader:
     """Read and process temperature data files"""
     
     def __init__(self):
         self.config = Config()
+        self.file_cache = HourlyFileCache(self.config.DATA_CACHE_MAX_MB * 1024 * 1024)
+        self.tail_reader = LogTailReader()
+        self.rollups = RollupIndex(os.path.join(self.config.DATA_DIR, self.config.ROLLUP_INDEX_FILE))
+        # Recent readings published by the monitor in shared memory, served without file I/O
+        self.recent = SharedRingReader(self.config.SHARED_RING_PATH or default_ring_path()) if self.config.SHARED_RING else None
+        self._file_index = None
     
     def get_data_files(self) -> List[str]:
         """Get list of available data files"""
@@ -55,17 +139,107 @@ class DataReader:
             logger.warning(f"Data directory does not exist: {data_dir}")
             return []
         
-        files = []
+        files = {}
+        binary_files = {}
+        archived_files = {}
         for filename in os.listdir(data_dir):
-            if filename.startswith(self.config.LOG_FILE_PREFIX) and (filename.endswith('.json') or filename.endswith('.jsonl')):
-                files.append(os.path.join(data_dir, filename))
+            if not filename.startswith(self.config.LOG_FILE_PREFIX):
+                continue
+            filepath = os.path.join(data_dir, filename)
+            if filename.endswith('.json') or filename.endswith('.jsonl'):
+                files[os.path.splitext(filename)[0]] = filepath
+            elif filename.endswith('.bin'):
+                binary_files[os.path.splitext(filename)[0]] = filepath
+            elif filename.endswith(HOUR_ARCHIVE_SUFFIX):
+                if self.get_file_hour(filepath) is not None:
+                    archived_files[filename[:-len(HOUR_ARCHIVE_SUFFIX)]] = filepath
+                else:
+                    # Daily archive: one entry per hour it holds
+                    for stem in load_index(filepath):
+                        archived_files.setdefault(stem, member_path(filepath, stem))
+        
+        # An hour can have both an archived and a raw part: the monitor restarted within
+        # the hour after the first part was compressed. Both are read, the archived
+        # (older) part first.
+        earlier_parts = {}
+        for stem, archived_path in archived_files.items():
+            if stem in files:
+                earlier_parts[stem] = archived_path
+            else:
+                files[stem] = archived_path
+        
+        # A .bin companion holds the same readings and needs no parsing, so it is used
+        # instead - unless it stopped being written (binary logging turned off mid-hour)
+        for stem, bin_path in binary_files.items():
+            text_path = files.get(stem)
+            try:
+                if text_path is None or os.path.getmtime(bin_path) >= os.path.getmtime(split_member_path(text_path)[0]):
+                    files[stem] = bin_path
+            except OSError:
+                pass
+        
+        # A .bin companion is never compressed, so it already holds the earlier part too
+        extra = [path for stem, path in earlier_parts.items() if not files[stem].endswith('.bin')]
+        
+        logger.info(f"Found {len(files) + len(extra)} data files")
+        return sorted(list(files.values()) + extra)
+    
+    def get_file_hour(self, filepath: str) -> Optional[datetime]:
+        """Get the hour a data file covers from its name (temp_log_YYYYmmdd_HH.jsonl)"""
+        filename = split_member_path(filepath)[1] or os.path.basename(filepath)
+        stem = filename[len(self.config.LOG_FILE_PREFIX) + 1:].split('.')[0]
+        try:
+            return datetime.strptime(stem[:11], "%Y%m%d_%H")
+        except ValueError:
+            return None
+    
+    def get_file_index(self):
+        """Data files by hour, as (sorted hours, paths in the same order, files without an hour)
+        
+        Listing the directory and choosing between raw, binary and archived
+        copies is only redone when the directory changes (a file is created,
+        renamed or removed) or the index is FILE_INDEX_MAX_AGE old.
+        """
+        data_dir = os.path.abspath(self.config.DATA_DIR)
+        try:
+            key = (data_dir, os.stat(data_dir).st_mtime_ns)
+        except OSError:
+            key = (data_dir, None)
+        
+        index = self._file_index
+        if index is None or index[0] != key or time.monotonic() - index[1] > FILE_INDEX_MAX_AGE:
+            dated, undated = [], []
+            for filepath in self.get_data_files():
+                file_hour = self.get_file_hour(filepath)
+                if file_hour is None:
+                    undated.append(filepath)
+                else:
+                    # The archived part of an hour split by a restart goes before its raw part
+                    dated.append((file_hour, not is_archived(filepath), filepath))
+            dated.sort()
+            index = (key, time.monotonic(), [h for h, _, _ in dated], [p for _, _, p in dated], undated)
+            self._file_index = index
+        return index[2:]
+    
+    def get_data_files_for_range(self, start: datetime, end: Optional[datetime] = None) -> List[str]:
+        """Get data files whose hour overlaps [start, end], in time order
         
-        logger.info(f"Found {len(files)} data files")
-        return sorted(files)
+        The hours come from the file names, so the files are found by binary
+        search in the file index without opening any. Files whose names don't
+        carry an hour are always included (first).
+        """
+        hours, paths, undated = self.get_file_index()
+        lo = bisect_right(hours, start - timedelta(hours=1) - FILE_ROTATION_SLACK)
+        hi = bisect_right(hours, end) if end is not None else len(hours)
+        return undated + paths[lo:hi]
     
     def read_data_file(self, filepath: str) -> List[Dict]:
-        """Read data from a single file (supports both JSON and JSONL formats)"""
+        """Read data from a single file (supports JSON, JSONL, binary and archived formats)"""
         try:
+            if is_archived(filepath):
+                return [json.loads(line) for line in read_archived(filepath).splitlines() if line.strip()]
+            if filepath.endswith('.bin'):
+                return columns_to_readings(read_binary_columns(filepath))
             with open(filepath, 'r') as f:
                 if filepath.endswith('.jsonl'):
                     data = []
@@ -80,41 +254,247 @@ class DataReader:
             logger.error(f"Error reading {filepath}: {e}")
             return []
     
+    def read_data_columns(self, filepath: str) -> Dict:
+        """Read a data file as columns ({"timestamps": [...], "sensors": {name: [...]}}), via the cache"""
+        return self.file_cache.get(filepath)
+    
+    def get_recent_columns(self, since: str):
+        """Get the shared ring's readings at or after since (ISO timestamp)
+        
+        Returns (columns, until): files are only needed for readings before
+        until, which is None when there is no ring to read from.
+        """
+        if not self.recent:
+            return None, None
+        # Only the part of the ring inside the window is copied
+        ring = self.recent.columns(since=since)
+        if not ring or not ring["timestamps"]:
+            return None, None
+        if ring["timestamps"][-1] < (datetime.now() - RING_STALE_AFTER).isoformat():
+            return None, None
+        
+        oldest = self.recent.oldest_timestamp()
+        if oldest is None or oldest >= since:
+            # The ring starts inside the window (e.g. monitor restarted): files fill the gap before it
+            return ring, ring["timestamps"][0]
+        return ring, since
+    
     def get_data_for_period(self, hours: int) -> List[Dict]:
-        """Get temperature data for specified number of hours"""
+        """Get temperature data for specified number of hours
+        
+        Timestamps are compared as ISO strings, which order like the times
+        they spell. Files lying wholly inside the window are taken without
+        looking at their rows, hourly files at the edges are cut with a
+        bisect (their rows are in time order), and the per-file runs are
+        concatenated - or k-way merged where they overlap - rather than
+        sorted as one list.
+        """
         cutoff_time = datetime.now() - timedelta(hours=hours)
-        all_data = []
+        cutoff_str = cutoff_time.isoformat()
+        runs = []
         
-        files = self.get_data_files()
+        recent, until = self.get_recent_columns(cutoff_str)
+        if until is None:
+            files = self.get_data_files_for_range(cutoff_time)
+        elif until > cutoff_str:
+            files = self.get_data_files_for_range(cutoff_time, datetime.fromisoformat(until))
+        else:
+            files = []
         logger.info(f"Processing {len(files)} files for {hours}h period (cutoff: {cutoff_time})")
         
         for filepath in files:
-            data = self.read_data_file(filepath)
-            readings_added = 0
-            for reading in data:
-                try:
-                    timestamp = datetime.fromisoformat(reading['timestamp'])
-                    if timestamp >= cutoff_time:
-                        all_data.append(reading)
-                        readings_added += 1
-                except Exception as e:
-                    logger.error(f"Error parsing timestamp in {filepath}: {e}")
-                    continue
+            columns = self.read_data_columns(filepath)
+            timestamps = columns["timestamps"]
+            file_hour = self.get_file_hour(filepath)
             
-            if readings_added > 0:
-                logger.debug(f"Added {readings_added} readings from {os.path.basename(filepath)}")
+            if file_hour is None:
+                # Legacy files aren't known to be in order: check each row, still without parsing
+                rows = [
+                    reading for reading in columns_to_readings(columns)
+                    if reading['timestamp'] >= cutoff_str and (until is None or reading['timestamp'] < until)
+                ]
+                rows.sort(key=itemgetter('timestamp'))
+            elif file_hour >= cutoff_time and (until is None or
+                                               (file_hour + timedelta(hours=1) + FILE_ROTATION_SLACK).isoformat() <= until):
+                rows = columns_to_readings(columns)
+            else:
+                first = bisect_left(timestamps, cutoff_str)
+                last = bisect_left(timestamps, until) if until else len(timestamps)
+                rows = columns_to_readings(columns, first, max(first, last))
+            
+            if rows:
+                runs.append(rows)
+                logger.debug(f"Added {len(rows)} readings from {os.path.basename(filepath)}")
         
-        all_data.sort(key=lambda x: x['timestamp'])
+        if all(a[-1]['timestamp'] <= b[0]['timestamp'] for a, b in zip(runs, runs[1:])):
+            # The usual case: hourly files follow each other, so the runs just join up
+            all_data = [reading for rows in runs for reading in rows]
+        else:
+            all_data = list(heapq.merge(*runs, key=itemgetter('timestamp')))
+        if recent:
+            all_data.extend(columns_to_readings(recent))
         logger.info(f"Returning {len(all_data)} total readings for {hours}h period")
         return all_data
     
+    def get_columns_for_period(self, hours: int) -> Dict:
+        """Get the period's readings as one columnar block, without building per-row dicts"""
+        return self.get_columns_for_range(datetime.now() - timedelta(hours=hours))
+    
+    def get_columns_for_range(self, start: datetime, end: Optional[datetime] = None,
+                              sensors: Optional[List[str]] = None) -> Dict:
+        """Get the readings in [start, end) as one columnar block, optionally only some sensors
+        
+        Only the files overlapping the range are read, and rows within a file
+        are in time order, so each file is cut to the range with two bisects.
+        """
+        start_str = start.isoformat()
+        end_str = end.isoformat() if end else None
+        block = {"timestamps": [], "sensors": {}}
+        
+        recent, until = self.get_recent_columns(start_str)
+        if until is not None and end_str is not None and end_str < until:
+            until = end_str
+        files_end = until or end_str
+        if files_end is None or files_end > start_str:
+            end_time = datetime.fromisoformat(files_end) if files_end else None
+            for filepath in self.get_data_files_for_range(start, end_time):
+                columns = self.read_data_columns(filepath)
+                first = bisect_left(columns["timestamps"], start_str)
+                last = bisect_left(columns["timestamps"], files_end) if files_end else len(columns["timestamps"])
+                self._extend_columns(block, columns, first, last, sensors)
+        
+        if recent:
+            last = bisect_left(recent["timestamps"], end_str) if end_str else len(recent["timestamps"])
+            self._extend_columns(block, recent, 0, last, sensors)
+        return block
+    
+    @staticmethod
+    def _extend_columns(block: Dict, columns: Dict, start: int, end: int, only: Optional[List[str]] = None):
+        """Append rows [start, end) of columns to block, keeping every sensor column aligned
+        
+        With only, other sensors' columns are never copied.
+        """
+        if end <= start:
+            return
+        timestamps = block["timestamps"]
+        sensors = block["sensors"]
+        for name, values in columns["sensors"].items():
+            if only is not None and name not in only:
+                continue
+            if name not in sensors:
+                sensors[name] = [None] * len(timestamps)
+            sensors[name].extend(values[start:end])
+        timestamps.extend(columns["timestamps"][start:end])
+        for values in sensors.values():
+            if len(values) < len(timestamps):
+                values.extend([None] * (len(timestamps) - len(values)))
+    
+    def iter_file_readings(self, filepath: str) -> Iterator[Dict]:
+        """Yield a data file's readings without caching them; JSONL files are read line by line"""
+        if not filepath.endswith('.jsonl'):
+            yield from self.read_data_file(filepath)
+            return
+        try:
+            with open(filepath, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        try:
+                            yield json.loads(line)
+                        except ValueError as e:
+                            logger.error(f"Error parsing line in {filepath}: {e}")
+        except OSError as e:
+            logger.error(f"Error reading {filepath}: {e}")
+    
+    def iter_readings(self, start: datetime, end: Optional[datetime] = None) -> Iterator[Dict]:
+        """Yield the readings in [start, end) in time order, one file at a time
+        
+        Unlike get_data_for_period nothing is collected or cached, so memory
+        use doesn't grow with the length of the range (for exports). Readings
+        still buffered by the monitor are taken from the shared ring.
+        """
+        start_str = start.isoformat()
+        end_str = end.isoformat() if end else None
+        last = None
+        
+        for filepath in self.get_data_files_for_range(start, end):
+            for reading in self.iter_file_readings(filepath):
+                timestamp = reading.get('timestamp')
+                if timestamp is None or timestamp < start_str or (last is not None and timestamp <= last):
+                    continue
+                if end_str is not None and timestamp >= end_str:
+                    break
+                last = timestamp
+                yield reading
+        
+        recent, _ = self.get_recent_columns(last or start_str)
+        if recent:
+            for reading in columns_to_readings(recent, bisect_right(recent["timestamps"], last) if last else 0):
+                if end_str is not None and reading['timestamp'] >= end_str:
+                    break
+                yield reading
+    
+    def get_rollups_for_period(self, hours: int) -> List[Dict]:
+        """Get one rollup per data file covering the period, in time order
+        
+        Closed files lying entirely inside the period come from the rollup index
+        written at rotation; the partial first hour, the active file and files
+        without a rollup are summarised from their (cached) readings.
+        """
+        cutoff_time = datetime.now() - timedelta(hours=hours)
+        cutoff_str = cutoff_time.isoformat()
+        rollups = []
+        from_index = 0
+        
+        files = self.get_data_files_for_range(cutoff_time)
+        hours = [self.get_file_hour(filepath) for filepath in files]
+        for filepath, file_hour in zip(files, hours):
+            # The rollup covers the whole hour, so it can't stand in for one part of an hour
+            # split by a restart (archived and raw parts side by side)
+            if file_hour is not None and file_hour >= cutoff_time and hours.count(file_hour) == 1:
+                # Rollups are written for the JSONL file, which a .bin companion or archive shadows here
+                stem = os.path.basename(split_member_path(filepath)[1] or filepath).split('.')[0]
+                jsonl_path = os.path.join(os.path.dirname(filepath), stem + '.jsonl')
+                try:
+                    rollup = self.rollups.get(os.path.basename(jsonl_path), os.path.getsize(jsonl_path))
+                except OSError:
+                    # Archived hours were closed before compression, so their rollup can't be stale
+                    rollup = self.rollups.get(os.path.basename(jsonl_path))
+                if rollup is not None:
+                    rollups.append(rollup)
+                    from_index += 1
+                    continue
+            
+            columns = self.read_data_columns(filepath)
+            readings = [r for r in columns_to_readings(columns) if r['timestamp'] >= cutoff_str]
+            rollups.append(compute_rollup(readings))
+        
+        logger.info(f"Built {len(rollups)} hourly rollups for {hours}h period ({from_index} from index)")
+        return [r for r in rollups if r.get("count")]
+    
     def get_latest_reading(self) -> Optional[Dict]:
         """Get the most recent temperature reading"""
-        files = self.get_data_files()
-        if not files:
-            return None
+        if self.recent:
+            latest = self.recent.latest()
+            if latest is not None and latest["timestamp"] >= (datetime.now() - RING_STALE_AFTER).isoformat():
+                return latest
+        
+        # The monitor writes to the file for the current hour; only list the directory if it isn't there
+        current_file = os.path.join(
+            os.path.abspath(self.config.DATA_DIR),
+            f"{self.config.LOG_FILE_PREFIX}_{datetime.now().strftime('%Y%m%d_%H')}.jsonl"
+        )
+        if os.path.exists(current_file):
+            latest_file = current_file
+        else:
+            files = self.get_data_files()
+            if not files:
+                return None
+            latest_file = files[-1]
+        
+        if latest_file.endswith('.jsonl'):
+            return self.tail_reader.latest(latest_file)
         
-        latest_file = files[-1]
         data = self.read_data_file(latest_file)
         
         if data:
@@ -124,6 +504,61 @@ class DataReader:
 
 data_reader = DataReader()
 
+def readings_since(last_id: str) -> List[Dict]:
+    """Readings after last_id from the shared ring, to catch up a reconnecting stream client"""
+    columns, _ = data_reader.get_recent_columns(last_id)
+    if not columns:
+        return []
+    start = bisect_right(columns["timestamps"], last_id)
+    return columns_to_readings(columns, max(start, len(columns["timestamps"]) - config.SSE_BACKLOG))
+
+def latest_data_version(*args, **kwargs):
+    """Validator for data derived from all readings: changes whenever a new reading is logged"""
+    latest = data_reader.get_latest_reading()
+    if not latest:
+        return None
+    try:
+        return latest['timestamp'], datetime.fromisoformat(latest['timestamp']).astimezone()
+    except (KeyError, ValueError):
+        return None
+
+def acoustic_file_version(filename):
+    """Validator for an acoustic recording: its size and mtime"""
+    if '..' in filename or filename.startswith('/'):
+        return None
+    try:
+        stat = os.stat(os.path.join(os.path.abspath(config.DATA_DIR), 'acoustic', filename))
+    except OSError:
+        return None
+    return f"{stat.st_mtime_ns}-{stat.st_size}", datetime.fromtimestamp(stat.st_mtime).astimezone()
+
+# Period data changes with every reading: let browsers keep it but always revalidate
+DATA_CACHE_CONTROL = 'private, no-cache'
+# Acoustic recordings are written once and never change
+ACOUSTIC_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+
+# Named periods of the dashboard, /api/data, /api/summary and /api/export, in hours
+PERIOD_HOURS = {
+    '24h': config.RETENTION_24H,
+    '48h': config.RETENTION_48H,
+    '1w': config.RETENTION_1W
+}
+# Longest /api/range window served as raw readings, one dict per reading
+RANGE_MAX_RAW_HOURS = max(PERIOD_HOURS.values())
+
+spectrogram_cache = SpectrogramCache(config.SPECTROGRAM_CACHE_MB * 1024 * 1024)
+
+broadcaster = ReadingBroadcaster(
+    data_reader.get_latest_reading,
+    backlog=config.SSE_BACKLOG,
+    poll_interval=config.SSE_POLL_INTERVAL,
+    history=readings_since,
+    max_clients=config.SSE_MAX_CLIENTS
+)
+
+# How long a dashboard turned away from the live stream waits before trying again
+STREAM_RETRY_AFTER = 60
+
 @app.route('/')
 @requires_auth
 def index():
@@ -140,72 +575,274 @@ def get_current_data():
     else:
         return jsonify({"error": "No data available"}), 404
 
+@app.route('/api/stream')
+@requires_auth
+def stream_readings():
+    """Push new readings as Server-Sent Events
+    
+    Reconnecting clients send Last-Event-ID and receive the readings they missed.
+    Each stream holds a server thread, so once SSE_MAX_CLIENTS are open further
+    ones get 503 and the dashboard polls /api/current instead.
+    """
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    events = broadcaster.events(last_id)
+    if events is None:
+        return Response(
+            f"retry: {STREAM_RETRY_AFTER * 1000}\n\n",
+            status=503,
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'Retry-After': str(STREAM_RETRY_AFTER)}
+        )
+    return Response(
+        events,
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/data/<period>')
 @requires_auth
+@conditional(latest_data_version, DATA_CACHE_CONTROL)
 def get_historical_data(period):
-    """Get historical temperature data"""
-    period_hours = {
-        '24h': 24,
-        '48h': 48,
-        '1w': 168
-    }
+    """Get historical temperature data
     
-    if period not in period_hours:
+    Optional query parameters reduce the payload to what a chart can show:
+    max_points (target number of rows), resolution (bucket width in seconds)
+    and method ("minmax" buckets with mean/min/max, or "lttb").
+    format=columns returns data as {"t": [...], "<sensor>": [...]} instead of
+    a list of row objects, which avoids repeating the keys in every row.
+    """
+    if period not in PERIOD_HOURS:
         return jsonify({"error": "Invalid period"}), 400
     
-    hours = period_hours[period]
-    data = data_reader.get_data_for_period(hours)
+    max_points = request.args.get('max_points', type=int)
+    resolution = request.args.get('resolution', type=float)
+    method = request.args.get('method', 'minmax')
+    shape = request.args.get('format', 'rows')
+    
+    if (max_points is not None and max_points < 2) or (resolution is not None and resolution <= 0):
+        return jsonify({"error": "Invalid max_points or resolution"}), 400
+    if method not in DOWNSAMPLE_METHODS:
+        return jsonify({"error": "Invalid method"}), 400
+    if shape not in ('rows', 'columns'):
+        return jsonify({"error": "Invalid format"}), 400
+    
+    hours = PERIOD_HOURS[period]
+    
+    # Buckets of an hour or more are served straight from the hourly rollups
+    bucket_hours = (resolution / 3600 if resolution else hours / max_points if max_points else 0)
+    if method == 'minmax' and bucket_hours >= 1:
+        rollups = data_reader.get_rollups_for_period(hours)
+        group = math.ceil(bucket_hours)
+        data = [rollup_to_reading(bucket) for bucket in bucket_rollups(rollups, group)]
+        # The period rarely starts on a bucket boundary, so it can touch one bucket more than it spans
+        while max_points and len(data) > max_points:
+            group += 1
+            data = [rollup_to_reading(bucket) for bucket in bucket_rollups(rollups, group)]
+        return jsonify({
+            "period": period,
+            "data": readings_to_columns(data) if shape == 'columns' else data,
+            "count": len(data),
+            "raw_count": sum(r["count"] for r in rollups),
+            "downsampled": True
+        })
+    
+    if max_points or resolution:
+        # Bucketed straight from the cached columns: no dict per raw reading
+        columns = data_reader.get_columns_for_period(hours)
+        raw_count = len(columns["timestamps"])
+        data = downsample_columns(columns, max_points=max_points, resolution=resolution, method=method)
+    else:
+        data = data_reader.get_data_for_period(hours)
+        raw_count = len(data)
     
     return jsonify({
         "period": period,
-        "data": data,
-        "count": len(data)
+        "data": readings_to_columns(data) if shape == 'columns' else data,
+        "count": len(data),
+        "raw_count": raw_count,
+        "downsampled": len(data) != raw_count
     })
 
 @app.route('/api/summary/<period>')
 @requires_auth
+@conditional(latest_data_version, DATA_CACHE_CONTROL)
 def get_summary_data(period):
     """Get summary statistics for a period"""
-    period_hours = {
-        '24h': 24,
-        '48h': 48,
-        '1w': 168
-    }
-    
-    if period not in period_hours:
+    if period not in PERIOD_HOURS:
         return jsonify({"error": "Invalid period"}), 400
     
-    hours = period_hours[period]
-    data = data_reader.get_data_for_period(hours)
+    hours = PERIOD_HOURS[period]
     
-    if not data:
+    # Percentiles need the raw values; everything else comes from the hourly rollups
+    percentiles = request.args.get('percentiles')
+    if percentiles:
+        try:
+            quantiles = [float(q) for q in percentiles.split(',')]
+        except ValueError:
+            return jsonify({"error": "Invalid percentiles"}), 400
+        if any(q < 0 or q > 100 for q in quantiles):
+            return jsonify({"error": "Invalid percentiles"}), 400
+        
+        columns = data_reader.get_columns_for_period(hours)
+        if not columns["timestamps"]:
+            return jsonify({"error": "No data available"}), 404
+        
+        return jsonify({
+            "period": period,
+            "summary": summarize_columns(columns, quantiles),
+            "data_points": len(columns["timestamps"])
+        })
+    
+    merged = merge_rollups(data_reader.get_rollups_for_period(hours))
+    
+    if not merged["count"]:
         return jsonify({"error": "No data available"}), 404
     
-    summary = {}
+    return jsonify({
+        "period": period,
+        "summary": summarize_rollup(merged),
+        "data_points": merged["count"]
+    })
+
+def parse_query_time(value: str) -> datetime:
+    """Parse an ISO timestamp from a query string as local time, like the stored readings
+    
+    Raises ValueError if it isn't one.
+    """
+    timestamp = datetime.fromisoformat(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone().replace(tzinfo=None)
+    return timestamp
+
+@app.route('/api/range')
+@requires_auth
+@conditional(latest_data_version, DATA_CACHE_CONTROL)
+def get_range_data():
+    """Get readings between start and end (ISO timestamps; end defaults to now)
+    
+    Optional query parameters: sensors (comma-separated names, others are
+    left out), step (bucket width in seconds) or max_points, with method
+    as for /api/data, and format=columns. Raw readings are only returned
+    for up to RANGE_MAX_RAW_HOURS; longer ranges need step or max_points,
+    and bulk pulls go to the streamed /api/export.
+    """
+    try:
+        start = parse_query_time(request.args.get('start', ''))
+        end = parse_query_time(request.args['end']) if request.args.get('end') else None
+    except ValueError:
+        return jsonify({"error": "Invalid start or end"}), 400
+    if end is not None and end <= start:
+        return jsonify({"error": "end must be after start"}), 400
     
-    all_sensor_names = set()
-    for reading in data:
-        if 'sensors' in reading:
-            all_sensor_names.update(reading['sensors'].keys())
+    sensors = [name for name in request.args.get('sensors', '').split(',') if name] or None
+    step = request.args.get('step', type=float)
+    max_points = request.args.get('max_points', type=int)
+    method = request.args.get('method', 'minmax')
+    shape = request.args.get('format', 'rows')
     
-    for sensor in all_sensor_names:
-        temps = []
-        for reading in data:
-            if sensor in reading.get('sensors', {}) and reading['sensors'][sensor] is not None:
-                temps.append(reading['sensors'][sensor])
-        
-        if temps:
-            summary[sensor] = {
-                'min': min(temps),
-                'max': max(temps),
-                'avg': sum(temps) / len(temps),
-                'current': temps[-1] if temps else None
-            }
+    if step is not None and step <= 0:
+        return jsonify({"error": "Invalid step"}), 400
+    if max_points is not None and max_points < 2:
+        return jsonify({"error": "Invalid max_points"}), 400
+    if not step and not max_points and (end or datetime.now()) - start > timedelta(hours=RANGE_MAX_RAW_HOURS):
+        return jsonify({"error": f"Ranges over {RANGE_MAX_RAW_HOURS}h need step or max_points; "
+                                 f"use /api/export for raw readings"}), 400
+    if method not in DOWNSAMPLE_METHODS:
+        return jsonify({"error": "Invalid method"}), 400
+    if shape not in ('rows', 'columns'):
+        return jsonify({"error": "Invalid format"}), 400
+    
+    columns = data_reader.get_columns_for_range(start, end, sensors)
+    raw_count = len(columns["timestamps"])
+    if step or max_points:
+        data = downsample_columns(columns, max_points=max_points, resolution=step, method=method)
+    else:
+        data = columns_to_readings(columns)
     
     return jsonify({
-        "period": period,
-        "summary": summary,
-        "data_points": len(data)
+        "start": start.isoformat(),
+        "end": (end or datetime.now()).isoformat(),
+        "data": readings_to_columns(data) if shape == 'columns' else data,
+        "count": len(data),
+        "raw_count": raw_count,
+        "downsampled": len(data) != raw_count
+    })
+
+# Rows per chunk written to a streamed export: few enough to keep memory flat,
+# enough that the chunked transfer overhead stays small
+EXPORT_CHUNK_ROWS = 500
+
+def export_ndjson(readings: Iterator[Dict]) -> Iterator[str]:
+    """Encode readings as newline-delimited JSON, a chunk of rows at a time"""
+    chunk = []
+    for reading in readings:
+        chunk.append(app.json.dumps(reading))
+        if len(chunk) >= EXPORT_CHUNK_ROWS:
+            yield '\n'.join(chunk) + '\n'
+            chunk = []
+    if chunk:
+        yield '\n'.join(chunk) + '\n'
+
+def export_csv(readings: Iterator[Dict]) -> Iterator[str]:
+    """Encode readings as CSV (timestamp plus one column per sensor), a chunk of rows at a time
+    
+    The columns are those of the first reading; sensors that only appear
+    later are left out, missing ones are empty.
+    """
+    buffer = io.StringIO()
+    writer = None
+    rows = 0
+    for reading in readings:
+        if writer is None:
+            sensors = list(reading.get('sensors', {}))
+            writer = csv_module.writer(buffer)
+            writer.writerow(['timestamp'] + sensors)
+        values = reading.get('sensors', {})
+        writer.writerow([reading['timestamp']] + [
+            '' if values.get(name) is None else values[name] for name in sensors
+        ])
+        rows += 1
+        if rows % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@app.route('/api/export')
+@requires_auth
+def export_data():
+    """Stream readings as NDJSON (default) or CSV
+    
+    The range is either period (24h, 48h, 1w) or start/end ISO timestamps
+    (end defaults to now). Rows are read file by file and sent as they are
+    encoded, so any length of range is exported in constant memory.
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({"error": "Invalid format"}), 400
+    
+    try:
+        if request.args.get('start'):
+            start = parse_query_time(request.args['start'])
+        else:
+            period = request.args.get('period', '24h')
+            if period not in PERIOD_HOURS:
+                return jsonify({"error": "Invalid period"}), 400
+            start = datetime.now() - timedelta(hours=PERIOD_HOURS[period])
+        end = parse_query_time(request.args['end']) if request.args.get('end') else None
+    except ValueError:
+        return jsonify({"error": "Invalid start or end"}), 400
+    
+    readings = data_reader.iter_readings(start, end)
+    filename = f"{config.LOG_FILE_PREFIX}_{start.strftime('%Y%m%d_%H%M')}"
+    if export_format == 'csv':
+        body, mimetype, filename = export_csv(readings), 'text/csv', filename + '.csv'
+    else:
+        body, mimetype, filename = export_ndjson(readings), 'application/x-ndjson', filename + '.ndjson'
+    
+    return Response(body, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{filename}"'
     })
 
 @app.route('/spectrogram')
@@ -231,8 +868,16 @@ def list_acoustic_files():
 
 @app.route('/api/acoustic/data/<path:filename>')
 @requires_auth
+@conditional(acoustic_file_version, ACOUSTIC_CACHE_CONTROL)
 def get_acoustic_data(filename):
-    """Return raw samples from an acoustic CSV file"""
+    """Return samples from an acoustic CSV file
+
+    Optional query parameters select what is sent: start and end (sample
+    indices, or seconds with unit=seconds), axis (x, y or z for 3-axis
+    captures), and either decimate (anti-aliased downsampling by that factor)
+    or max_points (at most that many values; method=minmax keeps each
+    bucket's min and max, method=filter low-passes and downsamples).
+    """
     # Prevent path traversal
     if '..' in filename or filename.startswith('/'):
         return jsonify({'error': 'Invalid filename'}), 400
@@ -243,99 +888,190 @@ def get_acoustic_data(filename):
     if not os.path.exists(filepath):
         return jsonify({'error': 'File not found'}), 404
 
-    samples = []
-    x_samples, y_samples, z_samples, timestamps = [], [], [], []
-    sample_rate = None
-    col_map = {}
+    unit = request.args.get('unit', 'samples')
+    axis = request.args.get('axis')
+    decimate = request.args.get('decimate', type=int)
+    max_points = request.args.get('max_points', type=int)
+    method = request.args.get('method', 'minmax')
+    try:
+        start = float(request.args['start']) if request.args.get('start') else None
+        end = float(request.args['end']) if request.args.get('end') else None
+    except ValueError:
+        return jsonify({'error': 'Invalid start or end'}), 400
+    if unit not in ('samples', 'seconds'):
+        return jsonify({'error': 'Invalid unit'}), 400
+    if axis is not None and axis not in ('x', 'y', 'z'):
+        return jsonify({'error': 'Invalid axis'}), 400
+    if (decimate is not None and decimate < 1) or (max_points is not None and max_points < 2):
+        return jsonify({'error': 'Invalid decimate or max_points'}), 400
+    if method not in ('minmax', 'filter'):
+        return jsonify({'error': 'Invalid method'}), 400
 
     try:
-        with open(filepath, 'r') as f:
-            header_parsed = False
-            is_multi = False
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                # Metadata comments: # sample_rate=8000 or # fs=8000
-                if line.startswith('#'):
-                    m = next(
-                        (p for p in line[1:].split() if '=' in p and
-                         p.split('=')[0].strip().lower() in ('sample_rate', 'fs', 'samplerate')),
-                        None)
-                    if m:
-                        try:
-                            sample_rate = int(m.split('=')[1])
-                        except ValueError:
-                            pass
-                    continue
-                cols = [c.strip() for c in line.split(',')]
-                if not header_parsed:
-                    header_parsed = True
-                    try:
-                        float(cols[0])
-                        # First column is numeric — no header, use last column fallback
-                    except ValueError:
-                        # Header row — map column names
-                        for i, name in enumerate(cols):
-                            nl = name.lower()
-                            if nl in ('t_s', 't', 'time', 'timestamp'):
-                                col_map['t'] = i
-                            elif nl in ('x_g', 'x', 'ax', 'accel_x', 'acc_x'):
-                                col_map['x'] = i
-                            elif nl in ('y_g', 'y', 'ay', 'accel_y', 'acc_y'):
-                                col_map['y'] = i
-                            elif nl in ('z_g', 'z', 'az', 'accel_z', 'acc_z'):
-                                col_map['z'] = i
-                        is_multi = ('x' in col_map and 'y' in col_map and 'z' in col_map)
-                        continue
-                try:
-                    if is_multi:
-                        x_samples.append(float(cols[col_map['x']]))
-                        y_samples.append(float(cols[col_map['y']]))
-                        z_samples.append(float(cols[col_map['z']]))
-                        if 't' in col_map and col_map['t'] < len(cols):
-                            timestamps.append(float(cols[col_map['t']]))
-                    else:
-                        samples.append(float(cols[-1]))
-                except (ValueError, IndexError):
-                    pass
+        capture = load_acoustic_file(filepath)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-    # Derive sample rate from timestamps when not in metadata
-    if not sample_rate and len(timestamps) >= 2:
-        dt = (timestamps[-1] - timestamps[0]) / (len(timestamps) - 1)
-        if dt > 0:
-            sample_rate = round(1.0 / dt)
+    signals = capture['axes'] if 'axes' in capture else {None: capture['samples']}
+    if axis is not None and 'axes' in capture:
+        signals = {axis: signals[axis]}
+    total = len(next(iter(signals.values())))
 
-    if x_samples:
-        return jsonify({
-            'filename': filename,
-            'axes': {'x': x_samples, 'y': y_samples, 'z': z_samples},
-            'num_samples': len(x_samples),
-            'sample_rate': sample_rate,
-        })
+    # Resolve the range to sample indices; slicing a memory-mapped capture reads only that part
+    scale = 1
+    if unit == 'seconds':
+        if not capture['sample_rate']:
+            return jsonify({'error': 'Sample rate unknown, use sample indices'}), 400
+        scale = capture['sample_rate']
+    first = 0 if start is None else min(total, max(0, int(start * scale)))
+    last = total if end is None else min(total, max(0, int(math.ceil(end * scale))))
+    if last < first:
+        return jsonify({'error': 'end must not be before start'}), 400
 
-    return jsonify({
+    step = 1
+    try:
+        for name, values in signals.items():
+            values = values[first:last]
+            if decimate is not None and decimate > 1:
+                values, step = decimate_filtered(values, decimate)
+            elif max_points is not None and len(values) > max_points:
+                if method == 'filter':
+                    values, step = decimate_filtered(values, -(-len(values) // max_points))
+                else:
+                    values, step = minmax_envelope(values, max_points)
+                    step /= 2  # two values per bucket
+            signals[name] = to_list(values)
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 501
+
+    result = {
         'filename': filename,
-        'samples': samples,
-        'num_samples': len(samples),
-        'sample_rate': sample_rate,
-    })
+        'num_samples': len(next(iter(signals.values()))),
+        'total_samples': total,
+        'sample_rate': capture['sample_rate'],
+        'start': first,
+        'end': last,
+        'step': step,
+    }
+    if 'axes' in capture:
+        result['axes'] = signals
+    else:
+        result['samples'] = signals[None]
+    return jsonify(result)
+
+
+def spectrogram_size_error(num_frames: int, num_bins: int, binary: bool) -> Optional[str]:
+    """Why a spectrogram of this shape won't be sent, or None if it can be"""
+    cells = num_frames * num_bins
+    if cells > MAX_SPECTROGRAM_CELLS:
+        return f'{num_frames} frames x {num_bins} bins is too large, use a larger hop or a shorter file'
+    if not binary and cells > MAX_JSON_SPECTROGRAM_CELLS:
+        return f'{num_frames} frames x {num_bins} bins is too large for JSON, use format=binary'
+    return None
+
+@app.route('/api/acoustic/spectrogram/<path:filename>')
+@requires_auth
+@conditional(acoustic_file_version, ACOUSTIC_CACHE_CONTROL)
+def get_acoustic_spectrogram(filename):
+    """Return the STFT of an acoustic file as quantized dB frames
+
+    Query parameters: fft (power of two, default 1024), hop (default fft/4),
+    window (hann, hamming, blackman or rect), axis (x, y or z for 3-axis
+    captures) and format=binary for raw frame bytes with the metadata in
+    X-Spectrogram-* headers instead of JSON. Spectrograms of more than
+    MAX_SPECTROGRAM_CELLS bins (MAX_JSON_SPECTROGRAM_CELLS as JSON) are
+    refused with 400 rather than computed.
+    """
+    if '..' in filename or filename.startswith('/'):
+        return jsonify({'error': 'Invalid filename'}), 400
+
+    fft_size = request.args.get('fft', 1024, type=int)
+    hop = request.args.get('hop', fft_size // 4, type=int)
+    window = request.args.get('window', 'hann')
+    axis = request.args.get('axis', 'x')
+    if not MIN_FFT_SIZE <= fft_size <= MAX_FFT_SIZE or fft_size & (fft_size - 1):
+        return jsonify({'error': f'fft must be a power of two from {MIN_FFT_SIZE} to {MAX_FFT_SIZE}'}), 400
+    binary = request.args.get('format') == 'binary'
+    if not max(1, fft_size // MIN_HOP_DIVISOR) <= hop <= fft_size:
+        return jsonify({'error': f'hop must be between fft/{MIN_HOP_DIVISOR} and fft'}), 400
+    if window not in STFT_WINDOWS:
+        return jsonify({'error': 'Invalid window'}), 400
+    if axis not in ('x', 'y', 'z'):
+        return jsonify({'error': 'Invalid axis'}), 400
+
+    filepath = os.path.join(os.path.abspath(config.DATA_DIR), 'acoustic', filename)
+    key = spectrogram_cache.key(filepath, fft_size, hop, window, axis)
+    if key is None:
+        return jsonify({'error': 'File not found'}), 404
+
+    spectrogram = spectrogram_cache.get(key)
+    if spectrogram is None:
+        try:
+            capture = load_acoustic_file(filepath)
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+        samples = capture['axes'][axis] if 'axes' in capture else capture['samples']
+        error = spectrogram_size_error(*spectrogram_shape(len(samples), fft_size, hop), binary)
+        if error:
+            return jsonify({'error': error}), 400
+        try:
+            spectrogram = compute_spectrogram(samples, fft_size, hop, window)
+        except RuntimeError as e:
+            return jsonify({'error': str(e)}), 501
+        spectrogram.update(sample_rate=capture['sample_rate'], axis=axis if 'axes' in capture else None)
+        spectrogram_cache.put(key, spectrogram)
+    else:
+        error = spectrogram_size_error(spectrogram['num_frames'], spectrogram['num_bins'], binary)
+        if error:
+            return jsonify({'error': error}), 400
+
+    meta = {
+        'filename': filename,
+        'axis': spectrogram['axis'],
+        'sample_rate': spectrogram['sample_rate'],
+        'fft': fft_size,
+        'hop': hop,
+        'window': window,
+        'num_frames': spectrogram['num_frames'],
+        'num_bins': spectrogram['num_bins'],
+        'db_offset': spectrogram['db_offset'],
+        'db_scale': spectrogram['db_scale'],
+    }
+    if binary:
+        # Row-major uint8: num_frames rows of num_bins bytes, lowest frequency first
+        headers = {f"X-Spectrogram-{name.replace('_', '-').title()}": str(value)
+                   for name, value in meta.items() if value is not None and name != 'filename'}
+        return Response(spectrogram['frames'].tobytes(), mimetype='application/octet-stream', headers=headers)
+
+    return jsonify(dict(meta, frames=spectrogram['frames'].tolist()))
 
 
 if __name__ == '__main__':
     os.makedirs('templates', exist_ok=True)
     
     debug_mode = config.WEB_DEBUG
-    if debug_mode:
-        logger.warning("DEBUG MODE ENABLED - This should not be used in production!")
+    
+    broadcaster.listen(config.LIVE_SOCKET_PATH or default_socket_path())
     
     logger.info(f"Starting web server on {config.WEB_HOST}:{config.WEB_PORT}")
     logger.info(f"Authentication enabled - Username: {config.WEB_USERNAME}")
     
-    app.run(
-        host=config.WEB_HOST,
-        port=config.WEB_PORT,
-        debug=debug_mode
-    )
+    if debug_mode:
+        logger.warning("DEBUG MODE ENABLED - This should not be used in production!")
+        app.run(
+            host=config.WEB_HOST,
+            port=config.WEB_PORT,
+            debug=debug_mode
+        )
+    else:
+        serve(
+            app,
+            host=config.WEB_HOST,
+            port=config.WEB_PORT,
+            threads=config.WEB_THREADS,
+            backlog=config.WEB_BACKLOG,
+            connection_limit=config.WEB_CONNECTION_LIMIT,
+            keepalive_timeout=config.WEB_KEEPALIVE_TIMEOUT,
+            shutdown_timeout=config.WEB_SHUTDOWN_TIMEOUT,
+            on_shutdown=broadcaster.close  # end live streams so their threads can finish
+        )
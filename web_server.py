@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Production WSGI serving for the web interface
+
+Uses waitress when it is installed. Otherwise falls back to a Werkzeug
+server that handles requests on a fixed pool of threads with a bounded queue,
+instead of the single-threaded development server.
+"""
+
+import time
+import queue
+import signal
+import threading
+import logging
+from typing import Callable, Optional
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+try:
+    import waitress
+except ImportError:  # waitress is optional; fall back to the pooled Werkzeug server
+    waitress = None
+
+logger = logging.getLogger(__name__)
+
+_SERVICE_UNAVAILABLE = (
+    b"HTTP/1.1 503 Service Unavailable\r\n"
+    b"Content-Length: 0\r\nRetry-After: 1\r\nConnection: close\r\n\r\n"
+)
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug server with a fixed number of worker threads and a bounded request queue
+    
+    Connections beyond the queue are answered with 503 straight away rather
+    than piling up, and HTTP/1.1 keep-alive is enabled; idle keep-alive
+    connections are closed after keepalive_timeout so they don't pin a worker.
+    """
+    
+    multithread = True
+    
+    def __init__(self, host: str, port: int, app, threads: int, backlog: int, keepalive_timeout: float):
+        handler = type("KeepAliveRequestHandler", (WSGIRequestHandler,), {
+            "protocol_version": "HTTP/1.1",
+            "timeout": keepalive_timeout,
+        })
+        super().__init__(host, port, app, handler)
+        self._requests = queue.Queue(maxsize=backlog)
+        self._workers = [
+            threading.Thread(target=self._work, name=f"http-{i}", daemon=True)
+            for i in range(threads)
+        ]
+        for worker in self._workers:
+            worker.start()
+    
+    def process_request(self, request, client_address):
+        try:
+            self._requests.put_nowait((request, client_address))
+        except queue.Full:
+            logger.warning(f"Request queue full, rejecting connection from {client_address[0]}")
+            try:
+                request.sendall(_SERVICE_UNAVAILABLE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+    
+    def _work(self):
+        while True:
+            item = self._requests.get()
+            if item is None:
+                return
+            request, client_address = item
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+    
+    def drain(self, timeout: float):
+        """Let queued and in-flight requests finish, up to timeout seconds"""
+        for _ in self._workers:
+            try:
+                self._requests.put(None, timeout=timeout)
+            except queue.Full:
+                break
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
+        busy = sum(worker.is_alive() for worker in self._workers)
+        if busy:
+            logger.warning(f"{busy} request(s) still running at shutdown")
+
+def serve(app, host: str, port: int, threads: int, backlog: int, connection_limit: int,
+          keepalive_timeout: float, shutdown_timeout: float,
+          on_shutdown: Optional[Callable[[], None]] = None):
+    """Serve app until SIGTERM/SIGINT, then stop accepting and finish in-flight requests
+    
+    on_shutdown runs first, e.g. to end long-lived streaming responses.
+    shutdown_timeout applies to the Werkzeug fallback; waitress uses its own
+    (5 s) limit when stopping its threads.
+    """
+    if waitress is not None:
+        server = waitress.create_server(
+            app, host=host, port=port, threads=threads, backlog=backlog,
+            connection_limit=connection_limit, channel_timeout=keepalive_timeout,
+            cleanup_interval=min(30, keepalive_timeout)
+        )
+        logger.info(f"Serving with waitress on {host}:{port} ({threads} threads)")
+    else:
+        server = PooledWSGIServer(host, port, app, threads, backlog, keepalive_timeout)
+        logger.info(f"waitress not installed, serving with pooled Werkzeug server on "
+                    f"{host}:{port} ({threads} threads, queue of {backlog})")
+    
+    def stop(signum, frame):
+        logger.info("Shutting down web server...")
+        if on_shutdown:
+            on_shutdown()
+        if waitress is not None:
+            raise SystemExit(0)  # ends waitress' event loop, which then shuts down its threads
+        threading.Thread(target=server.shutdown, daemon=True).start()
+    
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    
+    if waitress is not None:
+        server.run()  # returns after SIGTERM/SIGINT once waitress has stopped its worker threads
+        logger.info("Web server stopped")
+        return
+    
+    server.serve_forever()
+    server.drain(shutdown_timeout)
+    logger.info("Web server stopped")